@@ -0,0 +1,234 @@
+import os
+import csv
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import itertools
+import unicodedata
+from typing import List, Dict, Any, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MANIFEST = "sample_data/eval_manifest.json"
+DEFAULT_QUERIES = "sample_data/eval_queries.jsonl"
+
+def parse_list(value: str, cast=str) -> List:
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+def parse_chunk_sizes(value: str) -> List[Tuple[int, int]]:
+    """'2000:400,1000:200' -> [(2000, 400), (1000, 200)] (parent:child characters)"""
+    return [tuple(int(size) for size in pair.split(":")) for pair in parse_list(value)]
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """
+    Labelled queries, one JSON object per line:
+    {"query": "...", "answers": ["text the retrieved parents must contain", ...], "filters": {...}}
+    Answers are matched as substrings (case and whitespace insensitive), so labels survive re-chunking.
+    """
+    with open(path) as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    for entry in queries:
+        if not entry.get("answers"):
+            raise ValueError(f"Query without answers: {entry.get('query')}")
+    return queries
+
+def normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split()).lower()
+
+def score(results, answers: List[str], k: int) -> Tuple[float, float]:
+    """(recall@k over the answer strings, reciprocal rank of the first parent containing any answer)"""
+    texts = [normalize(doc.content) for doc in results[:k]]
+    answers = [normalize(answer) for answer in answers]
+    recall = sum(any(answer in text for text in texts) for answer in answers) / len(answers)
+    reciprocal_rank = next((1.0 / rank for rank, text in enumerate(texts, 1) if any(a in text for a in answers)), 0.0)
+    return recall, reciprocal_rank
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100.0))]
+
+def create_adapter(db_type: str, name: str, local_path: str, **search_kwargs):
+    """Hybrid-capable adapter for an eval collection, so dense and hybrid search run on the same data"""
+    from src.db import VectorDBFactory
+    if db_type == "qdrant":
+        return VectorDBFactory.create("qdrant", collection_name=name, use_hybrid=True, **search_kwargs)
+    search_kwargs.pop("hnsw_ef", None)  # Exact search
+    search_kwargs.pop("index_profile", None)
+    return VectorDBFactory.create("local", collection_name=name, use_hybrid=True, path=local_path, **search_kwargs)
+
+async def build_collection(db, manifest: List[Dict[str, Any]], sizes: Tuple[int, int], embedder, sparse_embedder) -> int:
+    """Ingest the corpus with the given parent/child chunk sizes, indexing once at the end. Returns the number of chunks."""
+    from ingestion_pipeline import aingest_file
+    from src.processor.chunker import ParentChildChunker
+
+    parent_size, child_size = sizes
+    chunker = ParentChildChunker(parent_chunk_size=parent_size, child_chunk_size=child_size,
+                                 child_chunk_overlap=child_size // 10)
+    await db.begin_bulk_load()
+    counts = await asyncio.gather(*[
+        aingest_file(entry["file_path"], entry.get("metadata", {}), embedder=embedder,
+                     sparse_embedder=sparse_embedder, db=db, chunker=chunker)
+        for entry in manifest
+    ])
+    if any(count is None for count in counts):
+        raise RuntimeError(f"Ingestion failed for chunk sizes {parent_size}:{child_size}")
+    await db.finish_bulk_load()
+    return sum(counts)
+
+async def evaluate(client, queries: List[Dict[str, Any]], k: int, repeats: int, exact: bool = False) -> Dict[str, float]:
+    """Run every query `repeats` times sequentially; quality from the first pass, latency from all"""
+    await client.retrieve(queries[0]["query"], filters=queries[0].get("filters"), limit=k, exact=exact)  # Warm up
+
+    latencies, recalls, reciprocal_ranks, payload_bytes = [], [], [], []
+    for repeat in range(repeats):
+        for entry in queries:
+            start = time.perf_counter()
+            results = await client.retrieve(entry["query"], filters=entry.get("filters"), limit=k, exact=exact)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if repeat == 0:
+                recall, reciprocal_rank = score(results, entry["answers"], k)
+                recalls.append(recall)
+                reciprocal_ranks.append(reciprocal_rank)
+                # What a caller receives (see retrieval_service.py)
+                payload_bytes.append(sum(len(doc.model_dump_json(exclude={"embedding", "sparse_embedding"})) for doc in results))
+
+    return {
+        f"recall@{k}": sum(recalls) / len(recalls),
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "payload_bytes": sum(payload_bytes) / len(payload_bytes)
+    }
+
+def mark_pareto(rows: List[Dict[str, Any]], recall_key: str):
+    """Flag operating points no other configuration beats on both recall and p95 latency"""
+    for row in rows:
+        row["pareto"] = not any(
+            other[recall_key] >= row[recall_key] and other["p95_ms"] <= row["p95_ms"]
+            and (other[recall_key] > row[recall_key] or other["p95_ms"] < row["p95_ms"])
+            for other in rows
+        )
+
+def print_table(rows: List[Dict[str, Any]], recall_key: str):
+    print(f"\n{'chunks':>10} {'hybrid':>6} {'prefetch':>8} {'ef':>5} {'exact':>5} {recall_key:>9} {'mrr':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'bytes/q':>8}")
+    for row in rows:
+        print(f"{row['chunk_sizes']:>10} {str(row['hybrid']):>6} {row['prefetch_factor'] or '-':>8} {row['hnsw_ef'] or '-':>5} {str(row['exact']):>5} "
+              f"{row[recall_key]:>9.3f} {row['mrr']:>6.3f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['payload_bytes']:>8.0f} {'⭐' if row['pareto'] else ''}")
+    print("\n⭐ = Pareto-optimal (no other configuration has higher recall and lower p95)")
+
+def write_rows(rows: List[Dict[str, Any]], path: str):
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+    print(f"✅ Results written to {path}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Sweep chunking and search parameters and report recall/MRR against latency")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help='JSON file: [{"file_path": "...", "metadata": {...}}, ...]')
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="Labelled queries (JSONL with query and answers)")
+    parser.add_argument("--db_type", choices=["qdrant", "local"], default="qdrant")
+    parser.add_argument("--qdrant_url", default=":memory:", help="Qdrant to evaluate against (default: in-memory)")
+    parser.add_argument("--embedder", default="hash", help="Dense embedder (default: deterministic, offline 'hash')")
+    parser.add_argument("--sparse_embedder", choices=["hash", "bm25"], default="hash")
+    parser.add_argument("--k", type=int, default=5, help="Parent documents retrieved per query")
+    parser.add_argument("--chunk_sizes", default="2000:400,1000:200", help="parent:child character sizes to sweep")
+    parser.add_argument("--hybrid", default="false,true", help="Search modes to sweep")
+    parser.add_argument("--prefetch_factors", default="2,4", help="Hybrid prefetch depths (x k) to sweep")
+    parser.add_argument("--hnsw_ef", default="0", help="Qdrant HNSW ef values to sweep (0 = index profile default)")
+    parser.add_argument("--exact", default="false", help="Exact (non-ANN) search modes to sweep, e.g. 'false,true' for ANN recall loss")
+    parser.add_argument("--index_profile", default="default", help="Qdrant index profile for the eval collections (see src/db/index_profiles.py)")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the query set for latency percentiles")
+    parser.add_argument("--output", help="Write results to .json or .csv")
+    args = parser.parse_args()
+
+    # Measure the retrieval path itself: no caches, batching, hedging, deadlines or partitions
+    os.environ.update({"QDRANT_URL": args.qdrant_url, "QUERY_CACHE_SIZE": "0", "SEMANTIC_CACHE_SIZE": "0",
+                       "QUERY_BATCH_WINDOW_MS": "0", "HEDGE_PERCENTILE": "0", "RETRIEVAL_DEADLINE_MS": "0",
+                       "USE_HYBRID_SEARCH": "true"})  # Ingest sparse vectors so both modes can be evaluated
+    os.environ.pop("PARTITION_KEY", None)
+
+    from src.db import ClientRegistry
+    from src.embedder import EmbedderFactory
+    from src.models import Document, DocMetadata
+    from src.rag_client import RAGClient
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    queries = load_queries(args.queries)
+    chunk_sizes = parse_chunk_sizes(args.chunk_sizes)
+    hybrid_modes = [value.lower() == "true" for value in parse_list(args.hybrid)]
+    prefetch_factors = parse_list(args.prefetch_factors, int)
+    hnsw_efs = parse_list(args.hnsw_ef, int) if args.db_type == "qdrant" else [0]
+    exact_modes = [value.lower() == "true" for value in parse_list(args.exact)] if args.db_type == "qdrant" else [False]
+    if args.db_type == "qdrant" and args.qdrant_url == ":memory:" and (any(hnsw_efs) or any(exact_modes)):
+        print("⚠️  In-memory Qdrant searches exactly, so hnsw_ef and exact have no effect; pass --qdrant_url to measure them")
+
+    embedder = EmbedderFactory.create(args.embedder)
+    sparse_embedder = EmbedderFactory.create("hash", sparse=True) if args.sparse_embedder == "hash" else EmbedderFactory.create("bm25")
+    # Collections are created on first use with VECTOR_SIZE, so set it before opening any
+    probe = Document(content="vector size probe", metadata=DocMetadata(source_type='markdown'))
+    await embedder.embed([probe])
+    os.environ["VECTOR_SIZE"] = str(len(probe.embedding))
+    local_path = tempfile.mkdtemp(prefix="rag-eval-") if args.db_type == "local" else None
+    recall_key = f"recall@{args.k}"
+    rows = []
+
+    try:
+        for sizes in chunk_sizes:
+            name = f"eval_p{sizes[0]}_c{sizes[1]}"
+            db = create_adapter(args.db_type, name, local_path, index_profile=args.index_profile)
+            async with db:
+                if args.db_type == "qdrant" and name in await db.list_collections():
+                    await db.delete_collection(name)  # Stale collection from an earlier run
+                start = time.perf_counter()
+                chunks = await build_collection(db, manifest, sizes, embedder, sparse_embedder)
+                print(f"\n--- {name}: {chunks} chunks in {time.perf_counter() - start:.1f}s ---")
+
+                for hybrid, prefetch_factor, hnsw_ef, exact in itertools.product(hybrid_modes, prefetch_factors, hnsw_efs, exact_modes):
+                    if not hybrid and prefetch_factor != prefetch_factors[0]:
+                        continue  # Prefetch depth only applies to hybrid fusion
+                    if exact and hnsw_ef != hnsw_efs[0]:
+                        continue  # ef has no effect on exact search
+                    search_db = create_adapter(args.db_type, name, local_path, prefetch_factor=prefetch_factor, hnsw_ef=hnsw_ef,
+                                               index_profile=args.index_profile)
+                    client = RAGClient(use_hybrid=hybrid, db_type=args.db_type, embedder=embedder,
+                                       sparse_embedder=sparse_embedder, db=search_db)
+                    async with search_db:
+                        metrics = await evaluate(client, queries, args.k, args.repeats, exact=exact)
+                    rows.append({
+                        "chunk_sizes": f"{sizes[0]}:{sizes[1]}", "chunks": chunks, "hybrid": hybrid,
+                        "prefetch_factor": prefetch_factor if hybrid else None,
+                        # Effective ef: the index profile's ef_search when --hnsw_ef is 0
+                        "hnsw_ef": None if exact else getattr(search_db, "hnsw_ef", None),
+                        "exact": exact, **metrics
+                    })
+                    print(f"hybrid={hybrid} prefetch={prefetch_factor} ef={hnsw_ef or '-'} exact={exact}: "
+                          f"{recall_key}={metrics[recall_key]:.3f} mrr={metrics['mrr']:.3f} p95={metrics['p95_ms']:.2f} ms")
+
+                if args.db_type == "qdrant" and args.qdrant_url != ":memory:":
+                    await db.delete_collection(name)
+
+        mark_pareto(rows, recall_key)
+        print_table(rows, recall_key)
+        if args.output:
+            write_rows(rows, args.output)
+    finally:
+        await ClientRegistry.close_all()
+        embedder.close()
+        sparse_embedder.close()
+        if local_path:
+            shutil.rmtree(local_path, ignore_errors=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
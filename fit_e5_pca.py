@@ -0,0 +1,48 @@
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from src.loader.factory import LoaderFactory
+from src.processor.cleaner import SimpleCleaner
+from src.processor.chunker import ParentChildChunker
+from src.embedder import EmbedderFactory
+from src.utils.logger import logger
+
+load_dotenv()
+
+async def fit_pca(file_paths, output_dim: int, model_name: str):
+    """
+    Fit a PCA projection for E5 on child chunks of the given files.
+    Set EMBEDDING_DIMENSIONS=<output_dim> afterwards to use it at ingest and retrieval.
+    """
+    cleaner = SimpleCleaner()
+    chunker = ParentChildChunker()
+    
+    texts = []
+    for file_path in file_paths:
+        loader = LoaderFactory.get_loader(file_path)
+        documents = await loader.load(file_path, source_type="pdf")
+        for doc in documents:
+            doc.content = cleaner.clean(doc.content)
+            texts.extend(chunk.content for chunk in chunker.chunk(doc))
+    
+    logger.info(f"Fitting {output_dim}-dim PCA on {len(texts)} chunks...")
+    
+    # Load the full-size model; the projection is what we're fitting
+    embedder = EmbedderFactory.create("e5", model_name=model_name, project=False)
+    try:
+        path = await embedder.fit_projection(texts, output_dim)
+    finally:
+        embedder.close()
+    print(f"✅ Saved projection to {path}. Set EMBEDDING_DIMENSIONS={output_dim} to enable it.")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fit a PCA projection for reduced-dimension E5 embeddings")
+    parser.add_argument("file_paths", nargs="+", help="Sample documents to fit on")
+    parser.add_argument("--dim", type=int, required=True, help="Target dimensionality")
+    parser.add_argument("--model", default="./hf-models/e5", help="E5 model path")
+    args = parser.parse_args()
+    
+    await fit_pca(args.file_paths, args.dim, args.model)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,7 +2,7 @@ import os
 import asyncio
 import argparse
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 import os
 import asyncio
@@ -13,24 +13,57 @@ from dotenv import load_dotenv
 from src.models import DocMetadata
 from src.loader.factory import LoaderFactory
 from src.processor.cleaner import SimpleCleaner
+from src.processor.base import BaseChunker
 from src.processor.chunker import ParentChildChunker
-from src.embedder import EmbedderFactory
-from src.db import VectorDBFactory
+from src.embedder import EmbedderFactory, BaseEmbedder, HybridEmbedder
+from src.db import VectorDBFactory, BaseVectorDB, PartitionedVectorDB
+from src.shards import ShardWriter
+from src.cache_invalidation import RemoteCacheInvalidator
 from src.utils.logger import logger, time_execution
+from src.utils.tracing import span, set_attributes
 
 load_dotenv()
 
+# Sparse model is loop-agnostic and slow to load, so it is shared across ingestions
+_sparse_embedder = None
+
+def get_sparse_embedder() -> BaseEmbedder:
+    """Return the process-wide BM25 embedder, creating it on first use"""
+    global _sparse_embedder
+    if _sparse_embedder is None:
+        _sparse_embedder = EmbedderFactory.create("bm25")
+    return _sparse_embedder
+
 @time_execution
-async def aingest_file(file_path: str, raw_metadata: Dict[str, Any]):
+async def aingest_file(file_path: str, raw_metadata: Dict[str, Any], embedder: Optional[BaseEmbedder] = None,
+                       sparse_embedder: Optional[BaseEmbedder] = None,
+                       db: Optional[BaseVectorDB] = None,
+                       shard_writer: Optional[ShardWriter] = None,
+                       chunker: Optional[BaseChunker] = None) -> Optional[int]:
     """
     Async ingestion pipeline:
     1. Validate Metadata
     2. Load Document (Async)
     3. Clean & Chunk
-    4. Embed (Async)
-    5. Upsert to Vector DB (Async)
+    4. Embed (Async, dense + sparse concurrently when hybrid)
+    5. Upsert to Vector DB (Async), or write to shards for a later bulk load
+    
+    Args:
+        file_path: Path to the document
+        raw_metadata: Metadata fields for DocMetadata
+        embedder: Optional long-lived dense embedder (created from EMBEDDER_TYPE if None)
+        sparse_embedder: Optional long-lived sparse embedder (shared BM25 if None)
+        db: Optional target adapter, e.g. a versioned collection being built by reindex.py.
+            The caller owns its lifecycle. If None, one is created from VECTOR_DB_TYPE.
+        shard_writer: If given, embedded chunks are written to shards instead of the DB
+            (load them later with `python shard_tool.py load`)
+        chunker: Optional chunker, e.g. with non-default sizes (ParentChildChunker() if None)
+            
+    Returns:
+        Number of chunks upserted, or None if ingestion failed
     """
     logger.info(f"Starting ingestion for {file_path}...")
+    set_attributes(file=file_path, product=raw_metadata.get("product"))
     
     # 1. Validate Metadata
     try:
@@ -43,7 +76,9 @@ async def aingest_file(file_path: str, raw_metadata: Dict[str, Any]):
     # 2. Loader (async)
     try:
         loader = LoaderFactory.get_loader(file_path)
-        documents = await loader.load(file_path, **raw_metadata)
+        with span("ingest.load", loader=type(loader).__name__) as load_span:
+            documents = await loader.load(file_path, **raw_metadata)
+            load_span.set_attributes(pages=len(documents))
         logger.info(f"Loaded {len(documents)} pages/documents.")
     except Exception as e:
         logger.error(f"Loading failed: {e}")
@@ -51,37 +86,51 @@ async def aingest_file(file_path: str, raw_metadata: Dict[str, Any]):
 
     # 3. Processor (Cleaner & Chunker) - can stay sync
     cleaner = SimpleCleaner()
-    chunker = ParentChildChunker()
+    chunker = chunker or ParentChildChunker()
     
     processed_docs = []
-    for doc in documents:
-        doc.content = cleaner.clean(doc.content)
-        chunks = chunker.chunk(doc)
-        processed_docs.extend(chunks)
+    with span("ingest.chunk", pages=len(documents)) as chunk_span:
+        for doc in documents:
+            doc.content = cleaner.clean(doc.content)
+            chunks = chunker.chunk(doc)
+            processed_docs.extend(chunks)
+        chunk_span.set_attributes(chunks=len(processed_docs))
         
     logger.info(f"Created {len(processed_docs)} chunks.")
+    set_attributes(chunks=len(processed_docs))
 
     # 4. Embedder (async with batching)
     embedder_type = os.getenv("EMBEDDER_TYPE", "openai")
     use_hybrid = os.getenv("USE_HYBRID_SEARCH", "false").lower() == "true"
     db_type = os.getenv("VECTOR_DB_TYPE", "qdrant")
+    if shard_writer is not None:
+        # Shards keep sparse vectors so they can be loaded into any backend later
+        supports_sparse = True
+    elif db is not None:
+        supports_sparse = db.supports_sparse
+    else:
+        supports_sparse = VectorDBFactory.get(db_type).supports_sparse
     
+    owns_embedder = embedder is None
     try:
-        embedder = EmbedderFactory.create(embedder_type)        
-        embedded_docs = await embedder.embed(processed_docs)
-        logger.info(f"Embeddings generated using {embedder_type}.")
+        if embedder is None:
+            embedder = EmbedderFactory.create(embedder_type)
         
-        # Generate sparse embeddings if hybrid search is enabled
-        if use_hybrid and db_type == "qdrant":
+        # Generate sparse embeddings alongside dense ones if hybrid search is enabled
+        if use_hybrid and supports_sparse and sparse_embedder is None:
             try:
-                from src.embedder.bm25_embedder import BM25Embedder
-                sparse_embedder = BM25Embedder()
-                embedded_docs = await sparse_embedder.embed(embedded_docs)
-                logger.info("Sparse BM25 embeddings generated.")
+                sparse_embedder = get_sparse_embedder()
             except ImportError:
                 logger.warning("fastembed not installed. Skipping sparse embeddings.")
                 use_hybrid = False
         
+        if use_hybrid and supports_sparse and sparse_embedder is not None:
+            embedded_docs = await HybridEmbedder(embedder, sparse_embedder).embed(processed_docs)
+            logger.info(f"Dense ({embedder_type}) and sparse BM25 embeddings generated concurrently.")
+        else:
+            embedded_docs = await embedder.embed(processed_docs)
+            logger.info(f"Embeddings generated using {embedder_type}.")
+        
         # Auto-detect vector size from the first embedding
         if embedded_docs and embedded_docs[0].embedding:
             vector_size = len(embedded_docs[0].embedding)
@@ -91,28 +140,50 @@ async def aingest_file(file_path: str, raw_metadata: Dict[str, Any]):
     except Exception as e:
         logger.error(f"Embedding failed: {e}")
         return
+    finally:
+        # An embedder created for this file only (e.g. E5 worker processes) is not reused
+        if owns_embedder and embedder is not None:
+            embedder.close()
+
+    # 5a. Shards (embed now, load later)
+    if shard_writer is not None:
+        try:
+            await asyncio.to_thread(shard_writer.write, embedded_docs)
+            logger.info(f"Documents written to shards in {shard_writer.directory}.")
+        except Exception as e:
+            logger.error(f"Shard write failed: {e}")
+            return
+        logger.info("Ingestion complete.")
+        return sum(1 for doc in embedded_docs if doc.embedding)
 
-    # 5. Database (async)
+    # 5b. Database (async)
     try:
-        # Pass use_hybrid to Qdrant adapter
-        if db_type == "qdrant":
-            db = VectorDBFactory.create(db_type, use_hybrid=use_hybrid)
-        else:
-            db = VectorDBFactory.create(db_type)
-        
-        async with db:  # Properly close DB client
+        if db is not None:
             await db.upsert(embedded_docs)
-        logger.info(f"Documents upserted to database using {db_type}.")
+        else:
+            # Pass use_hybrid to adapters that store sparse vectors
+            db_kwargs = {"use_hybrid": use_hybrid} if supports_sparse else {}
+            partition_key = os.getenv("PARTITION_KEY")
+            if partition_key:
+                db = PartitionedVectorDB(db_type, partition_key, **db_kwargs)
+            else:
+                db = VectorDBFactory.create(db_type, **db_kwargs)
+            
+            async with db:  # Properly close DB client
+                await db.upsert(embedded_docs)
+        logger.info(f"Documents upserted to database using {type(db).__name__}.")
     except Exception as e:
         logger.error(f"Database upsert failed: {e}")
         return
 
     logger.info("Ingestion complete.")
+    return sum(1 for doc in embedded_docs if doc.embedding)
 
 async def main():
     parser = argparse.ArgumentParser(description="Ingest a document into the RAG system")
     parser.add_argument("file_path", help="Path to the document")
     parser.add_argument("--metadata", help="JSON string of metadata", default='{}')
+    parser.add_argument("--to_shards", help="Write embeddings to this shard directory instead of the vector DB")
     
     args = parser.parse_args()
     
@@ -122,7 +193,17 @@ async def main():
         logger.error("Invalid JSON metadata")
         return
         
-    await aingest_file(args.file_path, metadata)
+    if args.to_shards:
+        embedder = EmbedderFactory.create(os.getenv("EMBEDDER_TYPE", "openai"))
+        try:
+            with ShardWriter(args.to_shards, embedder_identity=embedder.identity) as writer:
+                await aingest_file(args.file_path, metadata, embedder=embedder, shard_writer=writer)
+        finally:
+            embedder.close()
+    else:
+        # Retrieval services in other processes drop cached results for the collections written here
+        async with RemoteCacheInvalidator():
+            await aingest_file(args.file_path, metadata)
 
 if __name__ == "__main__":
     asyncio.run(main())
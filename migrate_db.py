@@ -0,0 +1,35 @@
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+async def migrate_qdrant_indexes(collection_name: str = "rag_collection"):
+    print(f"\n--- Creating payload indexes (Qdrant collection: {collection_name}) ---")
+    
+    from src.db import VectorDBFactory
+    from src.models import filterable_fields
+    
+    db = VectorDBFactory.create("qdrant", collection_name=collection_name)
+    try:
+        async with db:
+            created = await db.ensure_payload_indexes()
+        if created:
+            print(f"✅ Created indexes: {created}")
+        else:
+            print(f"⚠️  All filterable fields already indexed: {list(filterable_fields())}")
+    except Exception as e:
+        print(f"❌ Error creating payload indexes: {e}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migrate existing vector DB collections to the current schema")
+    parser.add_argument("--db_type", choices=["qdrant"], default="qdrant",
+                        help="Specific DB to migrate (Azure indexes declare filterable fields at creation)")
+    parser.add_argument("--collection", default="rag_collection", help="Collection name")
+    args = parser.parse_args()
+    
+    if args.db_type == "qdrant":
+        await migrate_qdrant_indexes(args.collection)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import asyncio
+import argparse
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Default serving names (the alias clients keep using) and the separator before the version
+# suffix. Azure index names may only contain lowercase letters, digits and dashes.
+ALIASES = {"qdrant": "rag_collection", "azure": "rag-index"}
+VERSION_SEPARATORS = {"qdrant": "_v", "azure": "-v"}
+VERSION_FORMAT = "%Y%m%d%H%M%S"
+
+def create_adapter(db_type: str, name: str, use_hybrid: bool = False, index_profile: Optional[str] = None):
+    """Adapter bound to a concrete collection/index (or an alias) by name"""
+    from src.db import VectorDBFactory
+    if db_type == "qdrant":
+        return VectorDBFactory.create("qdrant", collection_name=name, use_hybrid=use_hybrid, index_profile=index_profile)
+    return VectorDBFactory.create("azure", index_name=name, index_profile=index_profile)
+
+def list_versions(names: List[str], db_type: str, alias: str) -> List[str]:
+    """Versioned collections of alias, oldest first"""
+    pattern = re.compile(re.escape(alias + VERSION_SEPARATORS[db_type]) + r"(\d{14})")
+    return sorted(name for name in names if pattern.fullmatch(name))
+
+def version_time(name: str) -> datetime:
+    return datetime.strptime(name[-14:], VERSION_FORMAT).replace(tzinfo=timezone.utc)
+
+async def build_version(db, embedder, manifest: List[Dict[str, Any]], concurrency: int) -> int:
+    """
+    Ingest every manifest entry into the new collection, several files at a time.
+    Indexing is deferred during the load and the index is built once at the end.
+
+    Returns:
+        Total number of chunks upserted
+    """
+    from src.models import Document, DocMetadata
+    from ingestion_pipeline import aingest_file
+
+    # Create the collection up front with the right vector size, so parallel
+    # ingestions don't race to create it
+    probe = Document(content="vector size probe", metadata=DocMetadata(source_type='markdown'))
+    await embedder.embed([probe])
+    os.environ["VECTOR_SIZE"] = str(len(probe.embedding))
+    await db.__aenter__()
+    await db.begin_bulk_load()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ingest(entry: Dict[str, Any]) -> Optional[int]:
+        async with semaphore:
+            return await aingest_file(entry["file_path"], entry.get("metadata", {}), embedder=embedder, db=db)
+
+    counts = await asyncio.gather(*[ingest(entry) for entry in manifest])
+    failed = [entry["file_path"] for entry, count in zip(manifest, counts) if count is None]
+    if failed:
+        raise RuntimeError(f"Ingestion failed for {len(failed)} file(s): {failed}")
+    await db.finish_bulk_load()
+    return sum(counts)
+
+async def verify_version(db, embedder, expected: int, queries: List[str], min_results: int,
+                         timeout: float = 300.0) -> bool:
+    """Check the point count (waiting for indexing to catch up) and that sample queries return results"""
+    from src.models import Document, DocMetadata
+
+    deadline = asyncio.get_running_loop().time() + timeout
+    count = await db.count()
+    while count < expected and asyncio.get_running_loop().time() < deadline:
+        # Azure indexes asynchronously; Qdrant is exact once upserts return
+        await asyncio.sleep(5)
+        count = await db.count()
+
+    if count != expected:
+        print(f"❌ Point count mismatch: expected {expected}, found {count}")
+        return False
+    print(f"✅ Point count: {count}")
+
+    if queries:
+        query_docs = [Document(content=query, metadata=DocMetadata(source_type='markdown')) for query in queries]
+        await embedder.embed(query_docs, is_query=True)
+        results = await db.search_many([doc.embedding for doc in query_docs], limit=min_results, group_by="parent_id")
+
+        empty = [query for query, docs in zip(queries, results) if len(docs) < min_results]
+        if empty:
+            print(f"❌ {len(empty)}/{len(queries)} sample queries returned fewer than {min_results} results: {empty}")
+            return False
+        print(f"✅ All {len(queries)} sample queries returned results")
+    return True
+
+async def is_legacy(db, alias: str) -> bool:
+    """
+    Whether the serving name is a concrete collection (a deployment created before aliases).
+    It has to be dropped before the alias can take its name, leaving a brief gap once.
+    """
+    return await db.resolve_alias(alias) is None and alias in await db.list_collections()
+
+async def swap_alias(db, alias: str, name: str):
+    """Point the serving alias at the new version"""
+    current = await db.resolve_alias(alias)
+    if await is_legacy(db, alias):
+        print(f"⚠️  Dropping legacy collection '{alias}' to replace it with an alias")
+        await db.delete_collection(alias)
+
+    await db.point_alias(alias)
+    print(f"✅ '{alias}' -> '{name}' (was {current})")
+
+async def collect_garbage(db, db_type: str, alias: str, grace: timedelta):
+    """
+    Delete versions retired longer than the grace period ago. A version counts as retired
+    from the creation time of its successor; the serving version and anything newer
+    (e.g. a build in progress) are kept.
+    """
+    current = await db.resolve_alias(alias)
+    versions = list_versions(await db.list_collections(), db_type, alias)
+    if current not in versions:
+        print(f"⚠️  '{alias}' does not point to a versioned collection; skipping garbage collection")
+        return
+
+    now = datetime.now(timezone.utc)
+    retired = versions[:versions.index(current)]
+    for version, successor in zip(retired, versions[1:]):
+        age = now - version_time(successor)
+        if age >= grace:
+            await db.delete_collection(version)
+            print(f"🗑️  Deleted '{version}' (retired {age} ago)")
+        else:
+            print(f"⏳ Keeping '{version}' for rollback (retired {age} ago)")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector DB into a new versioned collection and switch over without downtime")
+    parser.add_argument("--db_type", choices=["qdrant", "azure"], default=os.getenv("VECTOR_DB_TYPE", "qdrant"))
+    parser.add_argument("--manifest", help='JSON file: [{"file_path": "...", "metadata": {...}}, ...]')
+    parser.add_argument("--alias", help="Serving name (defaults to rag_collection / rag-index)")
+    parser.add_argument("--queries", help="Text file with one sample query per line for verification")
+    parser.add_argument("--min_results", type=int, default=1, help="Results each sample query must return")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("REINDEX_CONCURRENCY", "4")),
+                        help="Files ingested in parallel")
+    parser.add_argument("--grace_hours", type=float, default=float(os.getenv("REINDEX_GRACE_HOURS", "24")),
+                        help="Keep retired versions this long for rollback")
+    parser.add_argument("--replace_legacy", action="store_true",
+                        help="Allow replacing a pre-alias plain collection with the alias")
+    parser.add_argument("--index_profile", default=os.getenv("INDEX_PROFILE", "default"),
+                        help="Index settings for the new version (see src/db/index_profiles.py)")
+    parser.add_argument("--gc_only", action="store_true", help="Only delete expired versions")
+    args = parser.parse_args()
+
+    from src.db import ClientRegistry
+    from src.embedder import EmbedderFactory
+    from src.cache_invalidation import RemoteCacheInvalidator
+
+    alias = args.alias or ALIASES[args.db_type]
+    grace = timedelta(hours=args.grace_hours)
+    use_hybrid = os.getenv("USE_HYBRID_SEARCH", "false").lower() == "true"
+
+    # Retrieval services in other processes drop cached results once the alias moves
+    async with RemoteCacheInvalidator():
+        try:
+            if args.gc_only:
+                # Admin calls on the alias adapter never create collections
+                await collect_garbage(create_adapter(args.db_type, alias), args.db_type, alias, grace)
+                return
+
+            if not args.manifest:
+                parser.error("--manifest is required unless --gc_only is set")
+            with open(args.manifest) as f:
+                manifest = json.load(f)
+            queries = []
+            if args.queries:
+                with open(args.queries) as f:
+                    queries = [line.strip() for line in f if line.strip()]
+
+            name = f"{alias}{VERSION_SEPARATORS[args.db_type]}{datetime.now(timezone.utc).strftime(VERSION_FORMAT)}"
+            db = create_adapter(args.db_type, name, use_hybrid=use_hybrid, index_profile=args.index_profile)
+            if await is_legacy(db, alias) and not args.replace_legacy:
+                print(f"❌ '{alias}' is a plain {args.db_type} collection, not an alias. "
+                      f"Re-run with --replace_legacy to drop it on switch-over (brief gap in service).")
+                return
+            print(f"\n--- Building '{name}' from {len(manifest)} file(s) ---")
+            embedder = EmbedderFactory.create(os.getenv("EMBEDDER_TYPE", "openai"))
+
+            try:
+                expected = await build_version(db, embedder, manifest, args.concurrency)
+                verified = await verify_version(db, embedder, expected, queries, args.min_results)
+            except Exception as e:
+                print(f"❌ Build failed: {e}")
+                verified = False
+            finally:
+                embedder.close()
+
+            if not verified:
+                print(f"❌ Leaving '{alias}' unchanged; deleting '{name}'")
+                if name in await db.list_collections():
+                    await db.delete_collection(name)
+                return
+
+            await swap_alias(db, alias, name)
+
+            print("\n--- Garbage collecting old versions ---")
+            await collect_garbage(db, args.db_type, alias, grace)
+        finally:
+            await ClientRegistry.close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
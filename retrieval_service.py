@@ -0,0 +1,274 @@
+import os
+import hmac
+import time
+import asyncio
+import argparse
+from collections import Counter
+from typing import Any, List, Dict, Optional
+from aiohttp import web
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field, ValidationError
+from src.models import Document
+from src.rag_client import RAGClient
+from src.utils.deadline import LatencyTracker
+from src.utils.logger import logger
+from src.utils.tracing import span, get_tracer
+
+load_dotenv()
+
+CLIENT_KEY = web.AppKey("client", RAGClient)
+ADMISSION_KEY = web.AppKey("admission", object)
+METRICS_KEY = web.AppKey("metrics", object)
+READY_KEY = web.AppKey("ready", dict)
+ADMIN_TOKEN_KEY = web.AppKey("admin_token", str)
+
+class RetrieveRequest(BaseModel):
+    query: str = Field(min_length=1)
+    filters: Optional[Dict[str, Any]] = None  # Dict form of src.filters (equality, lists, ranges, and/or/not)
+    limit: int = Field(default=5, ge=1, le=50)
+    hybrid_search: Optional[bool] = None
+    deadline_ms: Optional[float] = Field(default=None, gt=0)
+    hnsw_ef: Optional[int] = Field(default=None, ge=1, le=4096)
+    exact: bool = False
+
+class InvalidateRequest(BaseModel):
+    collections: Optional[List[str]] = None  # Collection names written to (None: drop everything)
+
+class RetrieveManyRequest(BaseModel):
+    queries: List[str] = Field(min_length=1, max_length=64)
+    filters: Optional[Dict[str, Any]] = None  # Dict form of src.filters (equality, lists, ranges, and/or/not)
+    limit: int = Field(default=5, ge=1, le=50)
+    hybrid_search: Optional[bool] = None
+    hnsw_ef: Optional[int] = Field(default=None, ge=1, le=4096)
+    exact: bool = False
+
+
+class AdmissionController:
+    """
+    Caps in-flight requests. Requests wait for a slot for at most queue_timeout
+    seconds and are then rejected, so overload sheds load (503) instead of
+    building an unbounded queue that blows every request's latency.
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class ServiceMetrics:
+    """Request counters and latencies, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self.requests: Counter = Counter()  # (endpoint, status) -> count
+        self.latency = LatencyTracker(window=2000, min_samples=1)
+        self.paths: Counter = Counter()  # retrieval path -> count
+        self.started_at = time.time()
+
+    def observe(self, endpoint: str, status: int, seconds: float):
+        self.requests[(endpoint, status)] += 1
+        self.latency.record(endpoint, seconds)
+
+    def render(self, client: RAGClient, admission: AdmissionController) -> str:
+        lines = [
+            "# TYPE rag_requests_total counter",
+            *[f'rag_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+              for (endpoint, status), count in sorted(self.requests.items())],
+            "# TYPE rag_request_latency_seconds summary",
+            *[f'rag_request_latency_seconds{{endpoint="{endpoint}",quantile="0.{q[1:]}"}} {stats[q]:.6f}'
+              for endpoint, stats in sorted(self.latency.snapshot().items()) for q in ("p50", "p95", "p99")],
+            "# TYPE rag_stage_latency_seconds summary",
+            *[f'rag_stage_latency_seconds{{stage="{stage}",quantile="0.{q[1:]}"}} {stats[q]:.6f}'
+              for stage, stats in sorted(client.latency.snapshot().items()) for q in ("p50", "p95", "p99")],
+            "# TYPE rag_retrieval_path_total counter",
+            *[f'rag_retrieval_path_total{{path="{path}"}} {count}' for path, count in sorted(self.paths.items())],
+            "# TYPE rag_in_flight gauge",
+            f"rag_in_flight {admission.in_flight}",
+            "# TYPE rag_queued gauge",
+            f"rag_queued {admission.queued}",
+            "# TYPE rag_rejected_total counter",
+            f"rag_rejected_total {admission.rejected}",
+        ]
+        for name, stats in (("query_embedding_cache", client.cache_stats()), ("semantic_cache", client.semantic_cache_stats())):
+            for key in ("hits", "misses", "hit_rate"):
+                if key in stats:
+                    lines.append(f'rag_{name}_{key} {stats[key]}')
+        tracing = get_tracer().stats()
+        if tracing["enabled"]:
+            lines.append("# TYPE rag_traces_exported_total counter")
+            lines.extend(f'rag_traces_exported_total{{reason="{reason}"}} {count}' for reason, count in tracing["exported"].items())
+            lines.append(f"rag_traces_dropped_total {tracing['dropped']}")
+        lines.append(f"rag_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+def _serialize(documents: List[Document]) -> List[dict]:
+    return [doc.model_dump(mode="json", exclude={"embedding", "sparse_embedding"}) for doc in documents]
+
+@web.middleware
+async def admission_middleware(request: web.Request, handler):
+    """Admission control and metrics for the retrieval endpoints"""
+    if request.path not in ("/retrieve", "/retrieve_many"):
+        return await handler(request)
+
+    admission = request.app[ADMISSION_KEY]
+    metrics = request.app[METRICS_KEY]
+    start = time.perf_counter()
+    with span("http.request", endpoint=request.path) as request_span:
+        admitted = await admission.acquire()
+        request_span.set_attributes(queue_ms=round((time.perf_counter() - start) * 1000, 3), in_flight=admission.in_flight)
+        if not admitted:
+            response = web.json_response({"error": "Server busy, retry later"}, status=503, headers={"Retry-After": "1"})
+        else:
+            try:
+                response = await handler(request)
+            except web.HTTPException as e:
+                response = e
+            except Exception:
+                # aiohttp turns this into a 500; record it before re-raising (the span marks the error)
+                request_span.set_attributes(status=500)
+                metrics.observe(request.path, 500, time.perf_counter() - start)
+                raise
+            finally:
+                admission.release()
+        request_span.set_attributes(status=response.status)
+    metrics.observe(request.path, response.status, time.perf_counter() - start)
+    return response
+
+async def _parse(request: web.Request, model):
+    try:
+        return model.model_validate(await request.json())
+    except (ValidationError, ValueError) as e:
+        raise web.HTTPBadRequest(text=str(e))
+
+async def retrieve(request: web.Request) -> web.Response:
+    body = await _parse(request, RetrieveRequest)
+    client = request.app[CLIENT_KEY]
+    try:
+        results = await client.retrieve(body.query, filters=body.filters, limit=body.limit,
+                                        hybrid_search=body.hybrid_search, deadline_ms=body.deadline_ms,
+                                        hnsw_ef=body.hnsw_ef, exact=body.exact)
+    except asyncio.TimeoutError as e:
+        return web.json_response({"error": f"Deadline exceeded: {e}"}, status=504)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    request.app[METRICS_KEY].paths[results.path] += 1
+    return web.json_response({
+        "results": _serialize(results),
+        "path": results.path,
+        "timings": results.timings,
+        "hedged": results.hedged
+    })
+
+async def retrieve_many(request: web.Request) -> web.Response:
+    body = await _parse(request, RetrieveManyRequest)
+    try:
+        results = await request.app[CLIENT_KEY].retrieve_many(body.queries, filters=body.filters, limit=body.limit,
+                                                              hybrid_search=body.hybrid_search,
+                                                              hnsw_ef=body.hnsw_ef, exact=body.exact)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    return web.json_response({"results": [_serialize(documents) for documents in results]})
+
+async def invalidate(request: web.Request) -> web.Response:
+    """Drop cached results after another process wrote to the served collections (see src.cache_invalidation)"""
+    token = request.app[ADMIN_TOKEN_KEY]
+    if not token:
+        return web.json_response({"error": "Cache invalidation is disabled (SERVICE_ADMIN_TOKEN is not set)"}, status=403)
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return web.json_response({"error": "Unauthorized"}, status=401, headers={"WWW-Authenticate": "Bearer"})
+    body = await _parse(request, InvalidateRequest) if request.can_read_body else InvalidateRequest()
+    invalidated = request.app[CLIENT_KEY].invalidate_collections(body.collections)
+    logger.info(f"Invalidation request for {body.collections or 'all collections'} (invalidated={invalidated})")
+    return web.json_response({"invalidated": invalidated})
+
+async def health(request: web.Request) -> web.Response:
+    """Liveness: the process is serving requests"""
+    return web.json_response({"status": "ok"})
+
+async def ready(request: web.Request) -> web.Response:
+    """Readiness: models are loaded and DB connections are open"""
+    state = request.app[READY_KEY]
+    if state.get("ready"):
+        return web.json_response({"status": "ready"})
+    return web.json_response({"status": "starting", "error": state.get("error")}, status=503)
+
+async def metrics(request: web.Request) -> web.Response:
+    text = request.app[METRICS_KEY].render(request.app[CLIENT_KEY], request.app[ADMISSION_KEY])
+    return web.Response(text=text, content_type="text/plain")
+
+def create_app(client: Optional[RAGClient] = None, max_concurrency: int = None, queue_timeout_ms: float = None,
+               admin_token: str = None) -> web.Application:
+    """
+    Build the service around one long-lived RAGClient, warmed up before the app reports ready.
+
+    Args:
+        client: Client to serve (created from env on startup if None)
+        max_concurrency: In-flight retrieval requests. If None, reads SERVICE_MAX_CONCURRENCY from env.
+        queue_timeout_ms: Max wait for a slot before 503. If None, reads SERVICE_QUEUE_TIMEOUT_MS from env.
+        admin_token: Bearer token required by POST /invalidate. If None, reads SERVICE_ADMIN_TOKEN from env
+            (unset disables the endpoint).
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("SERVICE_MAX_CONCURRENCY", "32"))
+    if queue_timeout_ms is None:
+        queue_timeout_ms = float(os.getenv("SERVICE_QUEUE_TIMEOUT_MS", "100"))
+    if admin_token is None:
+        admin_token = os.getenv("SERVICE_ADMIN_TOKEN", "")
+
+    app = web.Application(middlewares=[admission_middleware])
+    app[ADMISSION_KEY] = AdmissionController(max_concurrency, queue_timeout_ms / 1000.0)
+    app[METRICS_KEY] = ServiceMetrics()
+    app[READY_KEY] = {"ready": False}
+    app[ADMIN_TOKEN_KEY] = admin_token
+
+    async def lifespan(app: web.Application):
+        # Pay model load and connection setup once, before taking traffic
+        app[CLIENT_KEY] = client or RAGClient()
+        try:
+            await app[CLIENT_KEY].warm_up()
+            app[READY_KEY]["ready"] = True
+            logger.info(f"Retrieval service ready (max_concurrency={max_concurrency}, queue_timeout={queue_timeout_ms:.0f} ms)")
+        except Exception as e:
+            app[READY_KEY]["error"] = str(e)
+            logger.error(f"Warm-up failed: {e}")
+        yield
+        await app[CLIENT_KEY].close()
+
+    app.cleanup_ctx.append(lifespan)
+    app.router.add_post("/retrieve", retrieve)
+    app.router.add_post("/retrieve_many", retrieve_many)
+    app.router.add_post("/invalidate", invalidate)
+    app.router.add_get("/health", health)
+    app.router.add_get("/ready", ready)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve retrieval over HTTP with a single warmed RAGClient")
+    parser.add_argument("--host", default=os.getenv("SERVICE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8080")))
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
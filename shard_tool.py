@@ -0,0 +1,87 @@
+import os
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+async def load(directory: str, db_type: str, name: str = None, batch_size: int = None, parallel: int = None):
+    from src.db import VectorDBFactory, ClientRegistry
+    from src.shards import read_manifest, load_shards
+    from src.cache_invalidation import RemoteCacheInvalidator
+
+    manifest = read_manifest(directory)
+    use_hybrid = any(shard["sparse"] for shard in manifest["shards"])
+    print(f"\n--- Loading {sum(s['count'] for s in manifest['shards'])} documents "
+          f"({len(manifest['shards'])} shards, dim={manifest['dim']}, embedder={manifest['embedder']}) into {db_type} ---")
+
+    # Collections created by the load need the shard vector size
+    os.environ["VECTOR_SIZE"] = str(manifest["dim"])
+    kwargs = {}
+    if VectorDBFactory.get(db_type).supports_sparse:
+        kwargs["use_hybrid"] = use_hybrid
+    if name:
+        kwargs["index_name" if db_type == "azure" else "collection_name"] = name
+    db = VectorDBFactory.create(db_type, **kwargs)
+
+    upsert_kwargs = {}
+    if batch_size:
+        upsert_kwargs["batch_size"] = batch_size
+    if parallel:
+        upsert_kwargs["parallel"] = parallel
+
+    try:
+        # Retrieval services in other processes drop cached results for the loaded collection
+        async with RemoteCacheInvalidator(), db:
+            # Build the HNSW index once at the end instead of continuously during the upload
+            await db.begin_bulk_load()
+            try:
+                total = await load_shards(directory, db, **upsert_kwargs)
+            finally:
+                await db.finish_bulk_load()
+        print(f"✅ Loaded {total} documents")
+    except Exception as e:
+        print(f"❌ Load failed: {e}")
+    finally:
+        await ClientRegistry.close_all()
+
+async def export(directory: str, collection_name: str, shard_size: int = None, db_type: str = "qdrant"):
+    from src.db import VectorDBFactory, ClientRegistry
+    from src.shards import export_shards
+
+    print(f"\n--- Exporting {db_type} collection '{collection_name}' to {directory} ---")
+    db = VectorDBFactory.create(db_type, collection_name=collection_name)
+    try:
+        total = await export_shards(db, directory, shard_size=shard_size)
+        print(f"✅ Exported {total} documents")
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+    finally:
+        await ClientRegistry.close_all()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk load or export pre-embedded shards "
+                                                 "(create them with: python ingestion_pipeline.py doc.pdf --to_shards DIR)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = subparsers.add_parser("load", help="Load a shard directory into a vector DB")
+    load_parser.add_argument("directory", help="Shard directory")
+    load_parser.add_argument("--db_type", default=os.getenv("VECTOR_DB_TYPE", "qdrant"), help="Target vector DB")
+    load_parser.add_argument("--name", help="Target collection/index (adapter default if omitted)")
+    load_parser.add_argument("--batch_size", type=int, help="Documents per upsert request")
+    load_parser.add_argument("--parallel", type=int, help="Upsert requests in flight")
+
+    export_parser = subparsers.add_parser("export", help="Export a Qdrant or local collection to shards")
+    export_parser.add_argument("directory", help="Shard directory")
+    export_parser.add_argument("--db_type", choices=["qdrant", "local"], default="qdrant", help="Source vector DB")
+    export_parser.add_argument("--collection", default="rag_collection", help="Collection (or Qdrant alias)")
+    export_parser.add_argument("--shard_size", type=int, help="Rows per shard")
+
+    args = parser.parse_args()
+    if args.command == "load":
+        await load(args.directory, args.db_type, args.name, args.batch_size, args.parallel)
+    else:
+        await export(args.directory, args.collection, args.shard_size, args.db_type)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+import os
+import asyncio
+from typing import Hashable, List, Optional, Set
+from src.db.events import UpsertEvents
+from src.utils.logger import logger
+
+
+def collection_name(collection_id: Hashable) -> str:
+    """
+    Process-independent name of a collection id (BaseVectorDB.collection_ids): the
+    collection/index name, or the store path for the local adapter. Endpoint URLs are
+    left out because writers and the service may reach the same server under different names.
+    """
+    return str(collection_id[-1]) if isinstance(collection_id, tuple) else str(collection_id)
+
+
+class RemoteCacheInvalidator:
+    """
+    Tells retrieval services (POST /invalidate on retrieval_service.py) which collections this
+    process wrote to, so their per-process semantic caches drop results served from before the write.
+
+    UpsertEvents only reach subscribers in the same process; ingestion, reindex and shard loads run
+    as separate processes, so they wrap their writes in this:
+
+        async with RemoteCacheInvalidator():
+            await db.upsert(documents)
+
+    Written collections are collected while the block runs and sent once on exit, including
+    after a failure (the documents written before it are already visible). Delivery is best
+    effort: an unreachable service is logged and keeps serving until SEMANTIC_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, urls: Optional[List[str]] = None, token: Optional[str] = None, timeout: float = 5.0):
+        """
+        Args:
+            urls: Retrieval service base URLs. If None, reads comma-separated RETRIEVAL_SERVICE_URLS
+                from env (unset disables notification).
+            token: Bearer token the services expect. If None, reads SERVICE_ADMIN_TOKEN from env.
+            timeout: Seconds to wait for each service
+        """
+        if urls is None:
+            urls = [url.strip() for url in os.getenv("RETRIEVAL_SERVICE_URLS", "").split(",") if url.strip()]
+        self.urls = urls
+        self.token = token if token is not None else os.getenv("SERVICE_ADMIN_TOKEN", "")
+        self.timeout = timeout
+        self.changed: Set[str] = set()
+
+    def _on_collection_changed(self, collection_id: Hashable):
+        self.changed.add(collection_name(collection_id))
+
+    async def __aenter__(self):
+        UpsertEvents.subscribe(self._on_collection_changed)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        UpsertEvents.unsubscribe(self._on_collection_changed)
+        await self.flush()
+
+    async def flush(self):
+        """Send the collections written so far to every service"""
+        collections, self.changed = sorted(self.changed), set()
+        if not collections or not self.urls:
+            return
+        if not self.token:
+            logger.warning("RETRIEVAL_SERVICE_URLS is set but SERVICE_ADMIN_TOKEN is not; skipping cache invalidation")
+            return
+
+        import aiohttp
+        headers = {"Authorization": f"Bearer {self.token}"}
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout), headers=headers) as session:
+            async def notify(url: str):
+                try:
+                    async with session.post(f"{url.rstrip('/')}/invalidate", json={"collections": collections}) as response:
+                        if response.status != 200:
+                            raise RuntimeError(f"HTTP {response.status}: {await response.text()}")
+                    logger.info(f"Invalidated semantic cache of {url} for {collections}")
+                except Exception as e:
+                    logger.warning(f"Cache invalidation at {url} failed ({e}); its cached results expire after their TTL")
+
+            await asyncio.gather(*[notify(url) for url in self.urls])
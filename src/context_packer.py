@@ -0,0 +1,235 @@
+import os
+import re
+import math
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from src.models import Document
+from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
+
+# Sentence ends (., ! or ? followed by whitespace) and paragraph breaks
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+# Used when tiktoken is not installed: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Smallest hard-truncated fragment worth including when no whole sentence of a document fits
+MIN_FRAGMENT_TOKENS = 8
+
+
+class PackedSource(BaseModel):
+    """How much of one retrieved document made it into the context"""
+    id: str
+    source: str
+    score: Optional[float] = None
+    tokens: int
+    sentences: int
+    duplicate_sentences: int
+    truncated: bool
+
+
+class PackedContext(BaseModel):
+    """Prompt-ready context with token accounting"""
+    text: str
+    sources: List[PackedSource]
+    tokens: int  # Tokens of text
+    budget: int
+    input_tokens: int  # Tokens of all retrieved documents before packing
+    duplicate_sentences: int  # Sentences dropped because an earlier document already had them
+    dropped_documents: int  # Documents with nothing left after dedup and the budget
+    tokenizer: str
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.input_tokens - self.tokens)
+
+
+def _split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+def _dedup_key(sentence: str) -> str:
+    """Case, whitespace and punctuation insensitive form, so re-chunked copies of a sentence match"""
+    text = unicodedata.normalize("NFKC", sentence).lower()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+class ContextPacker:
+    """
+    Packs retrieved parent documents into a token budget for the generation prompt.
+
+    Documents are taken best score first. Sentences already included from a better-ranked
+    document are dropped (overlapping parents repeat each other), each document is cut at a
+    sentence boundary when it no longer fits (or at a word boundary when not even its first
+    sentence does), and no source (file) may take more than max_source_share of the budget
+    while other sources still have text to add. Whatever budget is left after that goes to
+    the capped sources, so a single-source result can still use all of it.
+    """
+
+    def __init__(self, max_tokens: int = None, max_source_share: float = None, encoding: str = None,
+                 include_headers: bool = True, separator: str = "\n\n"):
+        """
+        Args:
+            max_tokens: Token budget for the packed context. If None, reads CONTEXT_MAX_TOKENS from env (default 3000).
+            max_source_share: Fraction of the budget one source may take. If None, reads
+                CONTEXT_MAX_SOURCE_SHARE from env (default 0.5; 1 disables the cap).
+            encoding: tiktoken encoding for token counts. If None, reads CONTEXT_TOKENIZER from env
+                (default cl100k_base). Without tiktoken installed, tokens are estimated as characters / 4.
+            include_headers: Prefix each document with "[n] source, page p" so answers can cite it
+            separator: Text between documents
+        """
+        self.max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+        self.max_source_share = max_source_share or float(os.getenv("CONTEXT_MAX_SOURCE_SHARE", "0.5"))
+        self.include_headers = include_headers
+        self.separator = separator
+        if not 0 < self.max_source_share <= 1:
+            raise ValueError(f"max_source_share must be in (0, 1], got {self.max_source_share}")
+
+        encoding = encoding or os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+        self._count_tokens, self.tokenizer = self._load_tokenizer(encoding)
+        logger.info(f"Initialized ContextPacker (max_tokens={self.max_tokens}, max_source_share={self.max_source_share}, "
+                    f"tokenizer={self.tokenizer})")
+
+    @staticmethod
+    def _load_tokenizer(encoding: str) -> Tuple[Callable[[str], int], str]:
+        try:
+            import tiktoken
+            encoder = tiktoken.get_encoding(encoding)
+            return (lambda text: len(encoder.encode(text, disallowed_special=()))), f"tiktoken:{encoding}"
+        except ImportError:
+            logger.warning("tiktoken not installed; estimating tokens as characters / 4")
+        except Exception as e:
+            # Unknown encoding, or the BPE file could not be downloaded (offline)
+            logger.warning(f"tiktoken encoding '{encoding}' unavailable ({e}); estimating tokens as characters / 4")
+        return (lambda text: math.ceil(len(text) / CHARS_PER_TOKEN)), "chars/4"
+
+    def _truncate(self, text: str, max_tokens: int) -> Optional[str]:
+        """Longest word prefix of text within max_tokens, or None if that leaves too little to be useful"""
+        if max_tokens < MIN_FRAGMENT_TOKENS:
+            return None
+        words = text.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low]) if low else None
+
+    def count_tokens(self, text: str) -> int:
+        return self._count_tokens(text)
+
+    @staticmethod
+    def _source(doc: Document) -> str:
+        return doc.metadata.source_filename or str(doc.id)
+
+    def _header(self, index: int, doc: Document) -> str:
+        page = f", page {doc.metadata.page_number}" if doc.metadata.page_number is not None else ""
+        return f"[{index}] {self._source(doc)}{page}"
+
+    @time_execution
+    def pack(self, documents: List[Document]) -> PackedContext:
+        """
+        Pack documents (e.g. RAGClient.retrieve results) into the token budget
+
+        Args:
+            documents: Retrieved documents; ranked by score when scores are set, else kept in order
+
+        Returns:
+            PackedContext with the prompt text, per-source accounting and token totals
+        """
+        ranked = sorted(documents, key=lambda doc: -doc.score) if all(doc.score is not None for doc in documents) else list(documents)
+        separator_tokens = self.count_tokens(self.separator)
+        source_cap = int(self.max_tokens * self.max_source_share)
+
+        # Header width is bounded by the largest index, so the estimate holds whatever number a block gets
+        header_tokens = lambda doc: separator_tokens + (
+            self.count_tokens(self._header(len(ranked), doc)) + 1 if self.include_headers else 0)
+
+        candidates = []  # (doc, sentences, dedup keys, sentence tokens)
+        input_tokens = 0
+        for doc in ranked:
+            input_tokens += self.count_tokens(doc.content)
+            sentences = _split_sentences(doc.content)
+            candidates.append((doc, sentences, [_dedup_key(sentence) for sentence in sentences],
+                               [self.count_tokens(sentence) + 1 for sentence in sentences]))
+
+        # Sentences are deduplicated against what was actually emitted, so a copy in a lower-ranked
+        # document still counts when the better-ranked one was cut before it
+        emitted_keys = set()
+        emitted: List[List[str]] = [[] for _ in candidates]
+        position = [0] * len(candidates)
+        duplicates = [0] * len(candidates)
+        doc_tokens = [0] * len(candidates)
+        cut = [False] * len(candidates)  # Ends in a hard-truncated fragment
+        source_tokens: Dict[str, int] = {}
+        used = 0
+
+        def fill(capped: bool, final: bool):
+            nonlocal used
+            for i, (doc, sentences, keys, sentence_tokens) in enumerate(candidates):
+                source = self._source(doc)
+                while position[i] < len(sentences) and not cut[i]:
+                    if keys[position[i]] in emitted_keys:
+                        duplicates[i] += 1
+                        position[i] += 1
+                        continue
+                    # Opening a document also costs its header and the separator before it
+                    opening = 0 if emitted[i] else header_tokens(doc)
+                    available = self.max_tokens - used
+                    if capped:
+                        available = min(available, source_cap - source_tokens.get(source, 0))
+                    sentence = sentences[position[i]]
+                    cost = sentence_tokens[position[i]] + opening
+                    if cost > available:
+                        if not (final and not emitted[i]):
+                            break
+                        # Not even one whole sentence fits (tables, unpunctuated pages): keep what does
+                        sentence = self._truncate(sentence, available - opening - 1)
+                        if sentence is None:
+                            break
+                        cost = self.count_tokens(sentence) + 1 + opening
+                        cut[i] = True
+                    else:
+                        emitted_keys.add(keys[position[i]])
+                        position[i] += 1
+                    emitted[i].append(sentence)
+                    doc_tokens[i] += cost
+                    source_tokens[source] = source_tokens.get(source, 0) + cost
+                    used += cost
+
+        # With the per-source cap first, then the leftover budget without it
+        fill(capped=self.max_source_share < 1, final=self.max_source_share >= 1)
+        if self.max_source_share < 1:
+            fill(capped=False, final=True)
+
+        blocks = []
+        sources = []
+        for i, (doc, sentences, keys, _) in enumerate(candidates):
+            if not emitted[i]:
+                continue
+            body = " ".join(emitted[i])
+            blocks.append(f"{self._header(len(blocks) + 1, doc)}\n{body}" if self.include_headers else body)
+            truncated = cut[i] or any(key not in emitted_keys for key in keys[position[i]:])
+            sources.append(PackedSource(
+                id=str(doc.id), source=self._source(doc), score=doc.score, tokens=doc_tokens[i],
+                sentences=len(emitted[i]), duplicate_sentences=duplicates[i], truncated=truncated
+            ))
+
+        text = self.separator.join(blocks)
+        packed = PackedContext(
+            text=text,
+            sources=sources,
+            tokens=self.count_tokens(text),
+            budget=self.max_tokens,
+            input_tokens=input_tokens,
+            duplicate_sentences=sum(duplicates),
+            dropped_documents=len(candidates) - len(sources),
+            tokenizer=self.tokenizer
+        )
+        set_attributes(documents=len(documents), packed_documents=len(sources), input_tokens=input_tokens,
+                       tokens=packed.tokens, budget=self.max_tokens, duplicate_sentences=packed.duplicate_sentences)
+        logger.info(f"Packed {len(sources)}/{len(documents)} documents into {packed.tokens}/{self.max_tokens} tokens "
+                    f"(from {input_tokens}, {packed.duplicate_sentences} duplicate sentences removed)")
+        return packed
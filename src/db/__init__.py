@@ -1,6 +1,23 @@
+import importlib
 from .base import BaseVectorDB
-from .qdrant_adapter import QdrantAdapter
-from .azure_adapter import AzureAdapter
 from .factory import VectorDBFactory
+from .client_registry import ClientRegistry
+from .partitioned import PartitionedVectorDB
+from .index_profiles import IndexProfile, INDEX_PROFILES, get_index_profile, register_index_profile
 
-__all__ = ['BaseVectorDB', 'QdrantAdapter', 'AzureAdapter', 'VectorDBFactory']
+# Adapters pull in their vendor SDKs (qdrant-client, azure-search-documents),
+# so they are only imported when accessed
+_LAZY_CLASSES = {
+    'QdrantAdapter': '.qdrant_adapter',
+    'AzureAdapter': '.azure_adapter',
+    'LocalAdapter': '.local_adapter',
+}
+
+def __getattr__(name):
+    if name in _LAZY_CLASSES:
+        module = importlib.import_module(_LAZY_CLASSES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['BaseVectorDB', 'QdrantAdapter', 'AzureAdapter', 'LocalAdapter', 'VectorDBFactory', 'ClientRegistry', 'PartitionedVectorDB',
+           'IndexProfile', 'INDEX_PROFILES', 'get_index_profile', 'register_index_profile']
@@ -1,36 +1,83 @@
 import os
+import json
+import random
 import asyncio
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator, Awaitable, Callable, TypeVar
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.indexes.aio import SearchIndexClient
 from azure.search.documents.indexes.models import (
     SearchIndex,
+    SearchAlias,
     SimpleField,
     SearchableField,
     SearchField,
     VectorSearch,
     HnswAlgorithmConfiguration,
+    HnswParameters,
     VectorSearchProfile
 )
 from azure.search.documents.models import VectorizedQuery
 from src.models import Document, DocMetadata
+from src.filters import Filters, parse_filter, to_odata
 from src.db.base import BaseVectorDB
 from src.db.factory import VectorDBFactory
+from src.db.client_registry import ClientRegistry
+from src.db.events import UpsertEvents
+from src.db.index_profiles import get_index_profile
 from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
+
+T = TypeVar("T")
+
+# Azure AI Search accepts at most 1000 documents / 16 MB per indexing request
+MAX_BATCH_DOCUMENTS = 1000
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+# Per-document (IndexingResult) and request-level statuses worth retrying
+RETRYABLE_STATUS_CODES = {409, 422, 429, 500, 502, 503, 504}
+
+# Ranges Azure AI Search accepts for HNSW parameters
+HNSW_M_RANGE = (4, 10)
+HNSW_EF_RANGE = (100, 1000)
+
+def _clamp(value: Optional[int], bounds: tuple, name: str) -> Optional[int]:
+    if value is None:
+        return None
+    clamped = min(max(value, bounds[0]), bounds[1])
+    if clamped != value:
+        logger.warning(f"Azure AI Search HNSW {name} must be in {bounds[0]}-{bounds[1]}; using {clamped} instead of {value}")
+    return clamped
 
 
 @VectorDBFactory.register("azure")
 class AzureAdapter(BaseVectorDB):
-    def __init__(self, index_name: str = "rag-index"):
+    def __init__(self, index_name: str = "rag-index", index_profile: str = None, group_overfetch: Optional[int] = None):
+        """
+        Args:
+            index_name: Azure AI Search index
+            index_profile: HNSW settings for indexes this adapter creates (see src.db.index_profiles).
+                If None, reads INDEX_PROFILE from env.
+            group_overfetch: Hits fetched per requested group for grouped searches (Azure has no
+                server-side grouping). If None, reads AZURE_GROUP_OVERFETCH from env (default 3).
+        """
         self.endpoint = os.getenv("AZURE_SEARCH_ENDPOINT")
         self.api_key = os.getenv("AZURE_SEARCH_API_KEY")
         self.index_name = index_name
+        self.index_profile = get_index_profile(index_profile)
         self.credential = AzureKeyCredential(self.api_key)
         self._client = None
         self._index_client = None
         
-        logger.info(f"Initialized AzureAdapter for index '{index_name}'")
+        # Bulk upload tuning
+        self.upload_parallel = int(os.getenv("AZURE_UPLOAD_PARALLEL", "4"))
+        self.max_retries = int(os.getenv("AZURE_UPLOAD_RETRIES", "3"))
+        self.retry_backoff = 0.5
+        
+        self.group_overfetch = group_overfetch or int(os.getenv("AZURE_GROUP_OVERFETCH", "3"))
+        
+        logger.info(f"Initialized AzureAdapter for index '{index_name}' (index_profile={self.index_profile.name})")
 
     async def __aenter__(self):
         """Async context manager entry"""
@@ -38,123 +85,320 @@ class AzureAdapter(BaseVectorDB):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit - cleanup clients"""
+        """Async context manager exit - release the shared clients"""
         if self._client:
-            await self._client.close()
+            self._client = None
+            await ClientRegistry.release(self._client_key)
         if self._index_client:
-            await self._index_client.close()
-        logger.debug("Azure clients closed")
+            self._index_client = None
+            await ClientRegistry.release(self._index_client_key)
+        logger.debug("Azure clients released")
+
+    @property
+    def _client_key(self):
+        return ("azure-search", self.endpoint, self.api_key, self.index_name)
+
+    @property
+    def _index_client_key(self):
+        return ("azure-index", self.endpoint, self.api_key)
+
+    @property
+    def _schema_key(self):
+        return ("azure", self.endpoint, self.index_name)
 
     async def _get_client(self) -> SearchClient:
-        """Lazy initialize async search client"""
+        """Lazy acquire the shared async search client for this index"""
         if self._client is None:
-            await self._ensure_index()
-            self._client = SearchClient(
+            if not ClientRegistry.is_known(self._schema_key):
+                await self._ensure_index()
+                ClientRegistry.mark_known(self._schema_key)
+            self._client = ClientRegistry.acquire(self._client_key, lambda: SearchClient(
                 endpoint=self.endpoint,
                 index_name=self.index_name,
                 credential=self.credential
-            )
+            ))
         return self._client
 
-    async def _ensure_index(self):
+    async def _with_index(self, operation: Callable[[SearchClient], Awaitable[T]]) -> T:
+        """
+        Run operation(client). The index check is cached per process, so if the index was
+        deleted since (reset_db.py, reindex garbage collection), recreate it and run once more.
+        """
+        client = await self._get_client()
+        try:
+            return await operation(client)
+        except ResourceNotFoundError:
+            pass
+        logger.warning(f"Index '{self.index_name}' not found; recreating it")
+        await ClientRegistry.reensure(self._schema_key, self._ensure_index)
+        return await operation(client)
+
+    def _get_index_client(self) -> SearchIndexClient:
         if self._index_client is None:
-            self._index_client = SearchIndexClient(
+            self._index_client = ClientRegistry.acquire(self._index_client_key, lambda: SearchIndexClient(
                 endpoint=self.endpoint, 
                 credential=self.credential
-            )
+            ))
+        return self._index_client
+
+    async def warm_up(self):
+        """Open the pooled connection, check the index and keep the client for the process lifetime"""
+        client = await self._get_client()
+        ClientRegistry.pin(self._client_key)
+        await client.get_document_count()
+        logger.info(f"Azure client warmed up for index '{self.index_name}'")
+
+    async def _ensure_index(self):
+        index_client = self._get_index_client()
         
-        # Check if index exists
-        index_names = [i.name async for i in self._index_client.list_indexes()]
+        # Check if index exists (single lookup instead of listing every index)
+        try:
+            await index_client.get_index(self.index_name)
+            return
+        except ResourceNotFoundError:
+            pass
         
-        if self.index_name not in index_names:
-            logger.info(f"Creating index {self.index_name}...")
-            
-            # Define Index
-            vector_size = int(os.getenv("VECTOR_SIZE", "1536"))
-            fields = [
-                SimpleField(name="id", type="Edm.String", key=True),
-                SearchableField(name="content", type="Edm.String"),
-                SearchField(name="embedding", type="Collection(Edm.Single)", vector_search_dimensions=vector_size, vector_search_profile_name="my-vector-config"),
-                SimpleField(name="source_type", type="Edm.String", filterable=True),
-                SimpleField(name="product", type="Edm.String", filterable=True),
-                SimpleField(name="content_type", type="Edm.String", filterable=True),
-                SimpleField(name="created_at", type="Edm.DateTimeOffset", filterable=True),
-                SimpleField(name="page_number", type="Edm.Int32", filterable=True),
-                SimpleField(name="source_filename", type="Edm.String", filterable=True),
-                SimpleField(name="parent_id", type="Edm.String", filterable=True),
-                SearchableField(name="parent_text", type="Edm.String"),
-            ]
-            
-            vector_search = VectorSearch(
-                profiles=[VectorSearchProfile(name="my-vector-config", algorithm_configuration_name="my-hnsw")],
-                algorithms=[HnswAlgorithmConfiguration(name="my-hnsw")]
+        # index_name may be an alias (see reindex.py); its target is managed by the reindex
+        if await self.resolve_alias(self.index_name) is not None:
+            return
+        
+        logger.info(f"Creating index {self.index_name}...")
+        
+        # Define Index
+        vector_size = int(os.getenv("VECTOR_SIZE", "1536"))
+        fields = [
+            SimpleField(name="id", type="Edm.String", key=True),
+            SearchableField(name="content", type="Edm.String"),
+            SearchField(name="embedding", type="Collection(Edm.Single)", vector_search_dimensions=vector_size, vector_search_profile_name="my-vector-config"),
+            SimpleField(name="source_type", type="Edm.String", filterable=True),
+            SimpleField(name="product", type="Edm.String", filterable=True),
+            SimpleField(name="content_type", type="Edm.String", filterable=True),
+            SimpleField(name="created_at", type="Edm.DateTimeOffset", filterable=True),
+            SimpleField(name="page_number", type="Edm.Int32", filterable=True),
+            SimpleField(name="source_filename", type="Edm.String", filterable=True),
+            SimpleField(name="parent_id", type="Edm.String", filterable=True),
+            SearchableField(name="parent_text", type="Edm.String"),
+        ]
+        
+        # Azure has no on-disk or deferred-indexing settings; only the graph parameters apply
+        profile = self.index_profile
+        hnsw_parameters = None
+        if any(value is not None for value in (profile.m, profile.ef_construct, profile.ef_search)):
+            hnsw_parameters = HnswParameters(
+                m=_clamp(profile.m, HNSW_M_RANGE, "m"),
+                ef_construction=_clamp(profile.ef_construct, HNSW_EF_RANGE, "ef_construct"),
+                ef_search=_clamp(profile.ef_search, HNSW_EF_RANGE, "ef_search"),
+                metric="cosine"
             )
-            
-            index = SearchIndex(name=self.index_name, fields=fields, vector_search=vector_search)
-            await self._index_client.create_index(index)
-            logger.info(f"Index {self.index_name} created.")
+        vector_search = VectorSearch(
+            profiles=[VectorSearchProfile(name="my-vector-config", algorithm_configuration_name="my-hnsw")],
+            algorithms=[HnswAlgorithmConfiguration(name="my-hnsw", parameters=hnsw_parameters)]
+        )
+        
+        index = SearchIndex(name=self.index_name, fields=fields, vector_search=vector_search)
+        await index_client.create_index(index)
+        logger.info(f"Index {self.index_name} created.")
 
-    @time_execution
-    async def upsert(self, documents: List[Document], batch_size: int = 50):
+    async def count(self) -> int:
         client = await self._get_client()
-        
+        return await client.get_document_count()
+
+    async def list_collections(self) -> List[str]:
+        return [name async for name in self._get_index_client().list_index_names()]
+
+    async def exists(self) -> bool:
+        try:
+            await self._get_index_client().get_index(self.index_name)
+            return True
+        except ResourceNotFoundError:
+            return await self.resolve_alias(self.index_name) is not None
+
+    async def resolve_alias(self, alias: str) -> Optional[str]:
+        try:
+            search_alias = await self._get_index_client().get_alias(alias)
+        except ResourceNotFoundError:
+            return None
+        return search_alias.indexes[0] if search_alias.indexes else None
+
+    async def point_alias(self, alias: str):
+        """
+        Point alias at this index. Alias updates are atomic on the service, so
+        clients searching through the alias switch over without a gap.
+        """
+        await self._get_client()
+        previous = await self.resolve_alias(alias)
+        await self._get_index_client().create_or_update_alias(SearchAlias(name=alias, indexes=[self.index_name]))
+        UpsertEvents.publish(("azure", self.endpoint, alias))
+        logger.info(f"Alias '{alias}' now points to '{self.index_name}' (was '{previous}')")
+
+    async def delete_collection(self, name: str):
+        await self._get_index_client().delete_index(name)
+        ClientRegistry.forget(("azure", self.endpoint, name))
+        UpsertEvents.publish(("azure", self.endpoint, name))
+        logger.info(f"Deleted index '{name}'")
+
+    def _to_item(self, doc: Document) -> Dict[str, Any]:
+        # Azure Search expects a flat dictionary
+        # Note: sparse_embedding is ignored for Azure
+        return {
+            "id": str(doc.id),
+            "content": doc.content,
+            "embedding": doc.embedding,
+            **doc.metadata.model_dump()
+        }
+
+    def _iter_batches(self, documents: List[Document], batch_size: int, max_bytes: int) -> Iterator[List[Dict[str, Any]]]:
+        """Group documents into batches bounded by document count and serialised size"""
         batch = []
+        batch_bytes = 0
         for doc in documents:
             if not doc.embedding:
                 continue
-                
-            # Azure Search expects a flat dictionary
-            # Note: sparse_embedding is ignored for Azure
-            item = {
-                "id": str(doc.id),
-                "content": doc.content,
-                "embedding": doc.embedding,
-                **doc.metadata.model_dump()
-            }
+            item = self._to_item(doc)
+            size = len(json.dumps(item, default=str).encode("utf-8"))
+            if batch and (len(batch) >= batch_size or batch_bytes + size > max_bytes):
+                yield batch
+                batch = []
+                batch_bytes = 0
             batch.append(item)
-                
+            batch_bytes += size
         if batch:
-            await client.upload_documents(documents=batch)
-            logger.debug(f"Uploaded final batch of {len(batch)} documents")
+            yield batch
+
+    async def _upload_batch(self, client: SearchClient, batch: List[Dict[str, Any]], mode: str) -> List[str]:
+        """
+        Upload one batch, retrying only the keys that failed transiently.
+        
+        Returns:
+            Keys that failed permanently
+        """
+        send = client.merge_or_upload_documents if mode == "merge_or_upload" else client.upload_documents
+        pending = batch
+        
+        for attempt in range(self.max_retries + 1):
+            delay = self.retry_backoff * (2 ** attempt) * (1 + random.random())
+            try:
+                results = await send(documents=pending)
+            except HttpResponseError as e:
+                if attempt == self.max_retries or e.status_code not in RETRYABLE_STATUS_CODES:
+                    raise
+                logger.warning(f"Upload of {len(pending)} documents failed ({e.status_code}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            
+            retry_keys = set()
+            failed_keys = []
+            for result in results:
+                if result.succeeded:
+                    continue
+                if result.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    retry_keys.add(result.key)
+                else:
+                    logger.error(f"Document '{result.key}' failed to index ({result.status_code}): {result.error_message}")
+                    failed_keys.append(result.key)
+            
+            if not retry_keys:
+                return failed_keys
+            
+            logger.warning(f"{len(retry_keys)}/{len(pending)} documents failed transiently; retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            pending = [item for item in pending if item["id"] in retry_keys]
+            await asyncio.sleep(delay)
+        
+        return [item["id"] for item in pending]
 
     @time_execution
-    async def search(self, query_vector: List[float], limit: int = 5, filters: Optional[Dict] = None, 
-               sparse_query_vector: Optional[dict] = None, search_text: Optional[str] = None) -> List[Document]:
+    async def upsert(self, documents: List[Document], batch_size: int = 500, max_batch_bytes: int = MAX_BATCH_BYTES,
+                     parallel: Optional[int] = None, mode: str = "upload"):
+        """
+        Upload documents in size-aware batches, several requests in flight at once
+        
+        Args:
+            documents: Documents with embeddings
+            batch_size: Max documents per request (capped at Azure's 1000)
+            max_batch_bytes: Max serialised bytes per request (capped at Azure's 16 MB)
+            parallel: Max in-flight requests (defaults to AZURE_UPLOAD_PARALLEL)
+            mode: "upload" (replace) or "merge_or_upload" (merge fields into existing documents)
+        """
+        if mode not in ("upload", "merge_or_upload"):
+            raise ValueError(f"Unknown upload mode '{mode}'. Use 'upload' or 'merge_or_upload'.")
+        
+        await self._get_client()
+        batch_size = min(batch_size, MAX_BATCH_DOCUMENTS)
+        max_batch_bytes = min(max_batch_bytes, MAX_BATCH_BYTES)
+        parallel = max(1, parallel or self.upload_parallel)
+        semaphore = asyncio.Semaphore(parallel)
+        set_attributes(index=self.index_name, documents=len(documents), parallel=parallel, mode=mode)
+        
+        async def send(batch: List[Dict[str, Any]]) -> List[str]:
+            try:
+                return await self._with_index(lambda client: self._upload_batch(client, batch, mode))
+            finally:
+                semaphore.release()
+        
+        tasks = []
+        total = 0
+        try:
+            for batch in self._iter_batches(documents, batch_size, max_batch_bytes):
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(send(batch)))
+                total += len(batch)
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        # Publish before reporting failures: the successful documents are already visible
+        UpsertEvents.publish(self._schema_key)
+        failed_keys = [key for keys in results for key in keys]
+        if failed_keys:
+            raise RuntimeError(f"{len(failed_keys)}/{total} documents failed to index: {failed_keys[:10]}")
+        logger.info(f"Uploaded {total} documents in {len(tasks)} batches (parallel={parallel}, mode={mode})")
+
+    @time_execution
+    async def search(self, query_vector: List[float], limit: int = 5, filters: Optional[Filters] = None, 
+               sparse_query_vector: Optional[dict] = None, search_text: Optional[str] = None,
+               group_by: Optional[str] = None, hnsw_ef: Optional[int] = None, exact: bool = False) -> List[Document]:
         """
         Search using Azure AI Search
         
         Args:
             query_vector: Dense embedding vector
-            limit: Number of results
-            filters: Metadata filters
+            limit: Number of results (number of groups when group_by is set)
+            filters: Metadata filter (FilterExpr or its dict form, see src.filters), compiled to OData
             sparse_query_vector: Ignored for Azure (Qdrant-specific)
             search_text: Optional query text for hybrid search (BM25 + vector)
+            group_by: Field to group by. Azure has no grouping, so this over-fetches
+                group_overfetch x limit hits in the same request and keeps the best per group.
+            hnsw_ef: Ignored (Azure sets efSearch per index, from the index profile)
+            exact: If True, run an exhaustive kNN query instead of using the HNSW graph
             
         Returns:
             List of matching documents
         """
         # Note: sparse_query_vector is ignored - Azure uses search_text for hybrid search
         
-        client = await self._get_client()
-        
-        # Construct OData filter
-        odata_filter = None
-        if filters:
-            conditions = []
-            for key, value in filters.items():
-                # Simple equality check for now
-                conditions.append(f"{key} eq '{value}'")
-            odata_filter = " and ".join(conditions)
-
-        results = await client.search(
-            search_text=search_text,
-            vector_queries=[VectorizedQuery(vector=query_vector, k_nearest_neighbors=limit, fields="embedding")],
-            filter=odata_filter,
-            top=limit
-        )
+        # Escaped OData filter (memoised per expression)
+        expr = parse_filter(filters)
+        odata_filter = to_odata(expr) if expr is not None else None
+
+        top = limit * self.group_overfetch if group_by else limit
+        set_attributes(index=self.index_name, limit=limit, top=top, filter=odata_filter,
+                       hybrid=search_text is not None, group_by=group_by, exact=exact)
+
+        async def fetch(client: SearchClient) -> List[Dict[str, Any]]:
+            # Results are paged lazily, so a missing index surfaces while iterating
+            results = await client.search(
+                search_text=search_text,
+                vector_queries=[VectorizedQuery(vector=query_vector, k_nearest_neighbors=top, fields="embedding",
+                                                exhaustive=exact or None)],
+                filter=odata_filter,
+                top=top
+            )
+            return [result async for result in results]
         
         documents = []
-        async for result in results:
+        for result in await self._with_index(fetch):
             content = result.pop('content')
             embedding = result.pop('embedding', None)
             id_ = result.pop('id')
@@ -173,5 +417,9 @@ class AzureAdapter(BaseVectorDB):
                 score=score
             ))
             
+        if group_by:
+            documents = self.collapse_groups(documents, group_by, limit)
+            
+        set_attributes(hits=len(documents))
         logger.info(f"Found {len(documents)} results.")
         return documents
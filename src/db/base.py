@@ -1,8 +1,13 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, AsyncIterator, Set, Hashable
 from src.models import Document
+from src.filters import Filters
 
 class BaseVectorDB(ABC):
+    # Whether the adapter stores sparse vectors (and takes use_hybrid)
+    supports_sparse: bool = False
+
     @abstractmethod
     async def upsert(self, documents: List[Document], **kwargs):
         """
@@ -15,18 +20,139 @@ class BaseVectorDB(ABC):
         self, 
         query_vector: List[float], 
         limit: int = 5, 
-        filters: Optional[Dict] = None,
+        filters: Optional[Filters] = None,
         sparse_query_vector: Optional[dict] = None,  # For Qdrant hybrid search
-        search_text: Optional[str] = None  # For Azure hybrid search
+        search_text: Optional[str] = None,  # For Azure hybrid search
+        group_by: Optional[str] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False
     ) -> List[Document]:
         """
         Search for similar documents.
         
         Args:
             query_vector: Dense embedding vector
-            limit: Number of results
-            filters: Metadata filters
+            limit: Number of results (number of groups when group_by is set)
+            filters: Metadata filter: a src.filters.FilterExpr or its dict form (see parse_filter)
             sparse_query_vector: Sparse BM25 vector for Qdrant hybrid search (ignored by Azure)
             search_text: Query text for Azure hybrid search (ignored by Qdrant)
+            group_by: Payload field to group by; returns the best hit of each of
+                the top `limit` distinct values (e.g. "parent_id")
+            hnsw_ef: Per-query HNSW search beam width, overriding the index profile's ef_search
+                (ignored by backends without per-query ef)
+            exact: If True, bypass the ANN index and score every candidate (exact kNN)
         """
         pass
+
+    async def search_many(
+        self,
+        query_vectors: List[List[float]],
+        limit: int = 5,
+        filters: Optional[Filters] = None,
+        sparse_query_vectors: Optional[List[Optional[dict]]] = None,
+        search_texts: Optional[List[Optional[str]]] = None,
+        group_by: Optional[str] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False
+    ) -> List[List[Document]]:
+        """
+        Search for several queries at once. Results are returned in query order.
+        
+        The default implementation issues the searches concurrently; adapters
+        with a native batch endpoint override it.
+        
+        Args:
+            query_vectors: Dense embedding vector per query
+            limit: Number of results per query
+            filters: Metadata filters applied to every query
+            sparse_query_vectors: Optional sparse vector per query
+            search_texts: Optional query text per query
+            group_by: Payload field to group by (see search)
+            hnsw_ef: Per-query HNSW beam width (see search)
+            exact: If True, run exact kNN (see search)
+        """
+        count = len(query_vectors)
+        sparse_query_vectors = sparse_query_vectors or [None] * count
+        search_texts = search_texts or [None] * count
+        return list(await asyncio.gather(*[
+            self.search(query_vector, limit=limit, filters=filters,
+                        sparse_query_vector=sparse_query_vector, search_text=search_text, group_by=group_by,
+                        hnsw_ef=hnsw_ef, exact=exact)
+            for query_vector, sparse_query_vector, search_text in zip(query_vectors, sparse_query_vectors, search_texts)
+        ]))
+
+    @staticmethod
+    def collapse_groups(documents: List[Document], group_by: str, limit: int) -> List[Document]:
+        """
+        Keep the best-ranked document per distinct metadata value, up to `limit` groups.
+        Used by adapters without native grouping after over-fetching.
+        """
+        seen = set()
+        collapsed = []
+        for doc in documents:
+            value = getattr(doc.metadata, group_by, None)
+            if value is None or value in seen:
+                continue
+            seen.add(value)
+            collapsed.append(doc)
+            if len(collapsed) >= limit:
+                break
+        return collapsed
+
+    @property
+    def collection_ids(self) -> Set[Hashable]:
+        """
+        Ids of the physical collections this adapter reads and writes, as published
+        to src.db.events.UpsertEvents after writes
+        """
+        return {self._schema_key}
+
+    async def warm_up(self):
+        """
+        Open connections and run schema checks ahead of the first request.
+        Adapters backed by shared clients keep them open for the process lifetime.
+        """
+        pass
+
+    async def begin_bulk_load(self):
+        """
+        Defer index building while a large load runs (the index profile's bulk_indexing_threshold).
+        Searches stay correct but unindexed segments are scanned exactly until finish_bulk_load.
+        """
+        pass
+
+    async def finish_bulk_load(self, timeout: float = 600.0):
+        """Build the indexes deferred by begin_bulk_load, waiting up to timeout seconds for them"""
+        pass
+
+    # Collection management, used by reindex.py for blue/green swaps.
+    # "Collection" means a Qdrant collection or an Azure index.
+
+    async def count(self) -> int:
+        """Number of stored points/documents in this adapter's collection"""
+        raise NotImplementedError(f"{type(self).__name__} does not support count")
+
+    async def list_collections(self) -> List[str]:
+        """Names of all concrete collections on the server"""
+        raise NotImplementedError(f"{type(self).__name__} does not support listing collections")
+
+    async def exists(self) -> bool:
+        """Whether this adapter's collection (or the alias it names) exists, checked without creating it"""
+        raise NotImplementedError(f"{type(self).__name__} does not support existence checks")
+
+    async def resolve_alias(self, alias: str) -> Optional[str]:
+        """Collection the alias points to, or None if alias is not an alias"""
+        raise NotImplementedError(f"{type(self).__name__} does not support aliases")
+
+    async def point_alias(self, alias: str):
+        """Atomically point alias at this adapter's collection (creating or moving it)"""
+        raise NotImplementedError(f"{type(self).__name__} does not support aliases")
+
+    async def delete_collection(self, name: str):
+        """Delete a concrete collection"""
+        raise NotImplementedError(f"{type(self).__name__} does not support deleting collections")
+
+    async def iter_documents(self, batch_size: int = 256) -> AsyncIterator[List[Document]]:
+        """Yield every stored document with its vectors, in batches (used by src.shards export)"""
+        raise NotImplementedError(f"{type(self).__name__} does not support exporting documents")
+        yield  # Makes this an async generator, so subclasses override it with one
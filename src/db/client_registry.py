@@ -0,0 +1,109 @@
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, Hashable, Set, Tuple
+from src.utils.logger import logger
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of vector DB clients, shared per endpoint.
+
+    Adapters acquire clients here instead of creating their own, so short-lived
+    adapters reuse pooled connections. Clients are reference counted and closed
+    when the last user releases them, unless pinned (see BaseVectorDB.warm_up),
+    in which case they live until close_all().
+
+    Async clients are bound to the event loop they were created on, so the
+    running loop is part of every client key.
+
+    The registry also remembers which collections/indexes are known to exist,
+    so schema checks are done once per process instead of once per adapter. A request
+    that finds a known collection missing runs the check again through reensure().
+    """
+
+    _clients: Dict[Tuple, Any] = {}
+    _refcounts: Dict[Tuple, int] = {}
+    _pinned: Set[Tuple] = set()
+    _known_schemas: Set[Hashable] = set()
+    _schema_locks: Dict[Tuple, asyncio.Lock] = {}
+
+    @classmethod
+    def _key(cls, key: Hashable) -> Tuple:
+        return (asyncio.get_running_loop(), key)
+
+    @classmethod
+    def _purge_closed_loops(cls):
+        """Drop clients whose event loop is gone (e.g. after asyncio.run returned)"""
+        for full_key in [k for k in cls._clients if k[0].is_closed()]:
+            cls._clients.pop(full_key, None)
+            cls._refcounts.pop(full_key, None)
+            cls._pinned.discard(full_key)
+        for full_key in [k for k in cls._schema_locks if k[0].is_closed()]:
+            del cls._schema_locks[full_key]
+
+    @classmethod
+    def acquire(cls, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the shared client for key, creating it with factory() if needed"""
+        cls._purge_closed_loops()
+        full_key = cls._key(key)
+        if full_key not in cls._clients:
+            cls._clients[full_key] = factory()
+            cls._refcounts[full_key] = 0
+            logger.debug(f"Created shared client for {key}")
+        cls._refcounts[full_key] += 1
+        return cls._clients[full_key]
+
+    @classmethod
+    async def release(cls, key: Hashable):
+        """Release one reference; closes the client when unused and not pinned"""
+        full_key = cls._key(key)
+        if full_key not in cls._clients:
+            return
+        cls._refcounts[full_key] = max(0, cls._refcounts[full_key] - 1)
+        if cls._refcounts[full_key] == 0 and full_key not in cls._pinned:
+            client = cls._clients.pop(full_key)
+            del cls._refcounts[full_key]
+            await client.close()
+            logger.debug(f"Closed shared client for {key}")
+
+    @classmethod
+    def pin(cls, key: Hashable):
+        """Keep the client open even when no adapter holds it"""
+        cls._pinned.add(cls._key(key))
+
+    @classmethod
+    async def close_all(cls):
+        """Close every client on the running loop (call at service shutdown)"""
+        loop = asyncio.get_running_loop()
+        for full_key in [k for k in cls._clients if k[0] is loop]:
+            client = cls._clients.pop(full_key)
+            cls._refcounts.pop(full_key, None)
+            cls._pinned.discard(full_key)
+            await client.close()
+        logger.debug("Closed all shared DB clients")
+
+    @classmethod
+    def is_known(cls, schema_key: Hashable) -> bool:
+        return schema_key in cls._known_schemas
+
+    @classmethod
+    def mark_known(cls, schema_key: Hashable):
+        cls._known_schemas.add(schema_key)
+
+    @classmethod
+    def forget(cls, schema_key: Hashable):
+        """Invalidate a cached existence check (e.g. after deleting a collection)"""
+        cls._known_schemas.discard(schema_key)
+
+    @classmethod
+    async def reensure(cls, schema_key: Hashable, ensure: Callable[[], Awaitable[Any]]):
+        """
+        Forget a cached existence check and run ensure() again, after a request found the
+        collection missing (deleted by another process, e.g. reset_db.py or reindex garbage
+        collection). Serialised per key, so concurrent failures recreate it once.
+        """
+        cls._purge_closed_loops()
+        lock = cls._schema_locks.setdefault(cls._key(schema_key), asyncio.Lock())
+        async with lock:
+            cls.forget(schema_key)
+            await ensure()
+            cls.mark_known(schema_key)
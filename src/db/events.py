@@ -0,0 +1,42 @@
+import weakref
+from typing import Callable, Hashable, List
+from src.utils.logger import logger
+
+
+class UpsertEvents:
+    """
+    In-process notifications of writes to a collection, so caches in front of it
+    (see src.semantic_cache) can be invalidated.
+
+    Adapters publish their collection id (BaseVectorDB.collection_ids) after upserts,
+    alias swaps and deletes. Bound-method subscribers are held weakly, so subscribing
+    does not keep a client alive.
+    """
+
+    _subscribers: List[Callable[[], Callable[[Hashable], None]]] = []
+
+    @classmethod
+    def subscribe(cls, callback: Callable[[Hashable], None]):
+        if hasattr(callback, "__self__"):
+            cls._subscribers.append(weakref.WeakMethod(callback))
+        else:
+            cls._subscribers.append(lambda: callback)
+
+    @classmethod
+    def unsubscribe(cls, callback: Callable[[Hashable], None]):
+        cls._subscribers = [ref for ref in cls._subscribers if ref() not in (None, callback)]
+
+    @classmethod
+    def publish(cls, collection_id: Hashable):
+        """Notify subscribers that collection_id changed"""
+        alive = []
+        for ref in cls._subscribers:
+            callback = ref()
+            if callback is None:
+                continue
+            alive.append(ref)
+            try:
+                callback(collection_id)
+            except Exception as e:
+                logger.warning(f"Upsert subscriber failed for {collection_id}: {e}")
+        cls._subscribers = alive
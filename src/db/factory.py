@@ -1,9 +1,18 @@
-from typing import Dict, Type, Any
+import importlib
+from typing import Dict, Type, Any, List
 from src.db.base import BaseVectorDB
 
 class VectorDBFactory:
     _registry: Dict[str, Type[BaseVectorDB]] = {}
 
+    # Built-in adapters by module path. Modules are imported on first create()
+    # so processes only pay import time for the SDKs they actually use.
+    _lazy_registry: Dict[str, str] = {
+        "qdrant": "src.db.qdrant_adapter",
+        "azure": "src.db.azure_adapter",
+        "local": "src.db.local_adapter",
+    }
+
     @classmethod
     def register(cls, name: str):
         def decorator(db_cls: Type[BaseVectorDB]):
@@ -12,7 +21,23 @@ class VectorDBFactory:
         return decorator
 
     @classmethod
-    def create(cls, name: str, **kwargs: Any) -> BaseVectorDB:
+    def register_lazy(cls, name: str, module_path: str):
+        """Register an adapter by module path; the module must use @register(name)"""
+        cls._lazy_registry[name] = module_path
+
+    @classmethod
+    def available(cls) -> List[str]:
+        return sorted(set(cls._registry) | set(cls._lazy_registry))
+
+    @classmethod
+    def get(cls, name: str) -> Type[BaseVectorDB]:
+        if name not in cls._registry and name in cls._lazy_registry:
+            # Importing the module runs its @register decorator
+            importlib.import_module(cls._lazy_registry[name])
         if name not in cls._registry:
-            raise ValueError(f"VectorDB '{name}' not found. Available: {list(cls._registry.keys())}")
-        return cls._registry[name](**kwargs)
+            raise ValueError(f"VectorDB '{name}' not found. Available: {cls.available()}")
+        return cls._registry[name]
+
+    @classmethod
+    def create(cls, name: str, **kwargs: Any) -> BaseVectorDB:
+        return cls.get(name)(**kwargs)
@@ -0,0 +1,55 @@
+import os
+from typing import Dict, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+# Qdrant's default optimizers indexing_threshold (KB of vectors per segment before an HNSW graph is built)
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+class IndexProfile(BaseModel):
+    """
+    Build-time and serving settings of the vector index, applied when a collection/index is
+    created. None keeps the backend default.
+
+    Azure AI Search supports m 4-10 and ef_construct/ef_search 100-1000 (the adapter clamps
+    into range) and has no on-disk or indexing-threshold settings.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    m: Optional[int] = Field(default=None, ge=0, description="HNSW edges per node (graph density: recall vs RAM)")
+    ef_construct: Optional[int] = Field(default=None, ge=4, description="HNSW build beam width (recall vs build time)")
+    ef_search: Optional[int] = Field(default=None, ge=1, description="Default search beam width (recall vs latency)")
+    on_disk_vectors: bool = Field(default=False, description="Keep vectors and the HNSW graph on disk (mmap)")
+    on_disk_payload: bool = Field(default=False, description="Keep payloads on disk, loaded on read")
+    indexing_threshold: Optional[int] = Field(default=None, ge=0, description="KB per segment before it is indexed while serving")
+    bulk_indexing_threshold: int = Field(default=0, ge=0, description="Threshold during bulk loads (0 defers indexing until finish_bulk_load)")
+
+INDEX_PROFILES: Dict[str, IndexProfile] = {
+    # Backend defaults (the settings used before profiles existed)
+    "default": IndexProfile(name="default"),
+    # Denser graph and wider beam: better recall at low latency, more RAM and slower builds
+    "low_latency": IndexProfile(name="low_latency", m=32, ef_construct=256, ef_search=128),
+    # Best recall for evaluation and small corpora
+    "high_recall": IndexProfile(name="high_recall", m=48, ef_construct=512, ef_search=256),
+    # Sparser graph with vectors and payloads on disk: large corpora on small nodes
+    "low_memory": IndexProfile(name="low_memory", m=8, ef_construct=100, on_disk_vectors=True, on_disk_payload=True),
+}
+
+def register_index_profile(profile: IndexProfile):
+    """Add or replace a named profile"""
+    INDEX_PROFILES[profile.name] = profile
+
+def get_index_profile(name: Optional[str] = None) -> IndexProfile:
+    """
+    Look up a profile by name.
+
+    Args:
+        name: Profile name. If None, reads INDEX_PROFILE from env (default 'default').
+
+    Returns:
+        The named IndexProfile
+    """
+    name = name or os.getenv("INDEX_PROFILE", "default")
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"Unknown index profile '{name}'. Available: {sorted(INDEX_PROFILES)}")
+    return INDEX_PROFILES[name]
@@ -0,0 +1,743 @@
+import os
+import json
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator
+import numpy as np
+from src.models import Document, DocMetadata, filterable_fields
+from src.filters import FilterExpr, Filters, Eq, In, Range, Not, And, Or, parse_filter
+from src.db.base import BaseVectorDB
+from src.db.factory import VectorDBFactory
+from src.db.events import UpsertEvents
+from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
+
+# Sentinel for missing integer/datetime column values
+MISSING = np.iinfo(np.int64).min
+
+# Reciprocal Rank Fusion constant (same default as Qdrant)
+RRF_K = 60
+# Initial candidate pool per requested group for grouped searches
+GROUP_PREFETCH_FACTOR = 4
+# Payload logs are compacted, and the index checkpointed between opens, in steps of at least this many bytes
+COMPACT_MIN_BYTES = 16 * 1024 * 1024
+
+
+def _to_column_value(kind: str, value: Any) -> Any:
+    """Convert a metadata value to its column representation"""
+    if value is None:
+        return None
+    if kind == 'datetime':
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return int(value.timestamp() * 1_000_000)
+    if kind == 'integer':
+        return int(value)
+    return value
+
+
+@VectorDBFactory.register("local")
+class LocalAdapter(BaseVectorDB):
+    """
+    Embedded vector store for edge deployments and CI (no server needed).
+
+    Layout under <LOCAL_DB_PATH>/<collection_name>/:
+        meta.json       dimension, count and capacity
+        vectors.f32     float32 unit vectors, memory-mapped (capacity x dim)
+        payloads.jsonl  append-only log of payload and sparse vector records, read by byte offset
+        index.npz       checkpoint of the in-memory index and the log position it covers
+
+    Search is exact top-k with a NumPy matmul. Filterable metadata is kept as
+    typed columns, so filters become vectorised bitmaps. Sparse vectors go into
+    a flat-array inverted index and hybrid search fuses the rankings with RRF.
+
+    Memory holds only ids, the metadata columns, one log offset per row and the sparse
+    postings; contents and metadata are read from the log for the returned results.
+    Opening a store loads the checkpoint and replays just the log written after it.
+    Re-upserts leave dead records in the log, which is rewritten (compacted) once more
+    than compact_ratio of it is dead.
+    """
+
+    supports_sparse = True
+
+    def __init__(self, collection_name: str = "rag_collection", use_hybrid: bool = False, path: Optional[str] = None,
+                 prefetch_factor: int = None, compact_ratio: float = None):
+        """
+        Args:
+            collection_name: Collection (sub-directory) name
+            use_hybrid: If True, fuse dense and sparse rankings when a sparse query is given
+            path: Root directory. If None, reads LOCAL_DB_PATH from env (default ./local-db).
+            prefetch_factor: Candidates taken from each ranking before RRF fusion, as a multiple of limit.
+                If None, reads HYBRID_PREFETCH_FACTOR from env (default 2).
+            compact_ratio: Dead fraction of the payload log that triggers compaction.
+                If None, reads LOCAL_COMPACT_RATIO from env (default 0.5; 1 disables).
+        """
+        self.collection_name = collection_name
+        self.use_hybrid = use_hybrid
+        self.prefetch_factor = prefetch_factor or int(os.getenv("HYBRID_PREFETCH_FACTOR", "2"))
+        self.compact_ratio = compact_ratio if compact_ratio is not None else float(os.getenv("LOCAL_COMPACT_RATIO", "0.5"))
+        self.root = path or os.getenv("LOCAL_DB_PATH", "./local-db")
+        self.path = os.path.join(self.root, collection_name)
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dim = None
+        self._count = 0
+        self._capacity = 0
+        self._vectors = None
+
+        self._ids: List[str] = []
+        self._id_to_row: Dict[str, int] = {}
+
+        # Per-row state, grown with the vector file: typed metadata columns for vectorised
+        # filtering, the row's current record in the payload log and its sparse postings
+        self._field_kinds = filterable_fields()
+        self._columns: Dict[str, np.ndarray] = {}
+        self._vocab: Dict[str, Dict[Any, int]] = {name: {} for name, kind in self._field_kinds.items() if kind == 'keyword'}
+        self._row_state: Dict[str, np.ndarray] = {}
+        self._log_size = 0  # Bytes in payloads.jsonl
+        self._live_bytes = 0  # Bytes of current (not overwritten) records
+        self._checkpoint_offset = 0  # Log bytes covered by index.npz
+        self._reader = None
+
+        # Sparse postings as flat (row, term, weight) arrays in upsert order; a row's current
+        # entries are [sparse_start, sparse_start + sparse_length). Grouped by term on first search.
+        self._sparse_rows = np.empty(0, dtype=np.int32)
+        self._sparse_terms = np.empty(0, dtype=np.int64)
+        self._sparse_values = np.empty(0, dtype=np.float32)
+        self._sparse_size = 0
+        self._sparse_index = None
+
+        # Filter masks, (key, value) and FilterExpr -> mask, kept until the next upsert
+        self._mask_cache: "OrderedDict[Any, np.ndarray]" = OrderedDict()
+        self._mask_cache_size = int(os.getenv("LOCAL_FILTER_CACHE_SIZE", "256"))
+
+        logger.info(f"Initialized LocalAdapter at '{self.path}' (hybrid={use_hybrid})")
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        await asyncio.to_thread(self._ensure_loaded)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit - flush vectors and checkpoint the index"""
+        await asyncio.to_thread(self._close_sync)
+
+    async def warm_up(self):
+        """Load the store, touch the vector pages and group the sparse postings so the first query is fast"""
+        await asyncio.to_thread(self._ensure_loaded)
+        if self._count:
+            await asyncio.to_thread(lambda: float(self._vectors[:self._count].sum()))
+            if self.use_hybrid:
+                await asyncio.to_thread(self._term_postings)
+        logger.info(f"Local store warmed up with {self._count} vectors")
+
+    async def finish_bulk_load(self, timeout: float = 600.0):
+        """Checkpoint the index so the next open does not replay the load"""
+        await asyncio.to_thread(self._close_sync)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @property
+    def _schema_key(self):
+        return ("local", os.path.abspath(self.path))
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _payloads_path(self) -> str:
+        return os.path.join(self.path, "payloads.jsonl")
+
+    @property
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.path, "index.npz")
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.exists(self._meta_path):
+                return
+
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            self._dim = meta["dim"]
+            self._capacity = meta["capacity"]
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+            self._init_rows(self._capacity)
+
+            self._log_size = os.path.getsize(self._payloads_path) if os.path.exists(self._payloads_path) else 0
+            replayed = self._replay(self._load_checkpoint())
+            self._count = meta["count"]
+            logger.info(f"Loaded {self._count} vectors (dim={self._dim}) from '{self.path}' "
+                        f"({replayed} log records replayed)")
+
+    def _close_sync(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._count and self._log_size > self._checkpoint_offset:
+                self._write_checkpoint()
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def _row_fills(self) -> Dict[str, Tuple[Any, Any]]:
+        """dtype and empty value of each per-row array"""
+        fills = {f"column_{name}": (np.int32, -1) if kind == 'keyword' else (np.int64, MISSING)
+                 for name, kind in self._field_kinds.items()}
+        fills.update({"offset": (np.int64, -1), "length": (np.int32, 0),
+                      "sparse_start": (np.int64, 0), "sparse_length": (np.int32, 0)})
+        return fills
+
+    def _init_rows(self, capacity: int):
+        for name, (dtype, fill) in self._row_fills().items():
+            self._row_state[name] = np.full(capacity, fill, dtype=dtype)
+        self._columns = {name: self._row_state[f"column_{name}"] for name in self._field_kinds}
+
+    def _grow(self, needed: int):
+        """Grow the memory-mapped vector file (and per-row arrays) to hold `needed` rows"""
+        if needed <= self._capacity:
+            return
+        new_capacity = max(needed, self._capacity * 2, 1024)
+
+        os.makedirs(self.path, exist_ok=True)
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        # Extending the file keeps existing rows in place
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self._dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self._dim))
+
+        if not self._row_state:
+            self._init_rows(new_capacity)
+        else:
+            for name, (dtype, fill) in self._row_fills().items():
+                grown = np.full(new_capacity, fill, dtype=dtype)
+                grown[:self._capacity] = self._row_state[name][:self._capacity]
+                self._row_state[name] = grown
+            self._columns = {name: self._row_state[f"column_{name}"] for name in self._field_kinds}
+        self._capacity = new_capacity
+
+    def _write_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self._dim, "count": self._count, "capacity": self._capacity}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _write_checkpoint(self):
+        """Save the in-memory index with the log position it covers (caller holds the lock)"""
+        rows = len(self._ids)
+        arrays = {name: array[:rows] for name, array in self._row_state.items()}
+        arrays.update({
+            "ids": np.array(self._ids, dtype=str),
+            "sparse_rows": self._sparse_rows[:self._sparse_size],
+            "sparse_terms": self._sparse_terms[:self._sparse_size],
+            "sparse_values": self._sparse_values[:self._sparse_size],
+            "log": np.array([self._log_size, self._live_bytes], dtype=np.int64),
+        })
+        for name, vocab in self._vocab.items():
+            arrays[f"vocab_{name}"] = np.array(list(vocab), dtype=str)
+
+        tmp_path = self._checkpoint_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self._checkpoint_path)
+        self._checkpoint_offset = self._log_size
+
+    def _load_checkpoint(self) -> int:
+        """Restore the index from index.npz. Returns the log offset to replay from (0 without a usable checkpoint)."""
+        if not os.path.exists(self._checkpoint_path):
+            return 0
+        try:
+            with np.load(self._checkpoint_path) as data:
+                log_size, live_bytes = (int(value) for value in data["log"])
+                if log_size > self._log_size:
+                    raise ValueError(f"covers {log_size} log bytes, log has {self._log_size}")
+                self._ids = data["ids"].tolist()
+                rows = len(self._ids)
+                for name in self._row_state:
+                    self._row_state[name][:rows] = data[name]
+                self._sparse_size = len(data["sparse_rows"])
+                self._sparse_rows = data["sparse_rows"].copy()
+                self._sparse_terms = data["sparse_terms"].copy()
+                self._sparse_values = data["sparse_values"].copy()
+                for name in self._vocab:
+                    self._vocab[name] = {value: code for code, value in enumerate(data[f"vocab_{name}"].tolist())}
+        except Exception as e:
+            logger.warning(f"Ignoring checkpoint of '{self.path}' ({e}); replaying the whole payload log")
+            self._ids = []
+            self._init_rows(self._capacity)
+            self._sparse_size = 0
+            self._vocab = {name: {} for name in self._vocab}
+            return 0
+
+        self._id_to_row = {id_: row for row, id_ in enumerate(self._ids)}
+        self._live_bytes = live_bytes
+        self._checkpoint_offset = log_size
+        return log_size
+
+    def _replay(self, offset: int) -> int:
+        """Index the log records from offset on. Returns the number of records."""
+        if offset >= self._log_size:
+            return 0
+        replayed = 0
+        with open(self._payloads_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                record = json.loads(line)
+                self._index_row(record["row"], record["id"], record["payload"]["metadata"], record.get("sparse"), offset, len(line))
+                offset += len(line)
+                replayed += 1
+        if offset < self._log_size:
+            # Torn write at the end of the log (interrupted upsert): cut it so appends start on a clean line
+            logger.warning(f"Truncating {self._log_size - offset} bytes of incomplete records from '{self._payloads_path}'")
+            os.truncate(self._payloads_path, offset)
+            self._log_size = offset
+        return replayed
+
+    def _index_row(self, row: int, id_: str, metadata: Dict[str, Any], sparse: Optional[dict], offset: int, length: int):
+        """Point a row at its record in the payload log and update its columns and sparse postings"""
+        if row == len(self._ids):
+            self._ids.append(id_)
+        self._id_to_row[id_] = row
+
+        offsets, lengths = self._row_state["offset"], self._row_state["length"]
+        if offsets[row] >= 0:
+            self._live_bytes -= int(lengths[row])
+        offsets[row] = offset
+        lengths[row] = length
+        self._live_bytes += length
+
+        for name, kind in self._field_kinds.items():
+            value = _to_column_value(kind, metadata.get(name))
+            if kind == 'keyword':
+                vocab = self._vocab[name]
+                if value is None:
+                    self._columns[name][row] = -1
+                else:
+                    self._columns[name][row] = vocab.setdefault(value, len(vocab))
+            else:
+                self._columns[name][row] = MISSING if value is None else value
+
+        # New postings supersede the row's previous ones
+        count = len(sparse["indices"]) if sparse else 0
+        self._row_state["sparse_start"][row] = self._sparse_size
+        self._row_state["sparse_length"][row] = count
+        if count:
+            self._reserve_sparse(self._sparse_size + count)
+            end = self._sparse_size + count
+            self._sparse_rows[self._sparse_size:end] = row
+            self._sparse_terms[self._sparse_size:end] = sparse["indices"]
+            self._sparse_values[self._sparse_size:end] = sparse["values"]
+            self._sparse_size = end
+
+    def _reserve_sparse(self, needed: int):
+        if needed <= len(self._sparse_rows):
+            return
+        capacity = max(needed, 2 * len(self._sparse_rows), 1024)
+        for name in ("_sparse_rows", "_sparse_terms", "_sparse_values"):
+            array = getattr(self, name)
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._sparse_size] = array[:self._sparse_size]
+            setattr(self, name, grown)
+
+    def _live_sparse(self) -> np.ndarray:
+        """Mask of the sparse entries still current for their row"""
+        rows = self._sparse_rows[:self._sparse_size]
+        positions = np.arange(self._sparse_size)
+        start = self._row_state["sparse_start"][rows]
+        return (positions >= start) & (positions < start + self._row_state["sparse_length"][rows])
+
+    def _read_record(self, row: int) -> Dict[str, Any]:
+        """The row's current record from the payload log (caller holds the lock)"""
+        if self._reader is None:
+            self._reader = open(self._payloads_path, "rb")
+        self._reader.seek(int(self._row_state["offset"][row]))
+        return json.loads(self._reader.read(int(self._row_state["length"][row])))
+
+    def _compact(self):
+        """Rewrite the payload log with only current records (caller holds the lock)"""
+        garbage = self._log_size - self._live_bytes
+        offsets, lengths = self._row_state["offset"], self._row_state["length"]
+        tmp_path = self._payloads_path + ".tmp"
+        new_offsets = np.full(len(self._ids), -1, dtype=np.int64)
+        position = 0
+        with open(self._payloads_path, "rb") as source, open(tmp_path, "wb") as target:
+            for row in range(len(self._ids)):
+                if offsets[row] < 0:
+                    continue
+                source.seek(int(offsets[row]))
+                target.write(source.read(int(lengths[row])))
+                new_offsets[row] = position
+                position += int(lengths[row])
+
+        # The old checkpoint points into the old log: drop it first, so a crash before the
+        # new one is written falls back to replaying the compacted log
+        if os.path.exists(self._checkpoint_path):
+            os.remove(self._checkpoint_path)
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        os.replace(tmp_path, self._payloads_path)
+        offsets[:len(self._ids)] = new_offsets
+        self._log_size = self._live_bytes = position
+
+        # Drop superseded sparse entries; each row's entries stay contiguous
+        live = self._live_sparse()
+        new_positions = np.cumsum(live) - 1
+        has_sparse = self._row_state["sparse_length"][:len(self._ids)] > 0
+        starts = self._row_state["sparse_start"][:len(self._ids)]
+        starts[has_sparse] = new_positions[starts[has_sparse]]
+        self._sparse_rows = self._sparse_rows[:self._sparse_size][live]
+        self._sparse_terms = self._sparse_terms[:self._sparse_size][live]
+        self._sparse_values = self._sparse_values[:self._sparse_size][live]
+        self._sparse_size = len(self._sparse_rows)
+        self._sparse_index = None
+
+        self._write_checkpoint()
+        logger.info(f"Compacted payload log of '{self.path}' ({garbage} dead bytes removed)")
+
+    async def compact(self):
+        """Rewrite the payload log without overwritten records and checkpoint the index"""
+        def run():
+            self._ensure_loaded()
+            with self._lock:
+                if self._log_size:
+                    self._compact()
+        await asyncio.to_thread(run)
+
+    def _upsert_sync(self, documents: List[Document]) -> int:
+        self._ensure_loaded()
+        with self._lock:
+            docs = [doc for doc in documents if doc.embedding]
+            if not docs:
+                return 0
+            if self._dim is None:
+                self._dim = len(docs[0].embedding)
+
+            vectors = np.asarray([doc.embedding for doc in docs], dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+            # Assign rows: existing ids are overwritten in place
+            rows = []
+            new_rows: Dict[str, int] = {}
+            next_row = self._count
+            for doc in docs:
+                id_ = str(doc.id)
+                row = self._id_to_row.get(id_, new_rows.get(id_))
+                if row is None:
+                    row = new_rows[id_] = next_row
+                    next_row += 1
+                rows.append(row)
+            self._grow(next_row)
+
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+
+            with open(self._payloads_path, "ab") as f:
+                offset = f.tell()
+                for doc, row in zip(docs, rows):
+                    metadata = doc.metadata.model_dump(mode="json")
+                    record = {"row": row, "id": str(doc.id), "payload": {"content": doc.content, "metadata": metadata},
+                              "sparse": doc.sparse_embedding}
+                    line = (json.dumps(record) + "\n").encode()
+                    f.write(line)
+                    self._index_row(row, str(doc.id), metadata, doc.sparse_embedding, offset, len(line))
+                    offset += len(line)
+            self._log_size = offset
+
+            self._count = next_row
+            self._mask_cache.clear()
+            self._sparse_index = None
+            self._write_meta()
+
+            if self._log_size >= COMPACT_MIN_BYTES and self._log_size - self._live_bytes > self.compact_ratio * self._log_size:
+                self._compact()
+            elif self._log_size - self._checkpoint_offset >= max(COMPACT_MIN_BYTES, self._live_bytes // 4):
+                # Bound the log replayed on the next open, at amortised O(1) cost per record
+                self._write_checkpoint()
+            return len(docs)
+
+    @time_execution
+    async def upsert(self, documents: List[Document], **kwargs):
+        """
+        Upsert documents (existing ids are overwritten in place)
+        """
+        count = await asyncio.to_thread(self._upsert_sync, documents)
+        set_attributes(collection=self.collection_name, documents=len(documents), upserted=count)
+        UpsertEvents.publish(self._schema_key)
+        logger.info(f"Upserted {count} vectors into local store '{self.collection_name}'")
+
+    async def count(self) -> int:
+        await asyncio.to_thread(self._ensure_loaded)
+        return self._count
+
+    async def list_collections(self) -> List[str]:
+        """Collections (sub-directories with a store) under the root path"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.exists(os.path.join(self.root, name, "meta.json")))
+
+    async def exists(self) -> bool:
+        return os.path.exists(self._meta_path)
+
+    def _read_documents(self, start: int, end: int) -> List[Document]:
+        with self._lock:
+            documents = []
+            for row in range(start, end):
+                record = self._read_record(row)
+                document = self._to_document(row, None, record)
+                document.embedding = self._vectors[row].tolist()
+                document.sparse_embedding = record.get("sparse")
+                documents.append(document)
+            return documents
+
+    async def iter_documents(self, batch_size: int = 256) -> AsyncIterator[List[Document]]:
+        """Yield every stored document with its (unit-normalised) vectors, in row order"""
+        await asyncio.to_thread(self._ensure_loaded)
+        count = self._count
+        for start in range(0, count, batch_size):
+            yield await asyncio.to_thread(self._read_documents, start, min(start + batch_size, count))
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _cached_mask(self, key: Any) -> Optional[np.ndarray]:
+        mask = self._mask_cache.get(key)
+        if mask is not None:
+            self._mask_cache.move_to_end(key)
+        return mask
+
+    def _cache_mask(self, key: Any, mask: np.ndarray):
+        """Keep a filter mask until the next upsert, evicting the least recently used beyond LOCAL_FILTER_CACHE_SIZE"""
+        if self._mask_cache_size > 0:
+            self._mask_cache[key] = mask
+            if len(self._mask_cache) > self._mask_cache_size:
+                self._mask_cache.popitem(last=False)
+
+    def _bitmap(self, key: str, value: Any) -> np.ndarray:
+        """Boolean row mask for key == value"""
+        cache_key = (key, value)
+        mask = self._cached_mask(cache_key)
+        if mask is not None:
+            return mask
+
+        kind = self._field_kinds.get(key)
+        if kind == 'keyword':
+            code = self._vocab[key].get(value, -2)
+            mask = self._columns[key][:self._count] == code
+        elif kind is not None:
+            mask = self._columns[key][:self._count] == _to_column_value(kind, value)
+        else:
+            # Non-indexed field: fall back to a scan of the payload log
+            mask = np.array([self._read_record(row)["payload"]["metadata"].get(key) == value
+                             for row in range(self._count)], dtype=bool)
+
+        self._cache_mask(cache_key, mask)
+        return mask
+
+    def _filter_mask(self, filters: Optional[Filters]) -> Optional[np.ndarray]:
+        expr = parse_filter(filters)
+        return self._expr_mask(expr) if expr is not None else None
+
+    def _expr_mask(self, expr: FilterExpr) -> np.ndarray:
+        """Boolean row mask for a filter expression, combined from column bitmaps"""
+        if isinstance(expr, Eq):
+            return self._bitmap(expr.field, expr.value)
+        mask = self._cached_mask(expr)
+        if mask is not None:
+            return mask
+
+        if isinstance(expr, In):
+            mask = np.logical_or.reduce([self._bitmap(expr.field, value) for value in expr.values])
+        elif isinstance(expr, Range):
+            kind = self._field_kinds[expr.field]
+            column = self._columns[expr.field][:self._count]
+            mask = column != MISSING
+            compare = {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal}
+            for key, bound in expr.bounds.items():
+                mask &= compare[key](column, _to_column_value(kind, bound))
+        elif isinstance(expr, Not):
+            mask = ~self._expr_mask(expr.operand)
+        elif isinstance(expr, And):
+            mask = np.logical_and.reduce([self._expr_mask(operand) for operand in expr.operands])
+        elif isinstance(expr, Or):
+            mask = np.logical_or.reduce([self._expr_mask(operand) for operand in expr.operands])
+        else:
+            raise TypeError(f"Unsupported filter expression {type(expr).__name__}")
+
+        self._cache_mask(expr, mask)
+        return mask
+
+    def _top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest finite scores, best first"""
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates])]
+
+    def _term_postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Current sparse entries grouped by term: (sorted terms, start of each term, rows, weights)"""
+        if self._sparse_index is None:
+            live = self._live_sparse()
+            terms = self._sparse_terms[:self._sparse_size][live]
+            order = np.argsort(terms, kind="stable")
+            terms = terms[order]
+            unique, starts = np.unique(terms, return_index=True)
+            self._sparse_index = (unique, np.append(starts, len(terms)),
+                                  self._sparse_rows[:self._sparse_size][live][order],
+                                  self._sparse_values[:self._sparse_size][live][order])
+        return self._sparse_index
+
+    def _sparse_scores(self, sparse_query_vector: dict) -> np.ndarray:
+        scores = np.zeros(self._count, dtype=np.float32)
+        terms, starts, rows, values = self._term_postings()
+        for term, weight in zip(sparse_query_vector["indices"], sparse_query_vector["values"]):
+            i = int(np.searchsorted(terms, term))
+            if i < len(terms) and terms[i] == term:
+                scores[rows[starts[i]:starts[i + 1]]] += weight * values[starts[i]:starts[i + 1]]
+        return scores
+
+    def _rank(self, dense_scores: np.ndarray, limit: int, mask: Optional[np.ndarray],
+              sparse_query_vector: Optional[dict]) -> List[Tuple[int, float]]:
+        """Rank rows for one query, fusing dense and sparse rankings with RRF when hybrid"""
+        if mask is not None:
+            dense_scores = np.where(mask, dense_scores, -np.inf)
+
+        if not (self.use_hybrid and sparse_query_vector):
+            top = self._top_k(dense_scores, limit)
+            return [(int(row), float(dense_scores[row])) for row in top]
+
+        sparse_scores = self._sparse_scores(sparse_query_vector)
+        sparse_scores = np.where(sparse_scores > 0, sparse_scores, -np.inf)
+        if mask is not None:
+            sparse_scores = np.where(mask, sparse_scores, -np.inf)
+
+        fused: Dict[int, float] = {}
+        for scores in (dense_scores, sparse_scores):
+            for rank, row in enumerate(self._top_k(scores, limit * self.prefetch_factor)):
+                fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (RRF_K + rank + 1)
+        return sorted(fused.items(), key=lambda item: -item[1])[:limit]
+
+    def _rank_grouped(self, dense_scores: np.ndarray, limit: int, mask: Optional[np.ndarray],
+                      sparse_query_vector: Optional[dict], group_by: str) -> List[Tuple[int, float]]:
+        """Best-ranked row per distinct group_by value, widening the candidate pool until `limit` groups are found"""
+        column = self._columns.get(group_by)
+        if column is not None:
+            empty = -1 if self._field_kinds[group_by] == 'keyword' else MISSING
+            group_value = lambda row: None if column[row] == empty else int(column[row])
+        else:
+            group_value = lambda row: self._read_record(row)["payload"]["metadata"].get(group_by)
+
+        k = limit * GROUP_PREFETCH_FACTOR
+        while True:
+            ranked = self._rank(dense_scores, k, mask, sparse_query_vector)
+            seen = set()
+            grouped = []
+            for row, score in ranked:
+                value = group_value(row)
+                if value is None or value in seen:
+                    continue
+                seen.add(value)
+                grouped.append((row, score))
+                if len(grouped) >= limit:
+                    return grouped
+            if k >= self._count:
+                return grouped
+            k *= 2
+
+    def _to_document(self, row: int, score: Optional[float], record: Optional[Dict[str, Any]] = None) -> Document:
+        payload = (record or self._read_record(row))["payload"]
+        return Document(
+            id=self._ids[row],
+            content=payload["content"],
+            metadata=DocMetadata(**payload["metadata"]),
+            score=score
+        )
+
+    def _search_many_sync(self, query_vectors: List[List[float]], limit: int, filters: Optional[Filters],
+                          sparse_query_vectors: List[Optional[dict]],
+                          group_by: Optional[str] = None) -> List[List[Document]]:
+        self._ensure_loaded()
+        with self._lock:
+            if not self._count:
+                return [[] for _ in query_vectors]
+
+            queries = np.asarray(query_vectors, dtype=np.float32)
+            queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            # Exact cosine scores for all queries in one matmul: (queries x count)
+            scores = queries @ self._vectors[:self._count].T
+            mask = self._filter_mask(filters)
+
+            results = []
+            for query_scores, sparse_query_vector in zip(scores, sparse_query_vectors):
+                if group_by:
+                    ranked = self._rank_grouped(query_scores, limit, mask, sparse_query_vector, group_by)
+                else:
+                    ranked = self._rank(query_scores, limit, mask, sparse_query_vector)
+                results.append([self._to_document(row, score) for row, score in ranked])
+            return results
+
+    @time_execution
+    async def search(self, query_vector: List[float], limit: int = 5, filters: Optional[Filters] = None,
+               sparse_query_vector: Optional[dict] = None, search_text: Optional[str] = None,
+               group_by: Optional[str] = None, hnsw_ef: Optional[int] = None, exact: bool = False) -> List[Document]:
+        """
+        Exact dense or hybrid (dense + sparse RRF) search
+
+        Args:
+            query_vector: Dense embedding vector
+            limit: Number of results to return
+            filters: Metadata filter (FilterExpr or its dict form, see src.filters)
+            sparse_query_vector: Optional sparse vector for hybrid search
+            search_text: Ignored (sparse_query_vector is used for hybrid)
+            group_by: Metadata field to group by (best hit per distinct value)
+            hnsw_ef: Ignored (there is no ANN index; every search is exact)
+            exact: Ignored (always exact)
+
+        Returns:
+            List of matching documents
+        """
+        filters = parse_filter(filters)
+        documents = (await asyncio.to_thread(
+            self._search_many_sync, [query_vector], limit, filters, [sparse_query_vector], group_by
+        ))[0]
+        set_attributes(collection=self.collection_name, limit=limit, filters=str(filters) if filters else None,
+                       hybrid=sparse_query_vector is not None, group_by=group_by, hits=len(documents))
+        logger.info(f"Found {len(documents)} results.")
+        return documents
+
+    @time_execution
+    async def search_many(self, query_vectors: List[List[float]], limit: int = 5, filters: Optional[Filters] = None,
+                          sparse_query_vectors: Optional[List[Optional[dict]]] = None,
+                          search_texts: Optional[List[Optional[str]]] = None,
+                          group_by: Optional[str] = None, hnsw_ef: Optional[int] = None,
+                          exact: bool = False) -> List[List[Document]]:
+        """
+        Score all queries with a single matrix multiplication
+        """
+        sparse_query_vectors = sparse_query_vectors or [None] * len(query_vectors)
+        filters = parse_filter(filters)
+        results = await asyncio.to_thread(
+            self._search_many_sync, query_vectors, limit, filters, sparse_query_vectors, group_by
+        )
+        set_attributes(collection=self.collection_name, queries=len(query_vectors), limit=limit, filters=str(filters) if filters else None,
+                       group_by=group_by, hits=sum(len(r) for r in results))
+        return results
@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator, Set, Hashable, get_args, get_origin, Literal
+from src.models import Document, DocMetadata
+from src.filters import FilterExpr, Filters, parse_filter, pinned_values
+from src.db.base import BaseVectorDB
+from src.db.factory import VectorDBFactory
+from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
+
+# Constructor argument, default name and separator for each backend's per-partition names.
+# Azure index names may only contain lowercase letters, digits and dashes.
+PARTITION_NAMING = {
+    "qdrant": ("collection_name", "rag_collection", "_"),
+    "azure": ("index_name", "rag-index", "-"),
+    "local": ("collection_name", "rag_collection", "_"),
+}
+
+def partition_values(partition_key: str) -> Tuple[str, ...]:
+    """Every value a Literal DocMetadata field can take"""
+    field = DocMetadata.model_fields.get(partition_key)
+    if field is None or get_origin(field.annotation) is not Literal:
+        raise ValueError(f"Partition key must be a Literal DocMetadata field, got '{partition_key}'")
+    return get_args(field.annotation)
+
+
+class PartitionedVectorDB(BaseVectorDB):
+    """
+    Splits one logical collection into a collection/index per value of a DocMetadata key
+    (e.g. rag_collection_product_a). Upserts and queries filtered on the key go straight to
+    one partition, so latency tracks the partition size; other queries fan out to every
+    partition and the results are merged by score.
+
+    A partition is created by its first upsert. Opening, warming up and searching only touch
+    partitions that exist, so values that never get documents never get an empty collection.
+
+    Enable with PARTITION_KEY=product (RAGClient and the ingestion pipeline wrap their adapter).
+    """
+
+    def __init__(self, db_type: str, partition_key: Optional[str] = None, refresh_seconds: Optional[float] = None,
+                 **adapter_kwargs: Any):
+        """
+        Args:
+            db_type: Backend for every partition ('qdrant', 'azure' or 'local')
+            partition_key: DocMetadata Literal field to partition by. If None, reads PARTITION_KEY from env.
+            refresh_seconds: How often partitions not found yet are looked up again (another process may
+                create them). If None, reads PARTITION_REFRESH_SECONDS from env (default 60).
+            adapter_kwargs: Passed to each partition's adapter; the collection/index name is used as the prefix
+        """
+        self.partition_key = partition_key or os.getenv("PARTITION_KEY", "product")
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else float(os.getenv("PARTITION_REFRESH_SECONDS", "60"))
+        name_arg, default_name, separator = PARTITION_NAMING[db_type]
+        base_name = adapter_kwargs.pop(name_arg, default_name)
+
+        self.supports_sparse = VectorDBFactory.get(db_type).supports_sparse
+        self.partitions: Dict[str, BaseVectorDB] = {}
+        for value in partition_values(self.partition_key):
+            name = f"{base_name}{separator}{value.replace('_', separator)}"
+            self.partitions[value] = VectorDBFactory.create(db_type, **{name_arg: name}, **adapter_kwargs)
+
+        self._existing: Set[str] = set()
+        self._checked_at: Optional[float] = None
+        self._bulk_loading = False
+
+        logger.info(f"Initialized PartitionedVectorDB over {db_type} by '{self.partition_key}' ({len(self.partitions)} partitions)")
+
+    @property
+    def collection_ids(self) -> Set[Hashable]:
+        return set().union(*[partition.collection_ids for partition in self.partitions.values()])
+
+    async def _existing_partitions(self) -> List[BaseVectorDB]:
+        """
+        Partitions that exist. Ones not found are looked up again at most every refresh_seconds,
+        so partitions created since (by another process) join searches without a restart.
+        """
+        missing = [value for value in self.partitions if value not in self._existing]
+        now = time.monotonic()
+        if missing and (self._checked_at is None or now - self._checked_at >= self.refresh_seconds):
+            self._checked_at = now
+            found = await asyncio.gather(*[self.partitions[value].exists() for value in missing])
+            self._existing.update(value for value, exists in zip(missing, found) if exists)
+        return [partition for value, partition in self.partitions.items() if value in self._existing]
+
+    async def __aenter__(self):
+        await asyncio.gather(*[partition.__aenter__() for partition in await self._existing_partitions()])
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # Includes partitions created by upserts since __aenter__; unopened adapters have nothing to release
+        await asyncio.gather(*[partition.__aexit__(exc_type, exc_val, exc_tb) for partition in self.partitions.values()])
+
+    async def warm_up(self):
+        await asyncio.gather(*[partition.warm_up() for partition in await self._existing_partitions()])
+
+    async def begin_bulk_load(self):
+        """Defer indexing on existing partitions, and on the ones upserts create until finish_bulk_load"""
+        self._bulk_loading = True
+        await asyncio.gather(*[partition.begin_bulk_load() for partition in await self._existing_partitions()])
+
+    async def finish_bulk_load(self, timeout: float = 600.0):
+        self._bulk_loading = False
+        await asyncio.gather(*[partition.finish_bulk_load(timeout) for partition in await self._existing_partitions()])
+
+    async def _route(self, filters: Optional[Filters]) -> Tuple[List[BaseVectorDB], Optional[FilterExpr]]:
+        """
+        Existing partitions a query targets and the filter left to apply in them. An equality or
+        membership filter on the partition key (at the top level or inside a top-level And)
+        selects those partitions and is dropped; any other filter fans out to every partition.
+        """
+        values, remaining = pinned_values(parse_filter(filters), self.partition_key)
+        existing = await self._existing_partitions()
+        if values is None:
+            return existing, remaining
+        return [self.partitions[value] for value in values if self.partitions[value] in existing], remaining
+
+    @staticmethod
+    def _merge(result_lists: List[List[Document]], limit: int, group_by: Optional[str]) -> List[Document]:
+        """
+        Merge per-partition results by score. Dense scores are comparable across partitions;
+        fused hybrid (RRF) scores are rank-based, so the merge is approximate for hybrid fan-outs.
+        """
+        merged = sorted((doc for docs in result_lists for doc in docs), key=lambda doc: -(doc.score or 0.0))
+        if group_by:
+            return BaseVectorDB.collapse_groups(merged, group_by, limit)
+        return merged[:limit]
+
+    @time_execution
+    async def upsert(self, documents: List[Document], **kwargs):
+        """Split documents by partition key value and upsert the partitions concurrently"""
+        by_partition: Dict[str, List[Document]] = {}
+        for doc in documents:
+            by_partition.setdefault(getattr(doc.metadata, self.partition_key), []).append(doc)
+
+        set_attributes(documents=len(documents), partitions=sorted(by_partition))
+
+        async def upsert_partition(value: str, docs: List[Document]):
+            partition = self.partitions[value]
+            if value not in self._existing and self._bulk_loading:
+                await partition.begin_bulk_load()
+            await partition.upsert(docs, **kwargs)
+            self._existing.add(value)
+
+        await asyncio.gather(*[upsert_partition(value, docs) for value, docs in by_partition.items()])
+        logger.info(f"Upserted {len(documents)} documents into partitions {sorted(by_partition)}")
+
+    async def search(self, query_vector: List[float], limit: int = 5, filters: Optional[Filters] = None,
+                     sparse_query_vector: Optional[dict] = None, search_text: Optional[str] = None,
+                     group_by: Optional[str] = None, hnsw_ef: Optional[int] = None,
+                     exact: bool = False) -> List[Document]:
+        """
+        Search the partitions the filter pins (see _route), merging results when there are several
+        """
+        partitions, filters = await self._route(filters)
+        kwargs = dict(limit=limit, filters=filters, sparse_query_vector=sparse_query_vector,
+                      search_text=search_text, group_by=group_by, hnsw_ef=hnsw_ef, exact=exact)
+        if len(partitions) == 1:
+            return await partitions[0].search(query_vector, **kwargs)
+        if not partitions:
+            return []
+
+        result_lists = await asyncio.gather(*[
+            partition.search(query_vector, **kwargs) for partition in partitions
+        ])
+        return self._merge(result_lists, limit, group_by)
+
+    async def search_many(self, query_vectors: List[List[float]], limit: int = 5, filters: Optional[Filters] = None,
+                          sparse_query_vectors: Optional[List[Optional[dict]]] = None,
+                          search_texts: Optional[List[Optional[str]]] = None,
+                          group_by: Optional[str] = None, hnsw_ef: Optional[int] = None,
+                          exact: bool = False) -> List[List[Document]]:
+        """
+        Batched search in one partition, or a batched search per targeted partition merged per query
+        """
+        partitions, filters = await self._route(filters)
+        kwargs = dict(limit=limit, filters=filters, sparse_query_vectors=sparse_query_vectors,
+                      search_texts=search_texts, group_by=group_by, hnsw_ef=hnsw_ef, exact=exact)
+        if len(partitions) == 1:
+            return await partitions[0].search_many(query_vectors, **kwargs)
+        if not partitions:
+            return [[] for _ in query_vectors]
+
+        per_partition = await asyncio.gather(*[
+            partition.search_many(query_vectors, **kwargs) for partition in partitions
+        ])
+        return [self._merge(list(result_lists), limit, group_by) for result_lists in zip(*per_partition)]
+
+    async def exists(self) -> bool:
+        """Whether any partition exists"""
+        return bool(await self._existing_partitions())
+
+    async def count(self) -> int:
+        return sum(await asyncio.gather(*[partition.count() for partition in await self._existing_partitions()]))
+
+    async def iter_documents(self, batch_size: int = 256) -> AsyncIterator[List[Document]]:
+        for partition in await self._existing_partitions():
+            async for documents in partition.iter_documents(batch_size=batch_size):
+                yield documents
@@ -1,15 +1,117 @@
 import os
-from typing import List, Dict, Optional
+import random
+import asyncio
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Dict, Optional, Iterator, AsyncIterator, Awaitable, Callable, TypeVar
 from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models as rest
-from src.models import Document, DocMetadata
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from src.models import Document, DocMetadata, filterable_fields
+from src.filters import FilterExpr, Filters, Eq, In, Range, Not, And, Or, parse_filter
 from src.db.base import BaseVectorDB
 from src.db.factory import VectorDBFactory
+from src.db.client_registry import ClientRegistry
+from src.db.events import UpsertEvents
+from src.db.index_profiles import DEFAULT_INDEXING_THRESHOLD, get_index_profile
 from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: rate limiting and server-side/transport failures
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Child candidates (x limit) per requested group, so enough children reach the grouping stage.
+# Grouped hybrid queries prefetch limit x GROUP_PREFETCH_FACTOR x prefetch_factor per branch.
+GROUP_PREFETCH_FACTOR = 2
+# Batched grouped searches fetch limit x GROUP_BATCH_OVERFETCH children per query and group them
+# client-side; queries left with fewer than limit groups are re-run with server-side grouping
+GROUP_BATCH_OVERFETCH = 4
+
+# QDRANT_URL value for an in-process, in-memory Qdrant (offline evaluation and tests)
+IN_MEMORY_URL = ":memory:"
+
+# Payload index type for each filterable field kind (see src.models.filterable_fields)
+PAYLOAD_SCHEMA_TYPES = {
+    'keyword': rest.PayloadSchemaType.KEYWORD,
+    'integer': rest.PayloadSchemaType.INTEGER,
+    'datetime': rest.PayloadSchemaType.DATETIME,
+}
+
+def _to_condition(expr: FilterExpr):
+    """Qdrant condition (FieldCondition or nested Filter) for one filter expression"""
+    if isinstance(expr, Eq):
+        if isinstance(expr.value, datetime):
+            return rest.FieldCondition(key=expr.field, range=rest.DatetimeRange(gte=expr.value, lte=expr.value))
+        return rest.FieldCondition(key=expr.field, match=rest.MatchValue(value=expr.value))
+    if isinstance(expr, In):
+        if isinstance(expr.values[0], datetime):
+            return rest.Filter(should=[_to_condition(Eq(expr.field, value)) for value in expr.values])
+        return rest.FieldCondition(key=expr.field, match=rest.MatchAny(any=list(expr.values)))
+    if isinstance(expr, Range):
+        range_type = rest.DatetimeRange if filterable_fields()[expr.field] == 'datetime' else rest.Range
+        return rest.FieldCondition(key=expr.field, range=range_type(**expr.bounds))
+    if isinstance(expr, Not):
+        return rest.Filter(must_not=[_to_condition(expr.operand)])
+    if isinstance(expr, And):
+        return rest.Filter(must=[_to_condition(operand) for operand in expr.operands])
+    if isinstance(expr, Or):
+        return rest.Filter(should=[_to_condition(operand) for operand in expr.operands])
+    raise TypeError(f"Unsupported filter expression {type(expr).__name__}")
+
+@lru_cache(maxsize=1024)
+def to_qdrant_filter(expr: FilterExpr) -> rest.Filter:
+    """Compile a filter expression to a Qdrant Filter (memoised; expressions are immutable)"""
+    condition = _to_condition(expr)
+    return condition if isinstance(condition, rest.Filter) else rest.Filter(must=[condition])
+
+def _is_transient(exc: Exception) -> bool:
+    """Whether an upsert error is worth retrying (upserts are idempotent by point id)"""
+    if isinstance(exc, ResponseHandlingException):
+        # Raised for timeouts and connection errors
+        return True
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code in TRANSIENT_STATUS_CODES
+    try:
+        import grpc
+        if isinstance(exc, grpc.aio.AioRpcError):
+            return exc.code() in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED,
+                                  grpc.StatusCode.RESOURCE_EXHAUSTED)
+    except ImportError:
+        pass
+    return isinstance(exc, (asyncio.TimeoutError, ConnectionError))
+
+def _is_not_found(exc: Exception) -> bool:
+    """Whether an error means the collection does not exist"""
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code == 404
+    try:
+        import grpc
+        if isinstance(exc, grpc.aio.AioRpcError):
+            return exc.code() == grpc.StatusCode.NOT_FOUND
+    except ImportError:
+        pass
+    return False
 
 @VectorDBFactory.register("qdrant")
 class QdrantAdapter(BaseVectorDB):
-    def __init__(self, collection_name: str = "rag_collection", use_hybrid: bool = False):
+    supports_sparse = True
+
+    def __init__(self, collection_name: str = "rag_collection", use_hybrid: bool = False, prefer_grpc: bool = None,
+                 prefetch_factor: int = None, hnsw_ef: int = None, index_profile: str = None):
+        """
+        Args:
+            collection_name: Qdrant collection
+            use_hybrid: If True, use named dense + sparse vectors
+            prefer_grpc: Use the gRPC transport. If None, reads QDRANT_PREFER_GRPC from env.
+            prefetch_factor: Per-branch hybrid prefetch depth as a multiple of limit.
+                If None, reads HYBRID_PREFETCH_FACTOR from env (default 2).
+            hnsw_ef: Default HNSW search beam width. If None, reads QDRANT_HNSW_EF from env
+                (0 = the index profile's ef_search, else the server default).
+            index_profile: Index settings for collections this adapter creates (see src.db.index_profiles).
+                If None, reads INDEX_PROFILE from env.
+        """
         self.collection_name = collection_name
         self.client = None
         self.use_hybrid = use_hybrid
@@ -17,8 +119,23 @@ class QdrantAdapter(BaseVectorDB):
         # Default to localhost if not set
         self.url = os.getenv("QDRANT_URL", "http://localhost:6333")
         self.api_key = os.getenv("QDRANT_API_KEY")
+        if prefer_grpc is None:
+            prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+        self.prefer_grpc = prefer_grpc
+        
+        # Search tuning
+        self.prefetch_factor = prefetch_factor or int(os.getenv("HYBRID_PREFETCH_FACTOR", "2"))
+        self.index_profile = get_index_profile(index_profile)
+        hnsw_ef = hnsw_ef if hnsw_ef is not None else int(os.getenv("QDRANT_HNSW_EF", "0"))
+        self.hnsw_ef = hnsw_ef or self.index_profile.ef_search
         
-        logger.info(f"Initialized QdrantAdapter for collection '{collection_name}' (hybrid={use_hybrid})")
+        # Bulk upload tuning
+        self.upsert_parallel = int(os.getenv("QDRANT_UPSERT_PARALLEL", "4"))
+        self.max_retries = int(os.getenv("QDRANT_UPSERT_RETRIES", "3"))
+        self.retry_backoff = 0.5
+        
+        logger.info(f"Initialized QdrantAdapter for collection '{collection_name}' (hybrid={use_hybrid}, grpc={prefer_grpc}, "
+                    f"index_profile={self.index_profile.name})")
 
     async def __aenter__(self):
         """Async context manager entry"""
@@ -26,22 +143,69 @@ class QdrantAdapter(BaseVectorDB):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit - cleanup client"""
+        """Async context manager exit - release the shared client"""
         if self.client:
-            await self.client.close()
-            logger.debug("Qdrant client closed")
+            self.client = None
+            await ClientRegistry.release(self._client_key)
+            logger.debug("Qdrant client released")
 
-    async def _get_client(self) -> AsyncQdrantClient:
-        """Lazy initialize async client"""
+    @property
+    def _client_key(self):
+        return ("qdrant", self.url, self.api_key, self.prefer_grpc)
+
+    @property
+    def _schema_key(self):
+        return ("qdrant", self.url, self.collection_name)
+
+    def _acquire_client(self) -> AsyncQdrantClient:
+        """Acquire the shared async client for this endpoint without any schema checks"""
         if self.client is None:
-            self.client = AsyncQdrantClient(
-                url=self.url,
-                api_key=self.api_key,
-                timeout=60.0 # Increase timeout to avoid ResponseHandlingException
-            )
-            await self._ensure_collection(self.client, self.use_hybrid)
+            if self.url == IN_MEMORY_URL:
+                # Data lives in the client, so keep it for the process lifetime
+                self.client = ClientRegistry.acquire(self._client_key, lambda: AsyncQdrantClient(location=IN_MEMORY_URL))
+                ClientRegistry.pin(self._client_key)
+            else:
+                self.client = ClientRegistry.acquire(self._client_key, lambda: AsyncQdrantClient(
+                    url=self.url,
+                    api_key=self.api_key,
+                    prefer_grpc=self.prefer_grpc,
+                    timeout=60.0 # Increase timeout to avoid ResponseHandlingException
+                ))
         return self.client
 
+    async def _get_client(self) -> AsyncQdrantClient:
+        """Lazy acquire the shared async client, ensuring the collection exists once per process"""
+        client = self._acquire_client()
+        # An in-memory store starts empty on every event loop, so its schema can't be cached process-wide
+        if self.url == IN_MEMORY_URL or not ClientRegistry.is_known(self._schema_key):
+            await self._ensure_collection(client, self.use_hybrid)
+            ClientRegistry.mark_known(self._schema_key)
+        return client
+
+    async def _with_collection(self, operation: Callable[[AsyncQdrantClient], Awaitable[T]]) -> T:
+        """
+        Run operation(client). The collection check is cached per process, so if the collection
+        was deleted since (reset_db.py, reindex garbage collection), recreate it and run once more.
+        """
+        client = await self._get_client()
+        try:
+            return await operation(client)
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+        logger.warning(f"Collection '{self.collection_name}' not found; recreating it")
+        await ClientRegistry.reensure(self._schema_key, lambda: self._ensure_collection(client, self.use_hybrid))
+        return await operation(client)
+
+    async def warm_up(self):
+        """Open the pooled connection, check the collection and keep the client for the process lifetime"""
+        client = await self._get_client()
+        ClientRegistry.pin(self._client_key)
+        await client.get_collection(self.collection_name)
+        target = await self.resolve_alias(self.collection_name)
+        served_by = f" (alias of '{target}')" if target else ""
+        logger.info(f"Qdrant client warmed up for collection '{self.collection_name}'{served_by}")
+
     async def _ensure_collection(self, client: AsyncQdrantClient, use_hybrid: bool):
         """
         Ensure collection exists with appropriate vector configuration
@@ -49,116 +213,308 @@ class QdrantAdapter(BaseVectorDB):
         Args:
             use_hybrid: If True, configure collection for hybrid search (dense + sparse)
         """
-        collections = await client.get_collections()
+        # collection_name may be an alias (see reindex.py); its target is managed by the reindex
+        if await self.resolve_alias(self.collection_name) is not None:
+            return
         
-        if self.collection_name not in [c.name for c in collections.collections]:
+        if not await client.collection_exists(self.collection_name):
             vector_size = int(os.getenv("VECTOR_SIZE", "1536"))
-            logger.info(f"Creating collection '{self.collection_name}' with vector_size={vector_size}, hybrid={use_hybrid}")
+            profile = self.index_profile
+            logger.info(f"Creating collection '{self.collection_name}' with vector_size={vector_size}, hybrid={use_hybrid}, "
+                        f"index_profile={profile.name}")
+            
+            # Unset profile fields are left to the server defaults
+            on_disk = profile.on_disk_vectors or None
+            dense_params = rest.VectorParams(size=vector_size, distance=rest.Distance.COSINE, on_disk=on_disk)
+            index_settings = dict(
+                hnsw_config=rest.HnswConfigDiff(m=profile.m, ef_construct=profile.ef_construct, on_disk=on_disk),
+                optimizers_config=rest.OptimizersConfigDiff(indexing_threshold=profile.indexing_threshold),
+                on_disk_payload=profile.on_disk_payload or None
+            )
             
             if use_hybrid:
                 # Create collection with both dense and sparse vectors
                 await client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config={
-                        "dense": rest.VectorParams(size=vector_size, distance=rest.Distance.COSINE)
+                        "dense": dense_params
                     },
                     sparse_vectors_config={
-                        "sparse": rest.SparseVectorParams()
-                    }
+                        "sparse": rest.SparseVectorParams(index=rest.SparseIndexParams(on_disk=on_disk))
+                    },
+                    **index_settings
                 )
             else:
                 # Dense-only (backward compatible)
                 await client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=rest.VectorParams(size=vector_size, distance=rest.Distance.COSINE)
+                    vectors_config=dense_params,
+                    **index_settings
                 )
+            
+            await self.ensure_payload_indexes(client)
 
-    @time_execution
-    async def upsert(self, documents: List[Document], batch_size: int = 64):
+    async def ensure_payload_indexes(self, client: Optional[AsyncQdrantClient] = None) -> List[str]:
+        """
+        Create payload indexes for every filterable DocMetadata field that lacks one.
+        Safe to run against existing collections (used by migrate_db.py).
+        
+        Returns:
+            Names of the fields that were indexed
+        """
+        client = client or await self._get_client()
+        info = await client.get_collection(self.collection_name)
+        existing = set((info.payload_schema or {}).keys())
+        
+        created = []
+        for field_name, kind in filterable_fields().items():
+            if field_name in existing:
+                continue
+            await client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=PAYLOAD_SCHEMA_TYPES[kind],
+                wait=True
+            )
+            created.append(field_name)
+        
+        if created:
+            logger.info(f"Created payload indexes on '{self.collection_name}': {created}")
+        return created
+
+    async def begin_bulk_load(self):
+        """Stop building HNSW graphs for new segments until finish_bulk_load (faster, lighter uploads)"""
+        client = await self._get_client()
+        threshold = self.index_profile.bulk_indexing_threshold
+        await client.update_collection(self.collection_name,
+                                       optimizers_config=rest.OptimizersConfigDiff(indexing_threshold=threshold))
+        logger.info(f"Bulk load started on '{self.collection_name}' (indexing_threshold={threshold})")
+
+    async def finish_bulk_load(self, timeout: float = 600.0):
+        """Restore the serving indexing threshold and wait for the optimizer to build the index"""
+        client = await self._get_client()
+        threshold = self.index_profile.indexing_threshold
+        if threshold is None:
+            threshold = DEFAULT_INDEXING_THRESHOLD
+        await client.update_collection(self.collection_name,
+                                       optimizers_config=rest.OptimizersConfigDiff(indexing_threshold=threshold))
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        info = await client.get_collection(self.collection_name)
+        while info.status != rest.CollectionStatus.GREEN:
+            if loop.time() >= deadline:
+                logger.warning(f"Index build on '{self.collection_name}' still {info.status.value} after {timeout:.0f}s")
+                return
+            await asyncio.sleep(1.0)
+            info = await client.get_collection(self.collection_name)
+        logger.info(f"Bulk load finished on '{self.collection_name}' ({info.indexed_vectors_count} vectors indexed, "
+                    f"indexing_threshold={threshold})")
+
+    async def count(self) -> int:
+        client = self._acquire_client()
+        return (await client.count(collection_name=self.collection_name, exact=True)).count
+
+    async def list_collections(self) -> List[str]:
+        client = self._acquire_client()
+        return [collection.name for collection in (await client.get_collections()).collections]
+
+    async def exists(self) -> bool:
+        client = self._acquire_client()
+        return await client.collection_exists(self.collection_name) or await self.resolve_alias(self.collection_name) is not None
+
+    async def resolve_alias(self, alias: str) -> Optional[str]:
+        client = self._acquire_client()
+        for description in (await client.get_aliases()).aliases:
+            if description.alias_name == alias:
+                return description.collection_name
+        return None
+
+    async def point_alias(self, alias: str):
         """
-        Upsert documents into Qdrant asynchronously with batching
+        Point alias at this collection. Deleting the old alias and creating the new one
+        happen in a single request, so searches through the alias never see a gap.
         """
         client = await self._get_client()
+        operations = []
+        previous = await self.resolve_alias(alias)
+        if previous is not None:
+            operations.append(rest.DeleteAliasOperation(delete_alias=rest.DeleteAlias(alias_name=alias)))
+        operations.append(rest.CreateAliasOperation(
+            create_alias=rest.CreateAlias(collection_name=self.collection_name, alias_name=alias)
+        ))
+        await client.update_collection_aliases(change_aliases_operations=operations)
+        UpsertEvents.publish(("qdrant", self.url, alias))
+        logger.info(f"Alias '{alias}' now points to '{self.collection_name}' (was '{previous}')")
+
+    async def delete_collection(self, name: str):
+        client = self._acquire_client()
+        await client.delete_collection(name)
+        ClientRegistry.forget(("qdrant", self.url, name))
+        UpsertEvents.publish(("qdrant", self.url, name))
+        logger.info(f"Deleted collection '{name}'")
+
+    async def iter_documents(self, batch_size: int = 256) -> AsyncIterator[List[Document]]:
+        """Scroll the whole collection with payloads and vectors"""
+        client = self._acquire_client()
+        offset = None
+        while True:
+            records, offset = await client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            documents = []
+            for record in records:
+                payload = dict(record.payload)
+                content = payload.pop('content')
+                # Named vectors on hybrid collections, a plain list otherwise
+                vector = record.vector
+                sparse_embedding = None
+                if isinstance(vector, dict):
+                    sparse = vector.get("sparse")
+                    if sparse is not None:
+                        sparse_embedding = {"indices": list(sparse.indices), "values": list(sparse.values)}
+                    vector = vector.get("dense")
+                documents.append(Document(
+                    id=record.id,
+                    content=content,
+                    metadata=DocMetadata(**payload),
+                    embedding=vector,
+                    sparse_embedding=sparse_embedding
+                ))
+            if documents:
+                yield documents
+            if offset is None:
+                break
+
+    def _to_point(self, doc: Document) -> rest.PointStruct:
+        payload = doc.metadata.model_dump()
+        payload['content'] = doc.content
         
-        points = []
+        # Handle hybrid search: hybrid collections only accept named vectors
+        if self.use_hybrid:
+            vector_dict = {"dense": doc.embedding}
+            if doc.sparse_embedding:
+                vector_dict["sparse"] = rest.SparseVector(
+                    indices=doc.sparse_embedding["indices"],
+                    values=doc.sparse_embedding["values"]
+                )
+        else:
+            # Dense-only for backward compatibility
+            vector_dict = doc.embedding
+
+        return rest.PointStruct(
+            id=str(doc.id),
+            vector=vector_dict,
+            payload=payload
+        )
+
+    def _iter_point_batches(self, documents: List[Document], batch_size: int) -> Iterator[List[rest.PointStruct]]:
+        """Build points lazily, one batch at a time"""
+        batch = []
         for doc in documents:
             if not doc.embedding:
                 continue
-                
-            payload = doc.metadata.model_dump()
-            payload['content'] = doc.content
-            
-            # Handle hybrid search: use named vectors if sparse embedding exists
-            if self.use_hybrid and doc.sparse_embedding:
-                vector_dict = {
-                    "dense": doc.embedding,
-                    "sparse": rest.SparseVector(
-                        indices=doc.sparse_embedding["indices"],
-                        values=doc.sparse_embedding["values"]
-                    )
-                }
-            else:
-                # Dense-only for backward compatibility
-                vector_dict = doc.embedding
+            batch.append(self._to_point(doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
-            points.append(rest.PointStruct(
-                id=str(doc.id),
-                vector=vector_dict,
-                payload=payload
-            ))
-            
-        if points:
-            # Batch the upsert
-            for i in range(0, len(points), batch_size):
-                batch = points[i:i + batch_size]
+    async def _upsert_batch(self, client: AsyncQdrantClient, points: List[rest.PointStruct], wait: bool):
+        """Upsert one batch, retrying transient failures with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
                 await client.upsert(
                     collection_name=self.collection_name,
-                    points=batch,
-                    wait=False
+                    points=points,
+                    wait=wait
                 )
-    
+                return
+            except Exception as e:
+                if attempt == self.max_retries or not _is_transient(e):
+                    raise
+                delay = self.retry_backoff * (2 ** attempt) * (1 + random.random())
+                logger.warning(f"Upsert of {len(points)} points failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
     @time_execution
-    async def search(self, query_vector: List[float], limit: int = 5, filters: Optional[Dict] = None, 
-               sparse_query_vector: Optional[dict] = None, search_text: Optional[str] = None) -> List[Document]:
+    async def upsert(self, documents: List[Document], batch_size: int = 64, parallel: Optional[int] = None,
+                     wait: bool = True):
         """
-        Search for documents using dense or hybrid (dense + sparse) retrieval
+        Upsert documents into Qdrant asynchronously with parallel batching
         
         Args:
-            query_vector: Dense embedding vector
-            limit: Number of results to return
-            filters: Metadata filters
-            sparse_query_vector: Optional sparse BM25 vector for hybrid search
-            search_text: Ignored for Qdrant (used by Azure)
-            
-        Returns:
-            List of matching documents
+            documents: Documents with embeddings
+            batch_size: Points per request
+            parallel: Max in-flight batches (defaults to QDRANT_UPSERT_PARALLEL)
+            wait: If True, the final batch is sent with wait=True once all others are
+                acknowledged, acting as a consistency barrier before returning
         """
-        # Note: search_text is ignored - Qdrant uses sparse_query_vector for hybrid
+        await self._get_client()
+        parallel = max(1, parallel or self.upsert_parallel)
+        set_attributes(collection=self.collection_name, documents=len(documents), batch_size=batch_size, parallel=parallel)
+        semaphore = asyncio.Semaphore(parallel)
         
-        client = await self._get_client()
-        query_filter = None
-        
-        if filters:
-            must_conditions = []
-            for key, value in filters.items():
-                must_conditions.append(
-                    rest.FieldCondition(
-                        key=key,
-                        match=rest.MatchValue(value=value)
-                    )
-                )
-            query_filter = rest.Filter(must=must_conditions)
+        async def send(points: List[rest.PointStruct]):
+            try:
+                await self._with_collection(lambda client: self._upsert_batch(client, points, wait=False))
+            finally:
+                semaphore.release()
+        
+        tasks = []
+        total = 0
+        last_batch = None
+        try:
+            # Hold back one batch so the last one can be sent as the barrier
+            for batch in self._iter_point_batches(documents, batch_size):
+                if last_batch is not None:
+                    await semaphore.acquire()
+                    tasks.append(asyncio.create_task(send(last_batch)))
+                last_batch = batch
+                total += len(batch)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        if last_batch:
+            # Qdrant applies updates in order, so waiting on the last one confirms all earlier batches
+            await self._with_collection(lambda client: self._upsert_batch(client, last_batch, wait=wait))
+            
+        UpsertEvents.publish(self._schema_key)
+        logger.info(f"Upserted {total} points in batches of {batch_size} (parallel={parallel})")
+    
+    def _build_filter(self, filters: Optional[Filters]) -> Optional[rest.Filter]:
+        expr = parse_filter(filters)
+        return to_qdrant_filter(expr) if expr is not None else None
+
+    def _search_params(self, hnsw_ef: Optional[int], exact: bool) -> Optional[rest.SearchParams]:
+        """Per-query HNSW settings, falling back to the adapter's default ef"""
+        hnsw_ef = hnsw_ef or self.hnsw_ef
+        if not hnsw_ef and not exact:
+            return None
+        return rest.SearchParams(hnsw_ef=hnsw_ef or None, exact=exact)
 
-        # Perform hybrid or dense-only search
+    def _build_query(self, query_vector: List[float], limit: int, query_filter: Optional[rest.Filter],
+                     sparse_query_vector: Optional[dict] = None, prefetch_limit: Optional[int] = None,
+                     params: Optional[rest.SearchParams] = None) -> rest.QueryRequest:
+        """Build the dense or hybrid (dense + sparse) query for one search"""
+        prefetch_limit = prefetch_limit or limit * self.prefetch_factor
         if self.use_hybrid and sparse_query_vector:
             # Hybrid search using prefetch with RRF fusion
-            results = await client.query_points(
-                collection_name=self.collection_name,
+            return rest.QueryRequest(
                 prefetch=[
                     rest.Prefetch(
                         query=query_vector,
                         using="dense",
-                        limit=limit * 2
+                        params=params,
+                        limit=prefetch_limit
                     ),
                     rest.Prefetch(
                         query=rest.SparseVector(
@@ -166,36 +522,24 @@ class QdrantAdapter(BaseVectorDB):
                             values=sparse_query_vector["values"]
                         ),
                         using="sparse",
-                        limit=limit * 2
+                        limit=prefetch_limit
                     )
                 ],
                 query=rest.FusionQuery(fusion=rest.Fusion.RRF),
-                query_filter=query_filter,
-                limit=limit
+                filter=query_filter,
+                limit=limit,
+                with_payload=True
             )
-            results = results.points
         elif self.use_hybrid:
             # Dense-only on a hybrid collection (use named vector)
-            results = await client.query_points(
-                collection_name=self.collection_name,
-                query=query_vector,
-                using="dense",
-                query_filter=query_filter,
-                limit=limit
-            )
-            results = results.points
-        else:
-            # Dense-only search on single-vector collection (backward compatible)
-            results = await client.query_points(
-                collection_name=self.collection_name,
-                query=query_vector,
-                query_filter=query_filter,
-                limit=limit
-            )
-            results = results.points
-        
+            return rest.QueryRequest(query=query_vector, using="dense", filter=query_filter, params=params,
+                                     limit=limit, with_payload=True)
+        # Dense-only search on single-vector collection (backward compatible)
+        return rest.QueryRequest(query=query_vector, filter=query_filter, params=params, limit=limit, with_payload=True)
+
+    def _to_documents(self, points: List[rest.ScoredPoint]) -> List[Document]:
         documents = []
-        for hit in results:
+        for hit in points:
             payload = hit.payload
             content = payload.pop('content')
             
@@ -208,6 +552,120 @@ class QdrantAdapter(BaseVectorDB):
                 metadata=metadata,
                 score=hit.score
             ))
+        return documents
+
+    @time_execution
+    async def search(self, query_vector: List[float], limit: int = 5, filters: Optional[Filters] = None, 
+               sparse_query_vector: Optional[dict] = None, search_text: Optional[str] = None,
+               group_by: Optional[str] = None, hnsw_ef: Optional[int] = None, exact: bool = False) -> List[Document]:
+        """
+        Search for documents using dense or hybrid (dense + sparse) retrieval
+        
+        Args:
+            query_vector: Dense embedding vector
+            limit: Number of results to return (number of groups when group_by is set)
+            filters: Metadata filter (FilterExpr or its dict form, see src.filters), evaluated server-side
+            sparse_query_vector: Optional sparse BM25 vector for hybrid search
+            search_text: Ignored for Qdrant (used by Azure)
+            group_by: Payload field to group by server-side (one hit per group)
+            hnsw_ef: HNSW beam width for this query (overrides the adapter default)
+            exact: If True, score every point instead of walking the HNSW graph
             
+        Returns:
+            List of matching documents
+        """
+        # Note: search_text is ignored - Qdrant uses sparse_query_vector for hybrid
+        
+        params = self._search_params(hnsw_ef, exact)
+        filters = parse_filter(filters)
+        set_attributes(collection=self.collection_name, limit=limit, filters=str(filters) if filters else None,
+                       hybrid=sparse_query_vector is not None, group_by=group_by,
+                       hnsw_ef=params.hnsw_ef if params else None, exact=exact)
+        
+        if group_by:
+            # Hybrid prefetch must surface enough children to fill `limit` groups
+            request = self._build_query(query_vector, limit, self._build_filter(filters), sparse_query_vector,
+                                        prefetch_limit=limit * GROUP_PREFETCH_FACTOR * self.prefetch_factor, params=params)
+            results = await self._with_collection(lambda client: client.query_points_groups(
+                collection_name=self.collection_name,
+                group_by=group_by,
+                prefetch=request.prefetch,
+                query=request.query,
+                using=request.using,
+                query_filter=request.filter,
+                search_params=request.params,
+                limit=limit,
+                group_size=1
+            ))
+            documents = self._to_documents([group.hits[0] for group in results.groups if group.hits])
+            set_attributes(hits=len(documents))
+            logger.info(f"Found {len(documents)} groups by '{group_by}'.")
+            return documents
+        
+        request = self._build_query(query_vector, limit, self._build_filter(filters), sparse_query_vector, params=params)
+        
+        results = await self._with_collection(lambda client: client.query_points(
+            collection_name=self.collection_name,
+            prefetch=request.prefetch,
+            query=request.query,
+            using=request.using,
+            query_filter=request.filter,
+            search_params=request.params,
+            limit=request.limit
+        ))
+        
+        documents = self._to_documents(results.points)
+        set_attributes(hits=len(documents))
         logger.info(f"Found {len(documents)} results.")
         return documents
+
+    @time_execution
+    async def search_many(self, query_vectors: List[List[float]], limit: int = 5, filters: Optional[Filters] = None,
+                          sparse_query_vectors: Optional[List[Optional[dict]]] = None,
+                          search_texts: Optional[List[Optional[str]]] = None,
+                          group_by: Optional[str] = None, hnsw_ef: Optional[int] = None,
+                          exact: bool = False) -> List[List[Document]]:
+        """
+        Run several searches in one round trip using Qdrant's batch query endpoint.
+        
+        There is no batch endpoint for grouped queries, so with group_by each query over-fetches
+        limit x GROUP_BATCH_OVERFETCH children in the batch and keeps the best child per group.
+        Queries whose children cover fewer than `limit` groups (while more children exist) are
+        re-run with server-side grouping, so results match search(group_by=...).
+        
+        search_texts is accepted for interface compatibility and ignored, as in search.
+        """
+        filters = parse_filter(filters)
+        query_filter = self._build_filter(filters)
+        sparse_query_vectors = sparse_query_vectors or [None] * len(query_vectors)
+        params = self._search_params(hnsw_ef, exact)
+        
+        fetch = limit * GROUP_BATCH_OVERFETCH if group_by else limit
+        requests = [
+            self._build_query(query_vector, fetch, query_filter, sparse_query_vector, params=params)
+            for query_vector, sparse_query_vector in zip(query_vectors, sparse_query_vectors)
+        ]
+        responses = await self._with_collection(
+            lambda client: client.query_batch_points(collection_name=self.collection_name, requests=requests)
+        )
+        
+        results = [self._to_documents(response.points) for response in responses]
+        regrouped = 0
+        if group_by:
+            short = [i for i, documents in enumerate(results) if len(documents) >= fetch]
+            results = [self.collapse_groups(documents, group_by, limit) for documents in results]
+            short = [i for i in short if len(results[i]) < limit]
+            if short:
+                search_texts = search_texts or [None] * len(query_vectors)
+                topped_up = await asyncio.gather(*[
+                    self.search(query_vectors[i], limit=limit, filters=filters, sparse_query_vector=sparse_query_vectors[i],
+                                search_text=search_texts[i], group_by=group_by, hnsw_ef=hnsw_ef, exact=exact)
+                    for i in short
+                ])
+                for i, documents in zip(short, topped_up):
+                    results[i] = documents
+                regrouped = len(short)
+        set_attributes(collection=self.collection_name, queries=len(requests), limit=limit, filters=str(filters) if filters else None,
+                       group_by=group_by, regrouped=regrouped, hits=sum(len(r) for r in results))
+        logger.info(f"Batch search returned {sum(len(r) for r in results)} results for {len(requests)} queries.")
+        return results
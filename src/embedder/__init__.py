@@ -1,7 +1,24 @@
+import importlib
 from .base import BaseEmbedder
-from .openai_embedder import OpenAIEmbedder
-from .bm25_embedder import BM25Embedder
-from .e5_embedder import E5Embedder
 from .factory import EmbedderFactory
+from .batcher import MicroBatchEmbedder
+from .cache import QueryEmbeddingCache, CachedEmbedder
+from .hybrid import HybridEmbedder
 
-__all__ = ['BaseEmbedder', 'OpenAIEmbedder', 'BM25Embedder', 'E5Embedder', 'EmbedderFactory']
+# Backend embedders pull in heavy SDKs (openai, fastembed, sentence-transformers),
+# so they are only imported when accessed
+_LAZY_CLASSES = {
+    'OpenAIEmbedder': '.openai_embedder',
+    'BM25Embedder': '.bm25_embedder',
+    'E5Embedder': '.e5_embedder',
+    'HashEmbedder': '.hash_embedder',
+}
+
+def __getattr__(name):
+    if name in _LAZY_CLASSES:
+        module = importlib.import_module(_LAZY_CLASSES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['BaseEmbedder', 'OpenAIEmbedder', 'BM25Embedder', 'E5Embedder', 'HashEmbedder', 'EmbedderFactory', 'MicroBatchEmbedder',
+           'QueryEmbeddingCache', 'CachedEmbedder', 'HybridEmbedder']
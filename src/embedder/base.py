@@ -15,3 +15,18 @@ class BaseEmbedder(ABC):
             Same documents with embedding field populated
         """
         pass
+
+    @property
+    def identity(self) -> str:
+        """
+        Stable identifier of the embedder and its configuration.
+        Used to key caches so vectors from different models never mix.
+        """
+        return type(self).__name__
+
+    def close(self):
+        """
+        Release resources held outside the event loop, e.g. worker processes.
+        Called by the owner at shutdown; the default has nothing to release.
+        """
+        pass
@@ -0,0 +1,100 @@
+from typing import List, Dict, Tuple
+import asyncio
+import contextvars
+from src.models import Document
+from src.embedder.base import BaseEmbedder
+from src.utils.logger import logger
+from src.utils.tracing import span
+
+
+class MicroBatchEmbedder(BaseEmbedder):
+    """
+    Wraps an embedder and coalesces concurrent embed() calls into one batch.
+
+    Calls arriving within `window_ms` of the first pending call (or until
+    `max_batch_size` documents are pending) are sent to the wrapped embedder
+    as a single request. Each caller gets back its own documents.
+    """
+
+    def __init__(self, embedder: BaseEmbedder, window_ms: float = 2.0, max_batch_size: int = 32):
+        """
+        Args:
+            embedder: Embedder to wrap
+            window_ms: How long to wait for more calls before flushing a batch
+            max_batch_size: Flush immediately once this many documents are pending
+        """
+        self.embedder = embedder
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        # Pending calls are grouped by is_query since the wrapped embedder may treat them differently
+        self._pending: Dict[bool, List[Tuple[List[Document], asyncio.Future]]] = {True: [], False: []}
+        self._pending_count: Dict[bool, int] = {True: 0, False: 0}
+        self._timers: Dict[bool, asyncio.TimerHandle] = {}
+        self._tasks = set()
+
+        logger.info(f"Initialized MicroBatchEmbedder for {type(embedder).__name__} (window={window_ms}ms, max_batch_size={max_batch_size})")
+
+    @property
+    def identity(self) -> str:
+        return self.embedder.identity
+
+    def close(self):
+        self.embedder.close()
+
+    async def embed(self, documents: List[Document], is_query: bool = False) -> List[Document]:
+        """
+        Queue documents for the next batch and wait for their embeddings
+        """
+        if self.window <= 0:
+            return await self.embedder.embed(documents, is_query=is_query)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[is_query].append((documents, future))
+        self._pending_count[is_query] += len(documents)
+
+        if self._pending_count[is_query] >= self.max_batch_size:
+            self._flush(is_query)
+        elif is_query not in self._timers:
+            self._timers[is_query] = loop.call_later(self.window, self._flush, is_query)
+
+        # Time spent queued plus the shared batch call
+        with span("embed.micro_batch", documents=len(documents), is_query=is_query):
+            return await future
+
+    def _flush(self, is_query: bool):
+        """Send all pending calls for is_query as one batch"""
+        timer = self._timers.pop(is_query, None)
+        if timer:
+            timer.cancel()
+
+        batch = self._pending[is_query]
+        if not batch:
+            return
+        self._pending[is_query] = []
+        self._pending_count[is_query] = 0
+
+        # The batch serves several requests, so its spans go to a trace of their own
+        # rather than to whichever request happened to start the window
+        task = contextvars.Context().run(asyncio.get_running_loop().create_task, self._run_batch(batch, is_query))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[List[Document], asyncio.Future]], is_query: bool):
+        documents = [doc for docs, _ in batch for doc in docs]
+        logger.debug(f"Flushing micro-batch of {len(documents)} documents from {len(batch)} calls (is_query={is_query})")
+
+        try:
+            # Embedders populate the documents in place, so each caller's list is filled
+            await self.embedder.embed(documents, is_query=is_query)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for docs, future in batch:
+            if not future.done():
+                future.set_result(docs)
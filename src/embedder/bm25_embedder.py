@@ -5,6 +5,7 @@ from src.models import Document
 from src.embedder.base import BaseEmbedder
 from src.embedder.factory import EmbedderFactory
 from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
 
 @EmbedderFactory.register("bm25")
 class BM25Embedder(BaseEmbedder):
@@ -17,8 +18,13 @@ class BM25Embedder(BaseEmbedder):
         Args:
             model_name: Fastembed sparse model name (default: "Qdrant/bm25")
         """
+        self.model_name = model_name
         self.model = SparseTextEmbedding(model_name=model_name)
         logger.info(f"Initialized BM25Embedder with model='{model_name}'")
+
+    @property
+    def identity(self) -> str:
+        return f"bm25:{self.model_name}"
     
     @time_execution
     async def embed(self, documents: List[Document], is_query: bool = False) -> List[Document]:
@@ -32,6 +38,7 @@ class BM25Embedder(BaseEmbedder):
             Same documents with sparse_embedding field populated
         """
         texts = [doc.content for doc in documents]
+        set_attributes(batch_size=len(texts), is_query=is_query)
         
         logger.debug(f"Generating sparse embeddings for {len(texts)} documents")
         
@@ -0,0 +1,140 @@
+from typing import List, Dict, Optional, Tuple, Any
+import re
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from src.models import Document
+from src.embedder.base import BaseEmbedder
+from src.utils.logger import logger
+from src.utils.tracing import span
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded in-process cache for query embeddings with LRU eviction and TTL.
+
+    Keys are (embedder identity, normalised query text). Dense vectors are
+    stored as float32 arrays, sparse vectors as (uint32 indices, float32 values).
+    """
+
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 3600.0):
+        """
+        Args:
+            max_size: Maximum number of cached entries (least recently used are evicted)
+            ttl_seconds: Entry lifetime in seconds (<= 0 disables expiry)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalise query text so trivially different spellings share an entry"""
+        text = unicodedata.normalize('NFKC', text)
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def get(self, identity: str, text: str) -> Optional[Any]:
+        key = (identity, self.normalize(text))
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            stored_at, value = entry
+            if self.ttl_seconds <= 0 or time.monotonic() - stored_at < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            # Expired
+            del self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, identity: str, text: str, value: Any):
+        key = (identity, self.normalize(text))
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate statistics for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class CachedEmbedder(BaseEmbedder):
+    """
+    Wraps an embedder and serves query embeddings from a QueryEmbeddingCache.
+    Only misses are forwarded to the wrapped embedder; document (non-query)
+    embedding always passes through uncached.
+    """
+
+    def __init__(self, embedder: BaseEmbedder, cache: QueryEmbeddingCache, sparse: bool = False):
+        """
+        Args:
+            embedder: Embedder to wrap
+            cache: Cache instance (may be shared between dense and sparse embedders)
+            sparse: If True, cache the sparse_embedding field instead of embedding
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.sparse = sparse
+
+    @property
+    def identity(self) -> str:
+        return self.embedder.identity
+
+    def close(self):
+        self.embedder.close()
+
+    def _pack(self, doc: Document) -> Any:
+        if self.sparse:
+            return (array('I', doc.sparse_embedding["indices"]), array('f', doc.sparse_embedding["values"]))
+        return array('f', doc.embedding)
+
+    def _unpack(self, doc: Document, value: Any):
+        if self.sparse:
+            indices, values = value
+            doc.sparse_embedding = {"indices": indices.tolist(), "values": values.tolist()}
+        else:
+            doc.embedding = value.tolist()
+
+    async def embed(self, documents: List[Document], is_query: bool = False) -> List[Document]:
+        if not is_query:
+            return await self.embedder.embed(documents, is_query=is_query)
+
+        # Keep dense and sparse entries apart even if an embedder produces both
+        identity = f"{self.embedder.identity}#{'sparse' if self.sparse else 'dense'}"
+        misses = []
+        for doc in documents:
+            value = self.cache.get(identity, doc.content)
+            if value is None:
+                misses.append(doc)
+            else:
+                self._unpack(doc, value)
+
+        with span("embed.query_cache", sparse=self.sparse, batch_size=len(documents), hits=len(documents) - len(misses)):
+            if misses:
+                await self.embedder.embed(misses, is_query=is_query)
+                for doc in misses:
+                    if (doc.sparse_embedding if self.sparse else doc.embedding):
+                        self.cache.put(identity, doc.content, self._pack(doc))
+
+        logger.debug(f"Query embedding cache: {len(documents) - len(misses)}/{len(documents)} hits for {identity}")
+        return documents
@@ -1,10 +1,93 @@
-from typing import List
+from typing import List, Optional, Dict, Any
+import os
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from src.models import Document
 from src.embedder.base import BaseEmbedder
 from src.embedder.factory import EmbedderFactory
 from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
+
+# Per-process model used by pool workers (populated by _init_worker)
+_worker_model = None
+
+
+def _resolve_device() -> str:
+    """Determine device: check env var, otherwise auto-detect"""
+    # Common values: "cpu", "cuda", "mps" (for Mac), "cuda:0", etc.
+    import torch
+
+    device = os.getenv("EMBEDDING_DEVICE")
+    if not device:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    return device
+
+
+def _load_model(model_name: str, device: str, onnx_options: Dict[str, Any]) -> SentenceTransformer:
+    """
+    Load the ONNX-backed model with the given runtime options.
+
+    onnx_options holds plain values (so it can be sent to pool workers):
+        file_name: ONNX file inside the model dir, e.g. "onnx/model_qint8_avx512_vnni.onnx"
+        intra_op_threads / inter_op_threads: ONNX Runtime thread counts (0 = runtime default)
+        execution_mode: "sequential" or "parallel"
+    """
+    import onnxruntime as ort
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = onnx_options.get("intra_op_threads", 0)
+    session_options.inter_op_num_threads = onnx_options.get("inter_op_threads", 0)
+    if onnx_options.get("execution_mode") == "parallel":
+        session_options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+    model_kwargs = {"session_options": session_options}
+    if onnx_options.get("file_name"):
+        model_kwargs["file_name"] = onnx_options["file_name"]
+    if device == "cpu":
+        model_kwargs["provider"] = "CPUExecutionProvider"
+
+    return SentenceTransformer(model_name, device=device, backend="onnx", model_kwargs=model_kwargs)
+
+
+def _init_worker(model_name: str, device: str, onnx_options: Dict[str, Any]):
+    """Load the model once per worker process"""
+    global _worker_model
+    _worker_model = _load_model(model_name, device, onnx_options)
+
+
+def export_onnx_variant(model_name: str = "./hf-models/e5", variant: str = "qint8_avx512_vnni") -> str:
+    """
+    Export a quantized or optimised ONNX variant of a local model into <model_name>/onnx/.
+
+    Args:
+        model_name: Local model directory
+        variant: "qint8_<arm64|avx2|avx512|avx512_vnni>" for dynamic int8 quantization,
+            or "O1".."O4" for graph optimisation
+
+    Returns:
+        ONNX file name (relative to model_name) to pass as onnx_file / E5_ONNX_FILE
+    """
+    from sentence_transformers import export_dynamic_quantized_onnx_model, export_optimized_onnx_model
+
+    model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+    if variant.startswith("qint8_"):
+        export_dynamic_quantized_onnx_model(model, variant[len("qint8_"):], model_name)
+    else:
+        export_optimized_onnx_model(model, variant, model_name)
+
+    file_name = f"onnx/model_{variant}.onnx"
+    logger.info(f"Exported ONNX variant '{variant}' to '{os.path.join(model_name, file_name)}'")
+    return file_name
+
+
+def _encode_shard(texts: List[str]):
+    """Encode one shard of texts inside a worker process"""
+    return _worker_model.encode(texts, normalize_embeddings=True)
+
 
 @EmbedderFactory.register("e5")
 class E5Embedder(BaseEmbedder):
@@ -12,25 +95,170 @@ class E5Embedder(BaseEmbedder):
     E5 Embedder using sentence-transformers.
     Supports multilingual-e5-small/base/large.
     Handles 'query: ' and 'passage: ' prefixes automatically.
+
+    With num_workers > 1 the model is loaded once per worker process and
+    batches are sharded across the pool, so tokenization and pre/post-processing
+    scale with CPU cores instead of being bound to a single GIL.
+
+    With output_dim set, embeddings are reduced with a PCA projection fitted
+    by fit_projection() and saved next to the model as pca_<dim>.npz.
+
+    onnx_file selects a quantized/optimised export (see export_onnx_variant),
+    and the ONNX Runtime thread counts can be tuned per process.
     """
-    
-    def __init__(self, model_name: str = "./hf-models/e5"):
+
+    def __init__(self, model_name: str = "./hf-models/e5", num_workers: Optional[int] = None, shard_size: int = 64,
+                 output_dim: Optional[int] = None, onnx_file: Optional[str] = None,
+                 intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None,
+                 project: bool = True):
+        """
+        Args:
+            model_name: Path or name of the E5 model
+            num_workers: Number of worker processes. If None, reads E5_NUM_WORKERS (default 1 = in-process)
+            shard_size: Number of texts sent to a worker per task
+            output_dim: Reduced dimensionality. If None, reads EMBEDDING_DIMENSIONS from env; unset means full size.
+            onnx_file: ONNX file inside the model dir, e.g. "onnx/model_qint8_avx512_vnni.onnx".
+                If None, reads E5_ONNX_FILE from env; unset means the default float32 model.
+            intra_op_threads: ONNX Runtime intra-op threads. If None, reads E5_INTRA_OP_THREADS;
+                in pool mode defaults to cpu_count // num_workers to avoid oversubscription.
+            inter_op_threads: ONNX Runtime inter-op threads. If None, reads E5_INTER_OP_THREADS.
+            project: Apply the PCA projection. False always returns full-size embeddings and ignores
+                output_dim and EMBEDDING_DIMENSIONS (used to fit a projection).
+        """
         self.model_name = model_name
-        
-        # Determine device: check env var, otherwise let SentenceTransformer auto-detect
-        # Common values: "cpu", "cuda", "mps" (for Mac), "cuda:0", etc.
-        import os
-        import torch
-        
-        device = os.getenv("EMBEDDING_DEVICE")
-        if not device:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            
-        logger.info(f"Loading E5 model '{model_name}' on device: {device}...")
-        
-        # Initialize model (this might download it, so it can take time)
-        self.model = SentenceTransformer(model_name, device=device, backend="onnx")
-    
+        self.shard_size = shard_size
+
+        if not project:
+            output_dim = None
+        elif output_dim is None and os.getenv("EMBEDDING_DIMENSIONS"):
+            output_dim = int(os.getenv("EMBEDDING_DIMENSIONS"))
+        self.output_dim = output_dim
+        self._pca_mean = None
+        self._pca_components = None
+        if output_dim:
+            self._load_projection()
+
+        if num_workers is None:
+            num_workers = int(os.getenv("E5_NUM_WORKERS", "1"))
+        self.num_workers = max(1, num_workers)
+
+        device = _resolve_device()
+
+        if onnx_file is None:
+            onnx_file = os.getenv("E5_ONNX_FILE") or None
+        self.onnx_file = onnx_file
+        if intra_op_threads is None:
+            intra_op_threads = int(os.getenv("E5_INTRA_OP_THREADS", "0"))
+            if not intra_op_threads and self.num_workers > 1:
+                intra_op_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        if inter_op_threads is None:
+            inter_op_threads = int(os.getenv("E5_INTER_OP_THREADS", "0"))
+        onnx_options = {
+            "file_name": onnx_file,
+            "intra_op_threads": intra_op_threads,
+            "inter_op_threads": inter_op_threads,
+            "execution_mode": os.getenv("E5_EXECUTION_MODE", "sequential")
+        }
+        logger.info(f"E5 ONNX options: {onnx_options}")
+
+        self.model = None
+        self._pool = None
+
+        if self.num_workers > 1:
+            logger.info(f"Starting E5 worker pool with {self.num_workers} processes for '{model_name}' on device: {device}...")
+            # Use 'spawn' so workers don't inherit torch/ONNX runtime state from the parent
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, device, onnx_options)
+            )
+        else:
+            logger.info(f"Loading E5 model '{model_name}' on device: {device}...")
+
+            # Initialize model (this might download it, so it can take time)
+            self.model = _load_model(model_name, device, onnx_options)
+
+    @property
+    def identity(self) -> str:
+        return f"e5:{self.model_name}:{self.onnx_file or 'model.onnx'}:{self.output_dim or 'full'}"
+
+    @property
+    def projection_path(self) -> str:
+        return os.path.join(self.model_name, f"pca_{self.output_dim}.npz")
+
+    def _load_projection(self):
+        path = self.projection_path
+        if not os.path.exists(path):
+            raise ValueError(
+                f"No PCA projection found at '{path}'. Fit one with "
+                f"`python fit_e5_pca.py <files> --dim {self.output_dim} --model {self.model_name}`, "
+                f"or unset EMBEDDING_DIMENSIONS to use full-size embeddings"
+            )
+        data = np.load(path)
+        self._pca_mean = data["mean"]
+        self._pca_components = data["components"]
+        logger.info(f"Loaded PCA projection {self._pca_components.shape[1]} -> {self._pca_components.shape[0]} from '{path}'")
+
+    def _project(self, embeddings) -> np.ndarray:
+        """Apply the PCA projection (if any) and re-normalise to unit length"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self._pca_components is None:
+            return embeddings
+        reduced = (embeddings - self._pca_mean) @ self._pca_components.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+
+    async def fit_projection(self, texts: List[str], output_dim: int) -> str:
+        """
+        Fit a PCA projection on sample passages and save it next to the model.
+
+        Args:
+            texts: Representative passages (ideally a sample of the corpus)
+            output_dim: Target dimensionality
+
+        Returns:
+            Path of the saved projection
+        """
+        if len(texts) < output_dim:
+            raise ValueError(f"Need at least {output_dim} texts to fit a {output_dim}-dim projection, got {len(texts)}")
+
+        embeddings = np.asarray(await self._encode([f"passage: {t}" for t in texts]), dtype=np.float32)
+        mean = embeddings.mean(axis=0)
+        # Principal axes are the top right-singular vectors of the centred matrix
+        _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+        components = vt[:output_dim].astype(np.float32)
+
+        path = os.path.join(self.model_name, f"pca_{output_dim}.npz")
+        np.savez(path, mean=mean, components=components)
+        logger.info(f"Saved PCA projection {embeddings.shape[1]} -> {output_dim} to '{path}'")
+        return path
+
+    def close(self):
+        """Shut down the worker pool (no-op in single-process mode)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            logger.debug("E5 worker pool shut down")
+
+    async def _encode(self, texts: List[str]):
+        """Encode texts in-process or sharded across the worker pool, preserving order"""
+        if self._pool is None:
+            # Run in thread pool as sentence-transformers is sync/CPU-bound
+            return await asyncio.to_thread(
+                lambda: self.model.encode(texts, normalize_embeddings=True)
+            )
+
+        loop = asyncio.get_running_loop()
+        shards = [texts[i:i + self.shard_size] for i in range(0, len(texts), self.shard_size)]
+        futures = [loop.run_in_executor(self._pool, _encode_shard, shard) for shard in shards]
+
+        # gather keeps shard order, so results line up with the input texts
+        embeddings = []
+        for shard_embeddings in await asyncio.gather(*futures):
+            embeddings.extend(shard_embeddings)
+        return embeddings
+
     @time_execution
     async def embed(self, documents: List[Document], is_query: bool = False) -> List[Document]:
         """
@@ -40,16 +268,14 @@ class E5Embedder(BaseEmbedder):
         # Prepare texts with appropriate prefix
         prefix = "query: " if is_query else "passage: "
         texts = [f"{prefix}{doc.content}" for doc in documents]
-        
+        set_attributes(batch_size=len(texts), is_query=is_query)
+
         logger.debug(f"Generating embeddings for {len(texts)} documents (is_query={is_query})")
-        
-        # Run in thread pool as sentence-transformers is sync/CPU-bound
-        embeddings = await asyncio.to_thread(
-            lambda: self.model.encode(texts, normalize_embeddings=True)
-        )
-        
+
+        embeddings = self._project(await self._encode(texts))
+
         # Assign embeddings back to documents
         for doc, embedding in zip(documents, embeddings):
             doc.embedding = embedding.tolist()
-            
+
         return documents
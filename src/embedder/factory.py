@@ -1,9 +1,19 @@
-from typing import Dict, Type, Any
+import importlib
+from typing import Dict, Type, Any, List
 from src.embedder.base import BaseEmbedder
 
 class EmbedderFactory:
     _registry: Dict[str, Type[BaseEmbedder]] = {}
 
+    # Built-in embedders by module path. Modules are imported on first create()
+    # so processes only pay import time for the backends they actually use.
+    _lazy_registry: Dict[str, str] = {
+        "openai": "src.embedder.openai_embedder",
+        "bm25": "src.embedder.bm25_embedder",
+        "e5": "src.embedder.e5_embedder",
+        "hash": "src.embedder.hash_embedder",
+    }
+
     @classmethod
     def register(cls, name: str):
         def decorator(embedder_cls: Type[BaseEmbedder]):
@@ -12,7 +22,23 @@ class EmbedderFactory:
         return decorator
 
     @classmethod
-    def create(cls, name: str, **kwargs: Any) -> BaseEmbedder:
+    def register_lazy(cls, name: str, module_path: str):
+        """Register an embedder by module path; the module must use @register(name)"""
+        cls._lazy_registry[name] = module_path
+
+    @classmethod
+    def available(cls) -> List[str]:
+        return sorted(set(cls._registry) | set(cls._lazy_registry))
+
+    @classmethod
+    def get(cls, name: str) -> Type[BaseEmbedder]:
+        if name not in cls._registry and name in cls._lazy_registry:
+            # Importing the module runs its @register decorator
+            importlib.import_module(cls._lazy_registry[name])
         if name not in cls._registry:
-            raise ValueError(f"Embedder '{name}' not found. Available: {list(cls._registry.keys())}")
-        return cls._registry[name](**kwargs)
+            raise ValueError(f"Embedder '{name}' not found. Available: {cls.available()}")
+        return cls._registry[name]
+
+    @classmethod
+    def create(cls, name: str, **kwargs: Any) -> BaseEmbedder:
+        return cls.get(name)(**kwargs)
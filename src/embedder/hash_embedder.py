@@ -0,0 +1,73 @@
+import math
+import os
+import re
+import hashlib
+from collections import Counter
+from typing import List, Dict
+from src.models import Document
+from src.embedder.base import BaseEmbedder
+from src.embedder.factory import EmbedderFactory
+from src.utils.logger import logger
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+@EmbedderFactory.register("hash")
+class HashEmbedder(BaseEmbedder):
+    """
+    Deterministic, dependency-free embedder using feature hashing of word unigrams and bigrams.
+    Vectors only capture lexical overlap, so it is meant for offline evaluation and tests
+    (see eval_retrieval.py), not for production retrieval quality.
+
+    With sparse=True it fills sparse_embedding instead (term-frequency weights keyed by
+    token hash), standing in for BM25 in hybrid search without a model download.
+    """
+
+    def __init__(self, dimensions: int = None, sparse: bool = False):
+        """
+        Args:
+            dimensions: Dense vector size. If None, reads HASH_EMBEDDER_DIM from env (default 256).
+            sparse: If True, produce sparse vectors instead of dense ones
+        """
+        self.dimensions = dimensions or int(os.getenv("HASH_EMBEDDER_DIM", "256"))
+        self.sparse = sparse
+        logger.info(f"Initialized HashEmbedder (dimensions={self.dimensions}, sparse={sparse})")
+
+    @property
+    def identity(self) -> str:
+        return f"hash:{'sparse' if self.sparse else self.dimensions}"
+
+    @staticmethod
+    def _features(text: str) -> Counter:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+    @staticmethod
+    def _hash(feature: str) -> int:
+        # Stable across processes, unlike hash()
+        return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+    def _dense(self, features: Counter) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for feature, count in features.items():
+            h = self._hash(feature)
+            # Sign bit reduces the bias from hash collisions
+            vector[h % self.dimensions] += (1.0 + math.log(count)) * (1 if (h >> 63) & 1 else -1)
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _sparse(self, features: Counter, is_query: bool) -> Dict[str, list]:
+        weights: Dict[int, float] = {}
+        for feature, count in features.items():
+            index = self._hash(feature) % (2 ** 31)
+            weights[index] = weights.get(index, 0.0) + (1.0 if is_query else 1.0 + math.log(count))
+        indices = sorted(weights)
+        return {"indices": indices, "values": [weights[i] for i in indices]}
+
+    async def embed(self, documents: List[Document], is_query: bool = False) -> List[Document]:
+        for doc in documents:
+            features = self._features(doc.content)
+            if self.sparse:
+                doc.sparse_embedding = self._sparse(features, is_query)
+            else:
+                doc.embedding = self._dense(features)
+        return documents
@@ -0,0 +1,36 @@
+from typing import List
+import asyncio
+from src.models import Document
+from src.embedder.base import BaseEmbedder
+from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
+
+
+class HybridEmbedder(BaseEmbedder):
+    """
+    Runs a dense and a sparse embedder concurrently over the same documents.
+    The two write different fields (embedding / sparse_embedding), so latency
+    is the slower of the two stages instead of their sum.
+    """
+
+    def __init__(self, dense: BaseEmbedder, sparse: BaseEmbedder):
+        self.dense = dense
+        self.sparse = sparse
+
+    @property
+    def identity(self) -> str:
+        return f"{self.dense.identity}+{self.sparse.identity}"
+
+    def close(self):
+        self.dense.close()
+        self.sparse.close()
+
+    @time_execution
+    async def embed(self, documents: List[Document], is_query: bool = False) -> List[Document]:
+        set_attributes(batch_size=len(documents), is_query=is_query)
+        logger.debug(f"Generating dense + sparse embeddings for {len(documents)} documents concurrently")
+        await asyncio.gather(
+            self.dense.embed(documents, is_query=is_query),
+            self.sparse.embed(documents, is_query=is_query)
+        )
+        return documents
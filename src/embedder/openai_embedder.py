@@ -1,17 +1,33 @@
-from typing import List
+from typing import List, Optional
+import os
 import asyncio
 from openai import AsyncOpenAI
 from src.models import Document
 from src.embedder.base import BaseEmbedder
 from src.embedder.factory import EmbedderFactory
 from src.utils.logger import logger, time_execution
+from src.utils.tracing import set_attributes
 
 @EmbedderFactory.register("openai")
 class OpenAIEmbedder(BaseEmbedder):
-    def __init__(self, model: str = "text-embedding-3-small"):
+    def __init__(self, model: str = "text-embedding-3-small", dimensions: Optional[int] = None):
+        """
+        Args:
+            model: OpenAI embedding model
+            dimensions: Target output dimensionality (text-embedding-3 only).
+                If None, reads EMBEDDING_DIMENSIONS from env; unset means the model's full size.
+                The API shortens Matryoshka-style and returns re-normalised vectors.
+        """
         self.client = AsyncOpenAI()
         self.model = model
-        logger.info(f"Initialized OpenAIEmbedder with model='{model}'")
+        if dimensions is None and os.getenv("EMBEDDING_DIMENSIONS"):
+            dimensions = int(os.getenv("EMBEDDING_DIMENSIONS"))
+        self.dimensions = dimensions
+        logger.info(f"Initialized OpenAIEmbedder with model='{model}', dimensions={dimensions}")
+
+    @property
+    def identity(self) -> str:
+        return f"openai:{self.model}:{self.dimensions or 'full'}"
     
     @time_execution
     async def embed(self, documents: List[Document], is_query: bool = False) -> List[Document]:
@@ -27,16 +43,17 @@ class OpenAIEmbedder(BaseEmbedder):
         """
         batch_size = 100
         total_docs = len(documents)
+        set_attributes(batch_size=total_docs, is_query=is_query, model=self.model)
         logger.debug(f"Generating embeddings for {total_docs} documents using OpenAI")
         
         for i in range(0, total_docs, batch_size):
             batch = documents[i:i + batch_size]
             texts = [doc.content for doc in batch]
             
-            response = await self.client.embeddings.create(
-                input=texts,
-                model=self.model
-            )
+            params = {"input": texts, "model": self.model}
+            if self.dimensions:
+                params["dimensions"] = self.dimensions
+            response = await self.client.embeddings.create(**params)
             
             for doc, embedding_data in zip(batch, response.data):
                 doc.embedding = embedding_data.embedding
@@ -0,0 +1,310 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Union, get_args, get_origin, Literal
+from pydantic import BaseModel, ConfigDict, model_validator
+from src.models import DocMetadata, filterable_fields
+
+# Reserved keys of the dict form (see parse_filter)
+LOGICAL_KEYS = {"and", "or", "not"}
+RANGE_KEYS = ("gt", "gte", "lt", "lte")
+RANGE_SYMBOLS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+# Candidate delimiters for OData search.in (the first one absent from every value is used)
+SEARCH_IN_DELIMITERS = ("|", ",", ";", "~", "^", "#")
+
+def _allowed_values(field: str) -> Optional[Tuple[Any, ...]]:
+    """Values a Literal DocMetadata field can take (None for free-form fields)"""
+    annotation = DocMetadata.model_fields[field].annotation
+    return get_args(annotation) if get_origin(annotation) is Literal else None
+
+def _coerce(field: str, value: Any) -> Any:
+    """Validate a filter value against the DocMetadata field it targets"""
+    kinds = filterable_fields()
+    if field not in kinds:
+        raise ValueError(f"'{field}' is not a filterable field. Filterable: {sorted(kinds)}")
+    kind = kinds[field]
+    if kind == 'keyword':
+        allowed = _allowed_values(field)
+        if not isinstance(value, str) or (allowed is not None and value not in allowed):
+            raise ValueError(f"Invalid {field} '{value}'" + (f". Allowed: {list(allowed)}" if allowed else ""))
+        return value
+    if kind == 'integer':
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"{field} must be an integer, got {value!r}")
+        return value
+    # datetime: ISO strings are accepted; naive values are taken as UTC (like DocMetadata.created_at)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"{field} must be a datetime or ISO 8601 string, got {value!r}")
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _format(value: Any) -> str:
+    return repr(value.isoformat() if isinstance(value, datetime) else value)
+
+
+def _canonical(operands) -> Tuple["FilterExpr", ...]:
+    """Deduplicated operands of an And/Or, sorted by their text form"""
+    return tuple(sorted(dict.fromkeys(operands), key=str))
+
+
+class FilterExpr(BaseModel):
+    """
+    Typed metadata filter, validated against DocMetadata when built. Combine with & | ~:
+        In("product", ["product_a", "product_b"]) & Range("page_number", gte=3)
+
+    Expressions are immutable and hashable, so adapters memoise their compiled form
+    (see QdrantAdapter, AzureAdapter and LocalAdapter).
+    """
+    model_config = ConfigDict(frozen=True)
+
+    def __and__(self, other: "FilterExpr") -> "FilterExpr":
+        return And(self, other)
+
+    def __or__(self, other: "FilterExpr") -> "FilterExpr":
+        return Or(self, other)
+
+    def __invert__(self) -> "FilterExpr":
+        return Not(self)
+
+    def matches(self, metadata: DocMetadata) -> bool:
+        """Evaluate the filter against one document's metadata"""
+        raise NotImplementedError
+
+
+class Eq(FilterExpr):
+    field: str
+    value: Any
+
+    def __init__(self, field: str, value: Any):
+        super().__init__(field=field, value=value)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _validate(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {**data, "value": _coerce(data["field"], data["value"])}
+
+    def matches(self, metadata: DocMetadata) -> bool:
+        return getattr(metadata, self.field) == self.value
+
+    def __str__(self) -> str:
+        return f"{self.field} = {_format(self.value)}"
+
+
+class In(FilterExpr):
+    field: str
+    values: Tuple[Any, ...]
+
+    def __init__(self, field: str, values):
+        super().__init__(field=field, values=values)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _validate(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        values = data["values"]
+        if isinstance(values, (str, bytes)) or not values:
+            raise ValueError(f"In({data['field']}) needs a non-empty list of values")
+        # Sorted and deduplicated, so equal sets hash (and memoise) the same
+        return {**data, "values": tuple(sorted({_coerce(data["field"], value) for value in values}))}
+
+    def matches(self, metadata: DocMetadata) -> bool:
+        return getattr(metadata, self.field) in self.values
+
+    def __str__(self) -> str:
+        return f"{self.field} in ({', '.join(_format(value) for value in self.values)})"
+
+
+class Range(FilterExpr):
+    """Bounds on an integer or datetime field; missing values never match"""
+    field: str
+    gt: Any = None
+    gte: Any = None
+    lt: Any = None
+    lte: Any = None
+
+    def __init__(self, field: str, gt: Any = None, gte: Any = None, lt: Any = None, lte: Any = None):
+        super().__init__(field=field, gt=gt, gte=gte, lt=lt, lte=lte)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _validate(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        field = data["field"]
+        if filterable_fields().get(field) not in ('integer', 'datetime'):
+            raise ValueError(f"Range filters need an integer or datetime field, got '{field}'")
+        bounds = {key: _coerce(field, data[key]) for key in RANGE_KEYS if data.get(key) is not None}
+        if not bounds:
+            raise ValueError(f"Range({field}) needs at least one of {list(RANGE_KEYS)}")
+        return {"field": field, **bounds}
+
+    @property
+    def bounds(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in RANGE_KEYS if getattr(self, key) is not None}
+
+    def matches(self, metadata: DocMetadata) -> bool:
+        value = getattr(metadata, self.field)
+        if value is None:
+            return False
+        if isinstance(value, datetime) and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        checks = {"gt": value.__gt__, "gte": value.__ge__, "lt": value.__lt__, "lte": value.__le__}
+        return all(checks[key](bound) for key, bound in self.bounds.items())
+
+    def __str__(self) -> str:
+        return " and ".join(f"{self.field} {RANGE_SYMBOLS[key]} {_format(bound)}" for key, bound in self.bounds.items())
+
+
+class Not(FilterExpr):
+    operand: FilterExpr
+
+    def __init__(self, operand: FilterExpr):
+        super().__init__(operand=operand)
+
+    def matches(self, metadata: DocMetadata) -> bool:
+        return not self.operand.matches(metadata)
+
+    def __str__(self) -> str:
+        return f"not ({self.operand})"
+
+
+class And(FilterExpr):
+    operands: Tuple[FilterExpr, ...]
+
+    def __init__(self, *operands: FilterExpr):
+        # Nested Ands are flattened and operands put in a canonical order, so (a & b) & c == c & (b & a)
+        # and equal filters built in a different order hash (and cache) the same
+        flat = []
+        for operand in operands:
+            flat.extend(operand.operands if isinstance(operand, And) else [operand])
+        if not flat:
+            raise ValueError("And() needs at least one operand")
+        super().__init__(operands=_canonical(flat))
+
+    def matches(self, metadata: DocMetadata) -> bool:
+        return all(operand.matches(metadata) for operand in self.operands)
+
+    def __str__(self) -> str:
+        return " and ".join(f"({operand})" for operand in self.operands)
+
+
+class Or(FilterExpr):
+    operands: Tuple[FilterExpr, ...]
+
+    def __init__(self, *operands: FilterExpr):
+        flat = []
+        for operand in operands:
+            flat.extend(operand.operands if isinstance(operand, Or) else [operand])
+        if not flat:
+            raise ValueError("Or() needs at least one operand")
+        super().__init__(operands=_canonical(flat))
+
+    def matches(self, metadata: DocMetadata) -> bool:
+        return any(operand.matches(metadata) for operand in self.operands)
+
+    def __str__(self) -> str:
+        return " or ".join(f"({operand})" for operand in self.operands)
+
+
+Filters = Union[FilterExpr, Dict[str, Any]]
+
+def parse_filter(filters: Optional[Filters]) -> Optional[FilterExpr]:
+    """
+    Build a FilterExpr from an expression or its dict form (JSON-friendly, e.g. for the HTTP API).
+    Entries of a dict are ANDed:
+        {"product": "product_a"}                          equality (the legacy form)
+        {"product": ["product_a", "product_b"]}          membership
+        {"page_number": {"gte": 3, "lt": 10}}            range (integer and datetime fields)
+        {"or": [{...}, {...}]}, {"and": [...]}, {"not": {...}}
+
+    Args:
+        filters: Expression, dict form, or None/empty for no filter
+
+    Returns:
+        The expression, or None when there is nothing to filter on
+
+    Raises:
+        ValueError: If a field is not filterable or a value does not fit DocMetadata
+    """
+    if filters is None or isinstance(filters, FilterExpr):
+        return filters
+    if not isinstance(filters, dict):
+        raise ValueError(f"Filters must be a dict or FilterExpr, got {type(filters).__name__}")
+
+    clauses = []
+    for key, value in filters.items():
+        if key in ("and", "or"):
+            operands = [parse_filter(item) for item in value]
+            operands = [operand for operand in operands if operand is not None]
+            if operands:
+                clauses.append(And(*operands) if key == "and" else Or(*operands))
+        elif key == "not":
+            operand = parse_filter(value)
+            if operand is not None:
+                clauses.append(Not(operand))
+        elif isinstance(value, dict):
+            unknown = set(value) - set(RANGE_KEYS)
+            if unknown:
+                raise ValueError(f"Unknown range operators for '{key}': {sorted(unknown)}")
+            clauses.append(Range(key, **value))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            clauses.append(In(key, value))
+        else:
+            clauses.append(Eq(key, value))
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else And(*clauses)
+
+def pinned_values(expr: Optional[FilterExpr], field: str) -> Tuple[Optional[Tuple[Any, ...]], Optional[FilterExpr]]:
+    """
+    Values `field` is restricted to by a top-level Eq/In (alone or inside a top-level And),
+    and the rest of the expression. Used to route queries to partitions.
+
+    Returns:
+        (allowed values or None if unrestricted, remaining expression or None)
+    """
+    if expr is None:
+        return None, None
+    clauses = expr.operands if isinstance(expr, And) else (expr,)
+    allowed = None
+    remaining = []
+    for clause in clauses:
+        if isinstance(clause, (Eq, In)) and clause.field == field:
+            values = (clause.value,) if isinstance(clause, Eq) else clause.values
+            allowed = values if allowed is None else tuple(v for v in allowed if v in values)
+        else:
+            remaining.append(clause)
+    if allowed is None:
+        return None, expr
+    return allowed, (And(*remaining) if len(remaining) > 1 else (remaining[0] if remaining else None))
+
+def _odata_literal(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    if isinstance(value, int):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+@lru_cache(maxsize=1024)
+def to_odata(expr: FilterExpr) -> str:
+    """
+    Compile to an Azure AI Search OData filter. String literals are quote-escaped and
+    string membership uses search.in, which the service evaluates much faster than a chain of ORs.
+    """
+    if isinstance(expr, Eq):
+        return f"{expr.field} eq {_odata_literal(expr.value)}"
+    if isinstance(expr, In):
+        if all(isinstance(value, str) for value in expr.values):
+            delimiter = next((d for d in SEARCH_IN_DELIMITERS if not any(d in value for value in expr.values)), None)
+            if delimiter is not None:
+                joined = delimiter.join(expr.values).replace("'", "''")
+                return f"search.in({expr.field}, '{joined}', '{delimiter}')"
+        return "(" + " or ".join(f"{expr.field} eq {_odata_literal(value)}" for value in expr.values) + ")"
+    if isinstance(expr, Range):
+        operators = {"gt": "gt", "gte": "ge", "lt": "lt", "lte": "le"}
+        return " and ".join(f"{expr.field} {operators[key]} {_odata_literal(bound)}" for key, bound in expr.bounds.items())
+    if isinstance(expr, Not):
+        return f"not ({to_odata(expr.operand)})"
+    if isinstance(expr, (And, Or)):
+        joiner = " and " if isinstance(expr, And) else " or "
+        return joiner.join(f"({to_odata(operand)})" for operand in expr.operands)
+    raise TypeError(f"Unsupported filter expression {type(expr).__name__}")
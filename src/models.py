@@ -1,4 +1,5 @@
-from typing import List, Optional, Literal
+from functools import lru_cache
+from typing import List, Dict, Optional, Literal, Union, get_args, get_origin
 from uuid import UUID, uuid4
 from datetime import datetime, timezone
 from pydantic import BaseModel, Field
@@ -26,6 +27,34 @@ class DocMetadata(BaseModel):
         if self.created_at is None:
             self.created_at = datetime.now(timezone.utc)
 
+# Filterable field kinds, mapped to backend index types by the adapters
+FieldKind = Literal['keyword', 'integer', 'datetime']
+
+# Free-text string fields that are still filtered/grouped on exactly
+KEYWORD_FIELDS = {'parent_id'}
+
+@lru_cache(maxsize=1)
+def filterable_fields() -> Dict[str, FieldKind]:
+    """
+    Derive the filterable-field schema from DocMetadata:
+    Literal fields and KEYWORD_FIELDS -> 'keyword', int -> 'integer', datetime -> 'datetime'.
+    """
+    schema = {}
+    for name, field in DocMetadata.model_fields.items():
+        annotation = field.annotation
+        # Unwrap Optional[X]
+        if get_origin(annotation) is Union:
+            args = [a for a in get_args(annotation) if a is not type(None)]
+            annotation = args[0] if len(args) == 1 else annotation
+        
+        if get_origin(annotation) is Literal or name in KEYWORD_FIELDS:
+            schema[name] = 'keyword'
+        elif annotation is int:
+            schema[name] = 'integer'
+        elif annotation is datetime:
+            schema[name] = 'datetime'
+    return schema
+
 class Document(BaseModel):
     id: UUID = None
     content: str
@@ -3,22 +3,52 @@ import asyncio
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from src.models import ProductType, ContentType, SourceType, Document, DocMetadata
-from src.embedder import EmbedderFactory
-from src.db import VectorDBFactory
+from src.embedder import EmbedderFactory, BaseEmbedder, MicroBatchEmbedder, QueryEmbeddingCache, CachedEmbedder
+from src.db import VectorDBFactory, BaseVectorDB, ClientRegistry, PartitionedVectorDB
+from src.db.events import UpsertEvents
+from src.semantic_cache import SemanticCache
+from src.cache_invalidation import collection_name
+from src.filters import Filters, parse_filter
 from src.utils.logger import logger, time_execution
+from src.utils.tracing import span, set_attributes
+from src.utils.deadline import Deadline, LatencyTracker, run_hedged
 
 load_dotenv()
 
+class RetrievalResult(list):
+    """
+    Retrieved parent documents (a plain list) annotated with how they were found:
+    path is 'hybrid', 'dense', 'dense_fallback' (sparse dropped to meet the deadline) or 'cache',
+    timings holds seconds per stage and hedged lists the stages that sent a duplicate request.
+    """
+
+    def __init__(self, documents: List[Document], path: str, timings: Dict[str, float], hedged: List[str]):
+        super().__init__(documents)
+        self.path = path
+        self.timings = timings
+        self.hedged = hedged
+
 class RAGClient:
-    def __init__(self, use_hybrid: bool = None):
+    def __init__(self, use_hybrid: bool = None, batch_window_ms: float = None, db_type: str = None,
+                 embedder: Optional[BaseEmbedder] = None, sparse_embedder: Optional[BaseEmbedder] = None,
+                 db: Optional[BaseVectorDB] = None):
         """
         Initialize RAG Client
         
         Args:
             use_hybrid: If True, use hybrid search. If None, reads from env.
+            batch_window_ms: Micro-batching window for concurrent query embeddings.
+                If None, reads QUERY_BATCH_WINDOW_MS from env (0 disables batching).
+            db_type: Vector DB backend. If None, reads VECTOR_DB_TYPE from env.
+            embedder: Optional dense embedder (created from EMBEDDER_TYPE if None)
+            sparse_embedder: Optional sparse embedder for hybrid search (BM25 if None)
+            db: Optional adapter to search, e.g. a specific collection (created from db_type if None).
+                The caller owns its lifecycle.
+
+        Embedders passed in are owned by the caller; the ones created here are closed by close().
         """
         embedder_type = os.getenv("EMBEDDER_TYPE", "openai")
-        db_type = os.getenv("VECTOR_DB_TYPE", "qdrant")
+        db_type = db_type or os.getenv("VECTOR_DB_TYPE", "qdrant")
         
         # Store for later use
         self.db_type = db_type
@@ -30,92 +60,298 @@ class RAGClient:
         
         logger.info(f"Initializing RAG Client with embedder={embedder_type}, db={db_type}, hybrid={use_hybrid}")
         
-        self.embedder = EmbedderFactory.create(embedder_type)
+        self.embedder = embedder or EmbedderFactory.create(embedder_type)
+        self._owns_embedder = embedder is None
         
-        # Initialize sparse embedder for Qdrant hybrid search only
-        self.sparse_embedder = None
-        if self.use_hybrid and db_type == "qdrant":
+        # Initialize sparse embedder for hybrid search on DBs that store sparse vectors (Qdrant, local)
+        supports_sparse = db.supports_sparse if db is not None else VectorDBFactory.get(db_type).supports_sparse
+        self.sparse_embedder = sparse_embedder if self.use_hybrid and supports_sparse else None
+        self._owns_sparse_embedder = False
+        if self.use_hybrid and supports_sparse and self.sparse_embedder is None:
             try:
                 from src.embedder.bm25_embedder import BM25Embedder
                 self.sparse_embedder = BM25Embedder()
+                self._owns_sparse_embedder = True
                 logger.info("Initialized BM25 sparse embedder for hybrid search")
             except ImportError:
                 logger.error("fastembed not installed. Required for Qdrant hybrid search.")
                 raise Exception("fastembed not installed. Required for Qdrant hybrid search.")
         
-        # Initialize database adapter
-        if db_type == "qdrant":
-            self.db = VectorDBFactory.create(db_type, use_hybrid=self.use_hybrid)
+        # Coalesce concurrent query embeddings (dense and sparse) into batches
+        if batch_window_ms is None:
+            batch_window_ms = float(os.getenv("QUERY_BATCH_WINDOW_MS", "0"))
+        if batch_window_ms > 0:
+            max_batch_size = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+            self.embedder = MicroBatchEmbedder(self.embedder, window_ms=batch_window_ms, max_batch_size=max_batch_size)
+            if self.sparse_embedder:
+                self.sparse_embedder = MicroBatchEmbedder(self.sparse_embedder, window_ms=batch_window_ms, max_batch_size=max_batch_size)
+        
+        # Cache query embeddings so repeated queries skip the embedder entirely
+        self.query_cache = None
+        cache_size = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+        if cache_size > 0:
+            cache_ttl = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+            self.query_cache = QueryEmbeddingCache(max_size=cache_size, ttl_seconds=cache_ttl)
+            self.embedder = CachedEmbedder(self.embedder, self.query_cache)
+            if self.sparse_embedder:
+                self.sparse_embedder = CachedEmbedder(self.sparse_embedder, self.query_cache, sparse=True)
+        
+        # Latency budgets and hedging (see retrieve)
+        self.deadline_ms = float(os.getenv("RETRIEVAL_DEADLINE_MS", "0"))
+        self.embed_budget_fraction = float(os.getenv("RETRIEVAL_EMBED_BUDGET", "0.4"))
+        # Hedging re-sends a stage still running past this latency percentile: it trims tail latency but
+        # pays for a duplicate embedding/search call each time, so it is off (0) unless configured
+        self.hedge_percentile = float(os.getenv("HEDGE_PERCENTILE", "0"))
+        # Percentile used to predict whether the sparse path would miss the deadline
+        self.predict_percentile = self.hedge_percentile or 95
+        self.latency = LatencyTracker(window=int(os.getenv("LATENCY_WINDOW", "500")))
+        
+        # Initialize database adapter (one per partition when PARTITION_KEY is set)
+        db_kwargs = {"use_hybrid": self.use_hybrid} if supports_sparse else {}
+        partition_key = os.getenv("PARTITION_KEY")
+        if db is not None:
+            self.db = db
+        elif partition_key:
+            self.db = PartitionedVectorDB(db_type, partition_key, **db_kwargs)
         else:
-            self.db = VectorDBFactory.create(db_type)
+            self.db = VectorDBFactory.create(db_type, **db_kwargs)
+        
+        # Serve paraphrased queries from recent results, invalidated when our collections are written to.
+        # The cache is per process: writers in other processes notify it via src.cache_invalidation.
+        self.semantic_cache = None
+        semantic_cache_size = int(os.getenv("SEMANTIC_CACHE_SIZE", "0"))
+        if semantic_cache_size > 0:
+            self.semantic_cache = SemanticCache(
+                max_size=semantic_cache_size,
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+                ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "300"))
+            )
+            UpsertEvents.subscribe(self._on_collection_changed)
 
     @time_execution
-    async def retrieve(self, query: str, filters: Optional[Dict[str, str]] = None, limit: int = 5, hybrid_search: bool = None):
+    async def retrieve(self, query: str, filters: Optional[Filters] = None, limit: int = 5, hybrid_search: bool = None,
+                       deadline_ms: Optional[float] = None, hnsw_ef: Optional[int] = None,
+                       exact: bool = False) -> "RetrievalResult":
         """
         Retrieve documents relevant to the query
         
         Args:
             query: Search query text
-            filters: Optional metadata filters
+            filters: Optional metadata filter: a src.filters.FilterExpr (e.g. In("product", [...]) & Range(...))
+                or its dict form ({"product": "product_a"}). Evaluated by the vector DB.
             limit: Number of parent documents to return
             hybrid_search: If True/False, override default hybrid search setting
+            deadline_ms: Latency budget for the whole call, split across the embed and search
+                stages. If None, reads RETRIEVAL_DEADLINE_MS from env (0 disables).
+                The sparse path is dropped (dense-only search) when it would miss the deadline.
+                With HEDGE_PERCENTILE set (default 0, off), a stage still running past that latency
+                percentile is re-sent and the first answer wins, at the cost of duplicate paid calls.
+            hnsw_ef: HNSW search beam width for this query, overriding the index profile
+                (higher: better recall, slower). Ignored by backends without per-query ef.
+            exact: If True, bypass the ANN index (exact kNN, e.g. to measure ANN recall)
             
         Returns:
-            List of parent documents
+            List of parent documents, with the search path taken and per-stage timings attached
+        
+        Raises:
+            ValueError: If the filter names a non-filterable field or a value DocMetadata does not allow
+            asyncio.TimeoutError: If dense embedding or search cannot finish within the deadline
         """
         logger.info(f"Retrieving for query: '{query}'")
         
-        # 1. Sanitize filters
-        sanitized_filters = {}
-        if filters:
-            for key, value in filters.items():
-                if key == 'product':
-                    if value in ['product_a', 'product_b', 'product_c', 'general']:
-                        sanitized_filters[key] = value
-                elif key == 'content_type':
-                    if value in ['faq', 'description', 'price', 'terms', 'other']:
-                        sanitized_filters[key] = value
-                elif key == 'source_type':
-                    if value in ['pdf', 'markdown']:
-                        sanitized_filters[key] = value
-            logger.debug(f"Sanitized filters: {sanitized_filters}")
-        
-        # 2. Embed query (dense vector)
-        dummy_doc = Document(content=query, metadata=DocMetadata(source_type='markdown'))
-        embedded_docs = await self.embedder.embed([dummy_doc], is_query=True)
-        query_vector = embedded_docs[0].embedding
-        
-        # Auto-detect vector size and set env var for DB adapters
-        if query_vector:
-            os.environ["VECTOR_SIZE"] = str(len(query_vector))
+        # 1. Validate filters
+        query_filter = parse_filter(filters)
         
-        # 3. Prepare hybrid search parameters based on DB type
+        # 2. Prepare hybrid search parameters based on DB type
         if hybrid_search is None:
             hybrid_search = self.use_hybrid
         
-        sparse_query_vector = None
+        use_sparse = hybrid_search and self.db.supports_sparse and self.sparse_embedder is not None
         search_text = None
+        if hybrid_search and self.db_type == "azure":
+            # Pass query text for Azure hybrid search
+            search_text = query
+        
+        if deadline_ms is None:
+            deadline_ms = self.deadline_ms
+        deadline = Deadline(deadline_ms) if deadline_ms else None
+        timings: Dict[str, float] = {}
+        hedged: List[str] = []
+        mode = "hybrid" if (use_sparse or search_text) else "dense"
+        path = mode
+        set_attributes(limit=limit, filters=str(query_filter) if query_filter else None, mode=mode, deadline_ms=deadline_ms or 0,
+                       hnsw_ef=hnsw_ef, exact=exact)
+        
+        # 3. Embed query: dense vector, plus sparse vector for Qdrant/local hybrid (concurrently).
+        # Each attempt embeds fresh documents, so hedged duplicates never share state.
+        embed_budget = deadline.budget(self.embed_budget_fraction) if deadline else None
+        dense_task = asyncio.create_task(self._run_stage(
+            "embed", lambda: self._embed_queries([query], use_sparse=False), embed_budget, timings, hedged
+        ))
+        sparse_task = None
+        if use_sparse and deadline:
+            predicted = self.latency.percentile("sparse_embed", self.predict_percentile)
+            if predicted is not None and predicted > embed_budget:
+                logger.warning(f"Sparse embedding p{self.predict_percentile:g} ({predicted * 1000:.0f} ms) exceeds its budget; searching dense-only")
+                use_sparse = False
+                path = "dense_fallback"
+        if use_sparse:
+            sparse_task = asyncio.create_task(self._run_stage(
+                "sparse_embed", lambda: self._embed_sparse([query]), embed_budget, timings, hedged
+            ))
+        try:
+            query_doc = (await dense_task)[0]
+        except BaseException:
+            if sparse_task:
+                sparse_task.cancel()
+            raise
+        
+        # Paraphrases of recent queries with the same filters, limit, mode and search params skip the search
+        cache_scope = (query_filter, limit, mode, hnsw_ef, exact)
+        if self.semantic_cache:
+            cached = self.semantic_cache.lookup(query_doc.embedding, cache_scope)
+            set_attributes(semantic_cache="miss" if cached is None else "hit")
+            if cached is not None:
+                if sparse_task:
+                    sparse_task.cancel()
+                set_attributes(path="cache", hits=len(cached))
+                logger.info(f"Retrieved {len(cached)} parent documents (path=cache)")
+                return RetrievalResult(cached, path="cache", timings=timings, hedged=hedged)
+        
+        if sparse_task:
+            try:
+                # Bounded by the same embed budget as the dense stage
+                query_doc.sparse_embedding = (await sparse_task)[0].sparse_embedding
+            except asyncio.TimeoutError:
+                logger.warning("Sparse query embedding missed its budget; falling back to dense-only search")
+                use_sparse = False
+                path = "dense_fallback"
+        
+        # Drop the hybrid path if it is predicted not to fit in the remaining budget
+        if deadline and path == "hybrid":
+            predicted = self.latency.percentile("search_hybrid", self.predict_percentile)
+            if predicted is not None and predicted > deadline.remaining():
+                logger.warning(f"Hybrid search p{self.predict_percentile:g} ({predicted * 1000:.0f} ms) exceeds the remaining budget; searching dense-only")
+                use_sparse = False
+                search_text = None
+                path = "dense_fallback"
         
-        if hybrid_search:
-            if self.db_type == "qdrant":
-                # Generate sparse vector for Qdrant
-                if self.sparse_embedder:
-                    sparse_docs = await self.sparse_embedder.embed([dummy_doc])
-                    sparse_query_vector = sparse_docs[0].sparse_embedding
-            elif self.db_type == "azure":
-                # Pass query text for Azure hybrid search
-                search_text = query
-        
-        # 4. Search (Child Chunks) - both params passed, each DB uses what it needs
-        child_docs = await self.db.search(
-            query_vector,
-            limit=limit * 2,  # Fetch more children to ensure enough parents
-            filters=sanitized_filters,
-            sparse_query_vector=sparse_query_vector,
-            search_text=search_text
+        # 4. Search (Child Chunks grouped by parent) - both params passed, each DB uses what it needs
+        child_docs = await self._run_stage(
+            "search_hybrid" if path == "hybrid" else "search_dense",
+            lambda: self.db.search(
+                query_doc.embedding,
+                limit=limit,
+                group_by="parent_id",  # One best child per parent, so `limit` distinct parents come back
+                filters=query_filter,
+                sparse_query_vector=query_doc.sparse_embedding if use_sparse else None,
+                search_text=search_text,
+                hnsw_ef=hnsw_ef,
+                exact=exact
+            ),
+            deadline.remaining() if deadline else None, timings, hedged
         )
         
         # 5. Deduplicate to Parent Chunks
+        with span("retrieve.to_parents", children=len(child_docs)):
+            parent_docs = RetrievalResult(self._to_parents(child_docs, limit), path=path, timings=timings, hedged=hedged)
+        if self.semantic_cache and path == mode:
+            # Degraded (fallback) results are not cached for the full-quality mode
+            self.semantic_cache.store(query_doc.embedding, cache_scope, parent_docs)
+        
+        set_attributes(path=path, hits=len(parent_docs), hedged=hedged)
+        logger.info(f"Retrieved {len(parent_docs)} parent documents (path={path})")
+        return parent_docs
+
+    async def _run_stage(self, stage: str, call, timeout: Optional[float], timings: Dict[str, float], hedged: List[str]):
+        """Run one retrieval stage with hedging past the tracked percentile, recording its latency"""
+        loop = asyncio.get_running_loop()
+        hedge_after = self.latency.percentile(stage, self.hedge_percentile) if self.hedge_percentile > 0 else None
+        start = loop.time()
+        with span(f"retrieve.{stage}", timeout_ms=round(timeout * 1000, 1) if timeout is not None else None) as stage_span:
+            result, was_hedged = await run_hedged(call, hedge_after=hedge_after, timeout=timeout)
+            stage_span.set_attributes(hedged=was_hedged)
+        elapsed = loop.time() - start
+        self.latency.record(stage, elapsed)
+        timings[stage] = elapsed
+        if was_hedged:
+            hedged.append(stage)
+        return result
+
+    @time_execution
+    async def retrieve_many(self, queries: List[str], filters: Optional[Filters] = None, limit: int = 5,
+                            hybrid_search: bool = None, hnsw_ef: Optional[int] = None,
+                            exact: bool = False) -> List[List[Document]]:
+        """
+        Retrieve documents for several queries with one embedding call and one batched DB search
+        (Qdrant's batch query endpoint, one matmul for the local store; Azure has no batch
+        endpoint, so its searches run concurrently)
+        
+        Args:
+            queries: Search query texts
+            filters: Optional metadata filter, applied to every query (see retrieve)
+            limit: Number of parent documents to return per query
+            hybrid_search: If True/False, override default hybrid search setting
+            hnsw_ef: HNSW search beam width for these queries (see retrieve)
+            exact: If True, bypass the ANN index (see retrieve)
+            
+        Returns:
+            List of parent documents per query, in query order
+        """
+        logger.info(f"Retrieving for {len(queries)} queries")
+        if not queries:
+            return []
+        
+        query_filter = parse_filter(filters)
+        
+        if hybrid_search is None:
+            hybrid_search = self.use_hybrid
+        use_sparse = hybrid_search and self.db.supports_sparse and self.sparse_embedder is not None
+        search_texts = list(queries) if hybrid_search and self.db_type == "azure" else None
+        set_attributes(queries=len(queries), limit=limit, filters=str(query_filter) if query_filter else None, hybrid=bool(use_sparse or search_texts))
+        
+        query_docs = await self._embed_queries(queries, use_sparse)
+        
+        results = await self.db.search_many(
+            [doc.embedding for doc in query_docs],
+            limit=limit,
+            group_by="parent_id",  # One best child per parent, so `limit` distinct parents come back
+            filters=query_filter,
+            sparse_query_vectors=[doc.sparse_embedding for doc in query_docs] if use_sparse else None,
+            search_texts=search_texts,
+            hnsw_ef=hnsw_ef,
+            exact=exact
+        )
+        
+        with span("retrieve.to_parents", children=sum(len(child_docs) for child_docs in results)):
+            parents_per_query = [self._to_parents(child_docs, limit) for child_docs in results]
+        set_attributes(hits=sum(len(p) for p in parents_per_query))
+        logger.info(f"Retrieved {sum(len(p) for p in parents_per_query)} parent documents for {len(queries)} queries")
+        return parents_per_query
+
+    async def _embed_sparse(self, queries: List[str]) -> List[Document]:
+        """Sparse-embed queries into fresh documents"""
+        query_docs = [Document(content=query, metadata=DocMetadata(source_type='markdown')) for query in queries]
+        return await self.sparse_embedder.embed(query_docs, is_query=True)
+
+    async def _embed_queries(self, queries: List[str], use_sparse: bool) -> List[Document]:
+        """Embed queries in one call per embedder, dense and sparse concurrently"""
+        query_docs = [Document(content=query, metadata=DocMetadata(source_type='markdown')) for query in queries]
+        if use_sparse:
+            await asyncio.gather(
+                self.embedder.embed(query_docs, is_query=True),
+                self.sparse_embedder.embed(query_docs, is_query=True)
+            )
+        else:
+            await self.embedder.embed(query_docs, is_query=True)
+        
+        # Auto-detect vector size and set env var for DB adapters
+        if query_docs and query_docs[0].embedding:
+            os.environ["VECTOR_SIZE"] = str(len(query_docs[0].embedding))
+        return query_docs
+
+    def _to_parents(self, child_docs: List[Document], limit: int) -> List[Document]:
+        """Deduplicate child chunks to their parent chunks, keeping rank order"""
         seen_parents = set()
         parent_docs = []
         
@@ -139,5 +375,52 @@ class RAGClient:
                 if len(parent_docs) >= limit:
                     break
         
-        logger.info(f"Retrieved {len(parent_docs)} parent documents")
         return parent_docs
+
+    async def warm_up(self):
+        """
+        Pay model load and connection setup once at service start:
+        runs a dummy query embedding and opens/pins the pooled DB connection.
+        The embedding runs first: it sets VECTOR_SIZE, which the DB needs if it creates the collection.
+        """
+        await self._embed_queries(["warm up"], use_sparse=self.sparse_embedder is not None)
+        await self.db.warm_up()
+        logger.info("RAG Client warmed up")
+
+    async def close(self):
+        """Close all shared DB clients on this event loop and the embedders this client created (call at service shutdown)"""
+        await ClientRegistry.close_all()
+        if self._owns_embedder:
+            await asyncio.to_thread(self.embedder.close)
+        if self.sparse_embedder and self._owns_sparse_embedder:
+            await asyncio.to_thread(self.sparse_embedder.close)
+
+    def _on_collection_changed(self, collection_id):
+        if collection_id in self.db.collection_ids:
+            self.semantic_cache.invalidate()
+
+    def invalidate_collections(self, names: Optional[List[str]] = None) -> bool:
+        """
+        Drop cached results after another process wrote to our collections
+        (see src.cache_invalidation; writes in this process invalidate automatically)
+
+        Args:
+            names: Collection names that changed (src.cache_invalidation.collection_name), or None for any
+
+        Returns:
+            True if the semantic cache was invalidated
+        """
+        if not self.semantic_cache:
+            return False
+        if names is not None and not {collection_name(key) for key in self.db.collection_ids} & set(names):
+            return False
+        self.semantic_cache.invalidate()
+        return True
+
+    def semantic_cache_stats(self) -> Dict:
+        """Semantic result cache hit rate and staleness (empty if disabled)"""
+        return self.semantic_cache.stats() if self.semantic_cache else {}
+
+    def cache_stats(self) -> Dict:
+        """Query embedding cache statistics (empty if caching is disabled)"""
+        return self.query_cache.stats() if self.query_cache else {}
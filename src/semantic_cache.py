@@ -0,0 +1,122 @@
+import time
+from typing import List, Dict, Optional, Any, Hashable
+import numpy as np
+from src.models import Document
+from src.utils.logger import logger
+
+
+class SemanticCache:
+    """
+    Small in-process vector index of recent retrieval results, so paraphrased queries
+    are answered without a DB round trip.
+
+    Entries are (query vector, scope) -> parent documents, where the scope holds
+    everything besides the query that shapes results (filters, limit, search mode).
+    A lookup hits when an unexpired entry of the same scope has cosine similarity
+    >= threshold with the query. Clients invalidate the cache when their collection
+    is written to (see src.db.events.UpsertEvents).
+
+    The cache lives in one process. Writes from other processes (ingestion, reindex,
+    shard loads) only reach it through the service's /invalidate endpoint (see
+    src.cache_invalidation); otherwise entries are served until ttl_seconds.
+    """
+
+    def __init__(self, max_size: int = 1024, threshold: float = 0.95, ttl_seconds: float = 300.0):
+        """
+        Args:
+            max_size: Maximum number of cached queries (least recently used are evicted)
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Entry lifetime in seconds (<= 0 disables expiry)
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+
+        self._vectors: Optional[np.ndarray] = None  # (max_size x dim) unit vectors, allocated on first store
+        self._scopes: List[Optional[Hashable]] = [None] * max_size
+        self._results: List[Optional[List[Document]]] = [None] * max_size
+        self._stored_at = np.zeros(max_size)
+        self._last_used = np.zeros(max_size)
+        self._occupied = np.zeros(max_size, dtype=bool)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.last_invalidated_at: Optional[float] = None
+        self._hit_ages: List[float] = []
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        return array / max(float(np.linalg.norm(array)), 1e-12)
+
+    def _live(self, now: float) -> np.ndarray:
+        """Mask of occupied, unexpired slots"""
+        if self.ttl_seconds <= 0:
+            return self._occupied.copy()
+        return self._occupied & (now - self._stored_at < self.ttl_seconds)
+
+    def lookup(self, vector: List[float], scope: Hashable) -> Optional[List[Document]]:
+        """Cached results for the closest query in the same scope, or None"""
+        now = time.monotonic()
+        if self._vectors is not None and len(vector) == self._vectors.shape[1]:
+            candidates = self._live(now) & np.fromiter((s == scope for s in self._scopes), dtype=bool, count=self.max_size)
+            if candidates.any():
+                similarities = np.where(candidates, self._vectors @ self._normalize(vector), -np.inf)
+                slot = int(np.argmax(similarities))
+                if similarities[slot] >= self.threshold:
+                    self.hits += 1
+                    self._last_used[slot] = now
+                    self._hit_ages.append(now - self._stored_at[slot])
+                    del self._hit_ages[:-1000]
+                    logger.debug(f"Semantic cache hit (similarity={similarities[slot]:.4f})")
+                    return [doc.model_copy() for doc in self._results[slot]]
+        self.misses += 1
+        return None
+
+    def store(self, vector: List[float], scope: Hashable, results: List[Document]):
+        now = time.monotonic()
+        if self._vectors is None or self._vectors.shape[1] != len(vector):
+            # First entry, or the embedder changed: start over at the new dimension
+            self._vectors = np.zeros((self.max_size, len(vector)), dtype=np.float32)
+            self._occupied[:] = False
+
+        live = self._live(now)
+        if not live.all():
+            slot = int(np.argmin(live))  # First free or expired slot
+        else:
+            slot = int(np.argmin(self._last_used))
+            self.evictions += 1
+
+        self._vectors[slot] = self._normalize(vector)
+        self._scopes[slot] = scope
+        self._results[slot] = [doc.model_copy() for doc in results]
+        self._stored_at[slot] = now
+        self._last_used[slot] = now
+        self._occupied[slot] = True
+
+    def invalidate(self):
+        """Drop every entry (called when the underlying collection changes)"""
+        self._occupied[:] = False
+        self._results = [None] * self.max_size
+        self.invalidations += 1
+        self.last_invalidated_at = time.monotonic()
+        logger.debug("Semantic cache invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and staleness (age of served entries) for monitoring"""
+        lookups = self.hits + self.misses
+        now = time.monotonic()
+        return {
+            "size": int(self._live(now).sum()),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "seconds_since_invalidation": now - self.last_invalidated_at if self.last_invalidated_at else None,
+            "mean_hit_age_seconds": float(np.mean(self._hit_ages)) if self._hit_ages else 0.0,
+            "max_hit_age_seconds": float(np.max(self._hit_ages)) if self._hit_ages else 0.0
+        }
@@ -0,0 +1,204 @@
+import os
+import json
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional, Iterator
+import numpy as np
+from src.models import Document, DocMetadata
+from src.utils.logger import logger, time_execution
+
+# On-disk layout of a shard directory:
+#   manifest.json          format version, vector size, embedder identity and the shard list
+#   shard-00000.npz        ids (uuid strings), dense vectors (float32 rows) and sparse vectors (CSR arrays)
+#   shard-00000.jsonl      one {"content", "metadata"} payload per row, in the same order
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+class ShardWriter:
+    """
+    Writes embedded documents to a shard directory, flushing a shard every `shard_size` rows.
+
+    The manifest is rewritten after every flushed shard, so embeddings survive a crash or
+    DB outage and can be loaded later with load_shards(). Writing to a directory that already
+    holds shards appends to it. Thread-safe.
+    """
+
+    def __init__(self, directory: str, shard_size: int = None, embedder_identity: Optional[str] = None):
+        """
+        Args:
+            directory: Shard directory (created if missing)
+            shard_size: Rows per shard. If None, reads SHARD_SIZE from env.
+            embedder_identity: Recorded in the manifest; appending with a different embedder is refused
+        """
+        self.directory = directory
+        self.shard_size = shard_size or int(os.getenv("SHARD_SIZE", "2000"))
+        self._buffer: List[Document] = []
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            self.manifest = read_manifest(directory)
+            if embedder_identity and self.manifest.get("embedder") not in (None, embedder_identity):
+                raise ValueError(f"Shards in {directory} were embedded with {self.manifest['embedder']}, not {embedder_identity}")
+        else:
+            self.manifest = {"format_version": FORMAT_VERSION, "dim": None, "embedder": embedder_identity, "shards": []}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, documents: List[Document]):
+        """Buffer embedded documents (those without a dense embedding are skipped)"""
+        with self._lock:
+            self._buffer.extend(doc for doc in documents if doc.embedding)
+            while len(self._buffer) >= self.shard_size:
+                self._flush(self._buffer[:self.shard_size])
+                self._buffer = self._buffer[self.shard_size:]
+
+    def close(self):
+        """Flush the remaining rows"""
+        with self._lock:
+            if self._buffer:
+                self._flush(self._buffer)
+                self._buffer = []
+            elif not os.path.exists(os.path.join(self.directory, MANIFEST_FILE)):
+                self._write_manifest()
+
+    def _write_manifest(self):
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _flush(self, documents: List[Document]):
+        dim = len(documents[0].embedding)
+        if self.manifest["dim"] is None:
+            self.manifest["dim"] = dim
+        elif self.manifest["dim"] != dim:
+            raise ValueError(f"Vector size {dim} does not match the shard directory ({self.manifest['dim']})")
+
+        # Sparse vectors as CSR: row i owns entries indptr[i]:indptr[i + 1]
+        indptr = [0]
+        indices: List[int] = []
+        values: List[float] = []
+        for doc in documents:
+            if doc.sparse_embedding:
+                indices.extend(doc.sparse_embedding["indices"])
+                values.extend(doc.sparse_embedding["values"])
+            indptr.append(len(indices))
+
+        name = f"shard-{len(self.manifest['shards']):05d}"
+        base = os.path.join(self.directory, name)
+        with open(base + ".npz.tmp", "wb") as f:
+            # Uncompressed: float vectors barely compress and loading should be I/O bound
+            np.savez(
+                f,
+                ids=np.array([str(doc.id) for doc in documents]),
+                vectors=np.asarray([doc.embedding for doc in documents], dtype=np.float32),
+                sparse_indptr=np.asarray(indptr, dtype=np.int64),
+                sparse_indices=np.asarray(indices, dtype=np.uint32),
+                sparse_values=np.asarray(values, dtype=np.float32)
+            )
+        with open(base + ".jsonl.tmp", "w", encoding="utf-8") as f:
+            for doc in documents:
+                f.write(json.dumps({"content": doc.content, "metadata": doc.metadata.model_dump(mode="json")}) + "\n")
+        os.replace(base + ".npz.tmp", base + ".npz")
+        os.replace(base + ".jsonl.tmp", base + ".jsonl")
+
+        self.manifest["shards"].append({"name": name, "count": len(documents), "sparse": bool(indices)})
+        self._write_manifest()
+        logger.info(f"Wrote {name} ({len(documents)} rows) to {self.directory}")
+
+def read_shard(directory: str, name: str) -> List[Document]:
+    """Load one shard back into embedded Documents"""
+    base = os.path.join(directory, name)
+    with np.load(base + ".npz") as arrays:
+        ids = arrays["ids"]
+        vectors = arrays["vectors"]
+        indptr = arrays["sparse_indptr"]
+        indices = arrays["sparse_indices"]
+        values = arrays["sparse_values"]
+
+    documents = []
+    with open(base + ".jsonl", encoding="utf-8") as f:
+        for row, line in enumerate(f):
+            payload = json.loads(line)
+            start, end = indptr[row], indptr[row + 1]
+            documents.append(Document(
+                id=str(ids[row]),
+                content=payload["content"],
+                metadata=DocMetadata(**payload["metadata"]),
+                embedding=vectors[row].tolist(),
+                sparse_embedding={
+                    "indices": indices[start:end].tolist(),
+                    "values": values[start:end].tolist()
+                } if end > start else None
+            ))
+    return documents
+
+def iter_shards(directory: str) -> Iterator[List[Document]]:
+    """Yield the documents of each shard in manifest order"""
+    for shard in read_manifest(directory)["shards"]:
+        yield read_shard(directory, shard["name"])
+
+@time_execution
+async def load_shards(directory: str, db, **upsert_kwargs) -> int:
+    """
+    Bulk load a shard directory into any BaseVectorDB.
+    The next shard is read in a worker thread while the current one is upserted,
+    so loading is bound by DB write throughput.
+
+    Args:
+        directory: Shard directory
+        db: Target adapter (the caller owns its lifecycle)
+        upsert_kwargs: Passed to db.upsert (e.g. batch_size, parallel)
+
+    Returns:
+        Number of documents loaded
+    """
+    manifest = read_manifest(directory)
+    if manifest["dim"]:
+        # Collections created by the load get the shard vector size
+        os.environ["VECTOR_SIZE"] = str(manifest["dim"])
+
+    names = [shard["name"] for shard in manifest["shards"]]
+    total = 0
+    pending = asyncio.create_task(asyncio.to_thread(read_shard, directory, names[0])) if names else None
+    for i in range(len(names)):
+        documents = await pending
+        if i + 1 < len(names):
+            pending = asyncio.create_task(asyncio.to_thread(read_shard, directory, names[i + 1]))
+        await db.upsert(documents, **upsert_kwargs)
+        total += len(documents)
+        logger.info(f"Loaded {names[i]} ({total} documents so far)")
+    return total
+
+@time_execution
+async def export_shards(db, directory: str, shard_size: int = None, batch_size: int = 256) -> int:
+    """
+    Export every point of an adapter's collection (see BaseVectorDB.iter_documents) into shards.
+
+    The adapter is opened here, after checking that the collection exists: entering a
+    Qdrant or Azure adapter creates a missing collection, which a misspelled name must not do.
+
+    Returns:
+        Number of documents exported
+    """
+    if not await db.exists():
+        name = getattr(db, "collection_name", None) or getattr(db, "index_name", "source")
+        raise ValueError(f"Collection '{name}' does not exist; nothing to export (check the name)")
+
+    total = 0
+    async with db:
+        with ShardWriter(directory, shard_size=shard_size) as writer:
+            async for documents in db.iter_documents(batch_size=batch_size):
+                await asyncio.to_thread(writer.write, documents)
+                total += len(documents)
+    logger.info(f"Exported {total} documents to {directory}")
+    return total
@@ -0,0 +1,117 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from src.utils.logger import logger
+
+
+class Deadline:
+    """Absolute deadline on the running loop's clock, with per-stage budgets"""
+
+    def __init__(self, timeout_ms: float):
+        self.loop = asyncio.get_running_loop()
+        self.total = timeout_ms / 1000.0
+        self.start = self.loop.time()
+        self.expires_at = self.start + self.total
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)"""
+        return max(0.0, self.expires_at - self.loop.time())
+
+    def budget(self, fraction: float) -> float:
+        """Seconds for a stage that may use `fraction` of the total, capped by what is left"""
+        return min(self.remaining(), self.total * fraction)
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent latencies per stage, used to pick hedging thresholds
+    and to predict whether a stage fits in the remaining budget.
+    """
+
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        """
+        Args:
+            window: Latencies kept per stage
+            min_samples: Samples needed before percentile() returns a value
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, stage: str, q: float) -> Optional[float]:
+        """q-th percentile (0-100) in seconds, or None while there are too few samples"""
+        samples = self._samples.get(stage)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100.0))]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 per stage, for monitoring"""
+        stats = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            stats[stage] = {
+                "count": len(ordered),
+                **{f"p{q}": ordered[min(len(ordered) - 1, int(len(ordered) * q / 100.0))] for q in (50, 95, 99)}
+            }
+        return stats
+
+
+async def run_hedged(call: Callable[[], Awaitable[Any]], hedge_after: Optional[float] = None,
+                     timeout: Optional[float] = None) -> Tuple[Any, bool]:
+    """
+    Await call(), issuing one duplicate call if the first hasn't finished after `hedge_after`
+    seconds. The first successful result wins and the other call is cancelled, so call()
+    must be idempotent and must not share mutable state between attempts.
+
+    Args:
+        call: Factory for the awaitable (invoked once per attempt)
+        hedge_after: Seconds before hedging (None disables hedging)
+        timeout: Overall limit in seconds (None waits indefinitely)
+
+    Returns:
+        (result, whether a hedge was sent)
+
+    Raises:
+        asyncio.TimeoutError: If no attempt succeeds within timeout
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    attempts = [asyncio.ensure_future(call())]
+    pending = set(attempts)
+    error = None
+    try:
+        while pending:
+            elapsed = loop.time() - start
+            can_hedge = hedge_after is not None and len(attempts) == 1
+            wait_for = None if timeout is None else timeout - elapsed
+            if can_hedge:
+                until_hedge = hedge_after - elapsed
+                wait_for = until_hedge if wait_for is None else min(wait_for, until_hedge)
+
+            done, pending = await asyncio.wait(
+                pending, timeout=None if wait_for is None else max(0.0, wait_for),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), len(attempts) > 1
+                error = task.exception()
+
+            if not done:
+                if can_hedge and loop.time() - start >= hedge_after:
+                    logger.debug(f"Hedging call after {hedge_after * 1000:.0f} ms")
+                    hedge = asyncio.ensure_future(call())
+                    attempts.append(hedge)
+                    pending.add(hedge)
+                    continue
+                raise asyncio.TimeoutError(f"Call did not complete within {timeout:.3f} s")
+        raise error
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
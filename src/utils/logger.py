@@ -3,6 +3,7 @@ import functools
 import asyncio
 from loguru import logger
 import sys
+from src.utils.tracing import get_tracer
 
 # Configure logger
 logger.remove()  # Remove default handler
@@ -15,41 +16,45 @@ logger.add(
 def time_execution(func):
     """
     Decorator to track execution time of functions (sync and async).
-    Logs the duration in seconds.
+    Logs the duration in seconds and records a tracing span (see src.utils.tracing).
     """
+    span_name = f"{func.__module__}.{func.__qualname__}"
+
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         start_time = time.time()
-        try:
-            if asyncio.iscoroutinefunction(func):
-                result = await func(*args, **kwargs)
-            else:
-                result = func(*args, **kwargs)
-            
-            end_time = time.time()
-            duration = end_time - start_time
-            logger.info(f"'{func.__module__}.{func.__qualname__}' executed in {duration:.4f} seconds")
-            return result
-        except Exception as e:
-            end_time = time.time()
-            duration = end_time - start_time
-            logger.error(f"'{func.__module__}.{func.__qualname__}' failed after {duration:.4f} seconds with error: {e}")
-            raise e
+        with get_tracer().span(span_name):
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    result = await func(*args, **kwargs)
+                else:
+                    result = func(*args, **kwargs)
+                
+                end_time = time.time()
+                duration = end_time - start_time
+                logger.info(f"'{func.__module__}.{func.__qualname__}' executed in {duration:.4f} seconds")
+                return result
+            except Exception as e:
+                end_time = time.time()
+                duration = end_time - start_time
+                logger.error(f"'{func.__module__}.{func.__qualname__}' failed after {duration:.4f} seconds with error: {e}")
+                raise e
 
     @functools.wraps(func)
     def sync_wrapper(*args, **kwargs):
         start_time = time.time()
-        try:
-            result = func(*args, **kwargs)
-            end_time = time.time()
-            duration = end_time - start_time
-            logger.info(f"'{func.__module__}.{func.__qualname__}' executed in {duration:.4f} seconds")
-            return result
-        except Exception as e:
-            end_time = time.time()
-            duration = end_time - start_time
-            logger.error(f"'{func.__module__}.{func.__qualname__}' failed after {duration:.4f} seconds with error: {e}")
-            raise e
+        with get_tracer().span(span_name):
+            try:
+                result = func(*args, **kwargs)
+                end_time = time.time()
+                duration = end_time - start_time
+                logger.info(f"'{func.__module__}.{func.__qualname__}' executed in {duration:.4f} seconds")
+                return result
+            except Exception as e:
+                end_time = time.time()
+                duration = end_time - start_time
+                logger.error(f"'{func.__module__}.{func.__qualname__}' failed after {duration:.4f} seconds with error: {e}")
+                raise e
 
     if asyncio.iscoroutinefunction(func):
         return wrapper
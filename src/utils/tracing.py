@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import random
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from loguru import logger
+
+
+class Span:
+    """One timed operation in a trace. Set attributes with set_attributes()."""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, trace: "Trace", parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled or no span is active"""
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Spans of one request. `sampled` is the head sampling decision."""
+
+    __slots__ = ("trace_id", "spans", "sampled", "dropped_spans")
+
+    def __init__(self, sampled: bool):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self.sampled = sampled
+        self.dropped_spans = 0
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Request-scoped spans in a context variable, so spans opened by the client, embedders
+    and adapters (including across asyncio tasks) nest under the request that caused them.
+
+    Spans of every trace are recorded while it runs; when the root span ends, the trace is
+    written if it was head sampled (sample_rate), ran longer than slow_ms (tail sampling)
+    or raised. Export is one JSON object per line: a span per line ('jsonl'), or an OTLP/JSON
+    ExportTraceServiceRequest per trace ('otlp', readable by the OpenTelemetry collector's
+    otlpjsonfile receiver).
+    """
+
+    def __init__(self, export_path: Optional[str] = None, sample_rate: Optional[float] = None,
+                 slow_ms: Optional[float] = None, export_format: Optional[str] = None,
+                 max_spans: Optional[int] = None, service_name: Optional[str] = None):
+        """
+        Args:
+            export_path: File traces are appended to. If None, reads TRACE_EXPORT_PATH from env (empty disables tracing).
+            sample_rate: Fraction of traces kept regardless of latency. If None, reads TRACE_SAMPLE_RATE from env.
+            slow_ms: Traces at least this slow are always kept. If None, reads TRACE_SLOW_MS from env (0 disables).
+            export_format: 'jsonl' or 'otlp'. If None, reads TRACE_FORMAT from env.
+            max_spans: Spans recorded per trace (caps memory for long ingestions). If None, reads TRACE_MAX_SPANS from env.
+            service_name: service.name resource attribute. If None, reads TRACE_SERVICE_NAME from env.
+        """
+        self.export_path = export_path if export_path is not None else os.getenv("TRACE_EXPORT_PATH", "")
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+        self.slow_ms = slow_ms if slow_ms is not None else float(os.getenv("TRACE_SLOW_MS", "1000"))
+        self.export_format = export_format or os.getenv("TRACE_FORMAT", "jsonl")
+        self.max_spans = max_spans or int(os.getenv("TRACE_MAX_SPANS", "1000"))
+        self.service_name = service_name or os.getenv("TRACE_SERVICE_NAME", "rag-ingestion-pipeline")
+        if self.export_format not in ("jsonl", "otlp"):
+            raise ValueError(f"Unknown trace format '{self.export_format}'. Use 'jsonl' or 'otlp'.")
+
+        self.enabled = bool(self.export_path)
+        self._lock = threading.Lock()
+        self._file = None
+        self.exported = {"head": 0, "slow": 0, "error": 0}
+        self.dropped = 0
+
+        if self.enabled:
+            logger.info(f"Tracing to {self.export_path} ({self.export_format}, sample_rate={self.sample_rate}, slow_ms={self.slow_ms:g})")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Open a span under the current one, or a new trace if there is none"""
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        trace = parent.trace if parent is not None else Trace(sampled=random.random() < self.sample_rate)
+        span = Span(name, trace, parent.span_id if parent is not None else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if isinstance(e, Exception):
+                span.status = "error"
+                span.error = f"{type(e).__name__}: {e}"
+            else:
+                span.status = "cancelled"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            if len(trace.spans) < self.max_spans:
+                trace.spans.append(span)
+            else:
+                trace.dropped_spans += 1
+            if parent is None:
+                self._finish(trace, span)
+
+    def _finish(self, trace: Trace, root: Span):
+        """Tail sampling: keep head-sampled, slow and failed traces"""
+        if trace.sampled:
+            reason = "head"
+        elif self.slow_ms > 0 and root.duration_ms >= self.slow_ms:
+            reason = "slow"
+        elif any(span.status == "error" for span in trace.spans):
+            reason = "error"
+        else:
+            self.dropped += 1
+            return
+
+        root.attributes["sampling.reason"] = reason
+        if trace.dropped_spans:
+            root.attributes["trace.dropped_spans"] = trace.dropped_spans
+        try:
+            lines = self._to_jsonl(trace) if self.export_format == "jsonl" else [self._to_otlp(trace)]
+            with self._lock:
+                if self._file is None:
+                    self._file = open(self.export_path, "a", encoding="utf-8")
+                self._file.write("".join(line + "\n" for line in lines))
+                self._file.flush()
+            self.exported[reason] += 1
+        except Exception as e:
+            logger.warning(f"Trace export failed: {e}")
+
+    @staticmethod
+    def _to_jsonl(trace: Trace) -> List[str]:
+        return [json.dumps({
+            "trace_id": trace.trace_id,
+            "span_id": span.span_id,
+            "parent_span_id": span.parent_id,
+            "name": span.name,
+            "start_time_unix_nano": span.start_ns,
+            "end_time_unix_nano": span.end_ns,
+            "duration_ms": round(span.duration_ms, 3),
+            "status": span.status,
+            "error": span.error,
+            "attributes": span.attributes
+        }, default=str) for span in trace.spans]
+
+    @staticmethod
+    def _otlp_value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        if isinstance(value, (list, tuple)):
+            return {"arrayValue": {"values": [Tracer._otlp_value(v) for v in value]}}
+        return {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+
+    def _to_otlp(self, trace: Trace) -> str:
+        status_codes = {"ok": 1, "error": 2, "cancelled": 2}
+        spans = [{
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": self._otlp_value(value)}
+                           for key, value in span.attributes.items() if value is not None],
+            "status": {"code": status_codes[span.status], **({"message": span.error or span.status} if span.status != "ok" else {})}
+        } for span in trace.spans]
+        return json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "src.utils.tracing"}, "spans": spans}]
+        }]})
+
+    def stats(self) -> Dict[str, Any]:
+        """Exported traces by sampling reason, and traces dropped by sampling"""
+        return {"enabled": self.enabled, "exported": dict(self.exported), "dropped": self.dropped}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracer: Optional[Tracer] = None
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer, configured from env on first use"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+def set_tracer(tracer: Tracer):
+    """Replace the process-wide tracer (e.g. to enable tracing programmatically)"""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = tracer
+
+def span(name: str, **attributes: Any):
+    """Context manager for a span under the current one: `with span("rerank", k=10) as s: ...`"""
+    return get_tracer().span(name, **attributes)
+
+def current_span():
+    """Innermost active span (a no-op span outside of a trace)"""
+    return _current_span.get() or NOOP_SPAN
+
+def set_attributes(**attributes: Any):
+    """Set attributes on the innermost active span"""
+    current_span().set_attributes(**attributes)
+
+def _from_otlp_value(value: Dict[str, Any]) -> Any:
+    kind, raw = next(iter(value.items()))
+    if kind == "intValue":
+        return int(raw)
+    if kind == "arrayValue":
+        return [_from_otlp_value(v) for v in raw.get("values", [])]
+    return raw
+
+def read_spans(path: str) -> List[Dict[str, Any]]:
+    """Load exported spans (either format) as flat dicts with name, trace_id, duration_ms and attributes"""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "resourceSpans" not in record:
+                spans.append(record)
+                continue
+            for resource in record["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for s in scope["spans"]:
+                        spans.append({
+                            "trace_id": s["traceId"],
+                            "span_id": s["spanId"],
+                            "parent_span_id": s.get("parentSpanId"),
+                            "name": s["name"],
+                            "duration_ms": (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6,
+                            "status": "ok" if s["status"]["code"] != 2 else "error",
+                            "attributes": {a["key"]: _from_otlp_value(a["value"]) for a in s["attributes"]}
+                        })
+    return spans
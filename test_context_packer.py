@@ -0,0 +1,47 @@
+from src.models import Document, DocMetadata
+from src.context_packer import ContextPacker
+
+def make_document(content: str, score: float, source: str) -> Document:
+    return Document(content=content, score=score, metadata=DocMetadata(source_type='pdf', source_filename=source))
+
+def check_truncated_sentence_kept_from_later_document():
+    # The best document is cut before its answer sentence; the copy in the next one must survive
+    best = make_document("Alpha is introduced here. " + "Beta " * 80 + "is long. Gamma is the key answer.", 0.9, "a.pdf")
+    other = make_document("Gamma is the key answer.", 0.8, "b.pdf")
+    packed = ContextPacker(max_tokens=60, max_source_share=1).pack([best, other])
+    assert "Alpha is introduced here." in packed.text
+    assert "Gamma is the key answer." in packed.text
+    assert packed.sources[0].truncated
+    assert packed.duplicate_sentences == 0
+
+    # Once emitted, later copies are still dropped
+    packed = ContextPacker(max_tokens=1000, max_source_share=1).pack([best, other])
+    assert packed.text.count("Gamma is the key answer.") == 1
+    assert packed.duplicate_sentences == 1 and packed.dropped_documents == 1
+
+def check_oversized_sentence_truncated():
+    # A block without sentence ends is cut at a word boundary instead of dropped
+    block = make_document(" ".join(f"cell{i}" for i in range(300)), 0.9, "table.pdf")
+    packer = ContextPacker(max_tokens=50)
+    packed = packer.pack([block])
+    assert packed.dropped_documents == 0
+    assert packed.sources[0].truncated
+    assert packed.tokens <= 50
+    assert packed.text.split()[-1].startswith("cell")
+
+def check_headers_numbered_in_order():
+    documents = [make_document(f"Sentence number {i}.", 1 - i / 100, f"file{i}.pdf") for i in range(12)]
+    packed = ContextPacker(max_tokens=3000).pack(documents)
+    for i in range(12):
+        assert f"[{i + 1}] file{i}.pdf" in packed.text
+    assert packed.tokens <= packed.budget
+
+def test_context_packer():
+    print("Testing ContextPacker dedup, truncation and headers...")
+    check_truncated_sentence_kept_from_later_document()
+    check_oversized_sentence_truncated()
+    check_headers_numbered_in_order()
+    print("Context packer checks passed.")
+
+if __name__ == "__main__":
+    test_context_packer()
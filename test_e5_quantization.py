@@ -0,0 +1,79 @@
+import os
+import time
+import asyncio
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+from src.models import Document, DocMetadata
+from src.loader.factory import LoaderFactory
+from src.processor.cleaner import SimpleCleaner
+from src.processor.chunker import ParentChildChunker
+from src.embedder.e5_embedder import E5Embedder, export_onnx_variant
+
+load_dotenv()
+
+async def load_sample_chunks(file_path: str, max_chunks: int):
+    loader = LoaderFactory.get_loader(file_path)
+    pages = await loader.load(file_path, source_type="pdf")
+    cleaner = SimpleCleaner()
+    chunker = ParentChildChunker()
+
+    chunks = []
+    for page in pages:
+        page.content = cleaner.clean(page.content)
+        chunks.extend(chunker.chunk(page))
+    return chunks[:max_chunks]
+
+async def embed_timed(embedder: E5Embedder, texts, is_query: bool = False):
+    docs = [Document(content=t, metadata=DocMetadata(source_type='pdf')) for t in texts]
+    start = time.perf_counter()
+    await embedder.embed(docs, is_query=is_query)
+    duration = time.perf_counter() - start
+    return np.array([d.embedding for d in docs], dtype=np.float32), duration
+
+async def test_e5_quantization():
+    parser = argparse.ArgumentParser(description="Compare a quantized/optimised E5 ONNX model against the float model")
+    parser.add_argument("--model", default="./hf-models/e5", help="E5 model path")
+    parser.add_argument("--variant", default="qint8_avx512_vnni", help="ONNX variant, e.g. qint8_avx2 or O3")
+    parser.add_argument("--max_chunks", type=int, default=256, help="Number of sample chunks to embed")
+    args = parser.parse_args()
+
+    onnx_file = f"onnx/model_{args.variant}.onnx"
+    if not os.path.exists(os.path.join(args.model, onnx_file)):
+        print(f"Exporting {args.variant} variant...")
+        onnx_file = export_onnx_variant(args.model, args.variant)
+
+    file_path = "sample_data/hypertension-in-pregnancy-diagnosis-and-management-pdf-66141717671365.pdf"
+    chunks = await load_sample_chunks(file_path, args.max_chunks)
+    texts = [c.content for c in chunks]
+    queries = texts[:32]
+
+    float_embedder = E5Embedder(args.model, num_workers=1, project=False)
+    variant_embedder = E5Embedder(args.model, num_workers=1, project=False, onnx_file=onnx_file)
+
+    # Warm up both sessions so the first-call overhead isn't measured
+    await embed_timed(float_embedder, texts[:4])
+    await embed_timed(variant_embedder, texts[:4])
+
+    float_vecs, float_time = await embed_timed(float_embedder, texts)
+    variant_vecs, variant_time = await embed_timed(variant_embedder, texts)
+    float_q, _ = await embed_timed(float_embedder, queries, is_query=True)
+    variant_q, _ = await embed_timed(variant_embedder, queries, is_query=True)
+
+    # Accuracy: per-passage agreement and top-5 retrieval overlap
+    cosine = np.sum(float_vecs * variant_vecs, axis=1)
+    k = 5
+    float_top = np.argsort(-(float_q @ float_vecs.T), axis=1)[:, :k]
+    variant_top = np.argsort(-(variant_q @ variant_vecs.T), axis=1)[:, :k]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(float_top, variant_top)])
+
+    print(f"\n--- {args.variant} vs float32 on {len(texts)} chunks ---")
+    print(f"Throughput float32: {len(texts) / float_time:8.1f} chunks/s")
+    print(f"Throughput {args.variant}: {len(texts) / variant_time:8.1f} chunks/s ({float_time / variant_time:.2f}x)")
+    print(f"Cosine similarity to float32: mean={cosine.mean():.4f} min={cosine.min():.4f}")
+    print(f"Top-{k} retrieval overlap: {overlap:.3f}")
+
+    assert cosine.mean() > 0.95, "Quantized embeddings diverge too much from the float model"
+
+if __name__ == "__main__":
+    asyncio.run(test_e5_quantization())
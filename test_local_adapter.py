@@ -0,0 +1,102 @@
+import asyncio
+import tempfile
+import random
+from uuid import uuid4
+from src.models import Document, DocMetadata
+from src.db.local_adapter import LocalAdapter
+from src.filters import parse_filter
+
+def make_documents(count: int, dim: int = 16):
+    rng = random.Random(0)
+    documents = []
+    for i in range(count):
+        doc = Document(
+            content=f"chunk {i}",
+            metadata=DocMetadata(
+                source_type='pdf',
+                product=['product_a', 'product_b', 'general'][i % 3],
+                page_number=i % 7,
+                parent_id=str(uuid4())
+            )
+        )
+        doc.embedding = [rng.uniform(-1, 1) for _ in range(dim)]
+        doc.sparse_embedding = {"indices": [i % 11, 100 + i % 5], "values": [1.0, 0.5]}
+        documents.append(doc)
+    return documents
+
+async def run_local_adapter_checks(path: str):
+    documents = make_documents(500)
+    
+    db = LocalAdapter(path=path, use_hybrid=True)
+    async with db:
+        await db.upsert(documents)
+        
+        # Exact search finds the query vector itself first
+        target = documents[42]
+        results = await db.search(target.embedding, limit=3)
+        assert str(results[0].id) == str(target.id)
+        assert abs(results[0].score - 1.0) < 1e-5
+        
+        # Filters are applied before ranking
+        results = await db.search(target.embedding, limit=10, filters={"product": "product_b"})
+        assert results and all(r.metadata.product == "product_b" for r in results)
+
+        # Composite filters match regardless of clause order, and their cached masks stay bounded
+        db._mask_cache_size = 4
+        for page in range(7):
+            forward = {"product": ["product_a", "product_b"], "page_number": {"gte": page}}
+            backward = {"page_number": {"gte": page}, "product": ["product_b", "product_a"]}
+            assert parse_filter(forward) == parse_filter(backward)
+            results = await db.search(target.embedding, limit=10, filters=forward)
+            assert all(r.metadata.product != "general" and r.metadata.page_number >= page for r in results)
+        assert len(db._mask_cache) <= 4
+
+        # Hybrid search fuses the sparse ranking
+        results = await db.search(target.embedding, limit=5, sparse_query_vector={"indices": [42 % 11], "values": [1.0]})
+        assert str(results[0].id) == str(target.id)
+        
+        # Batched search returns one result list per query, in order
+        batches = await db.search_many([documents[1].embedding, documents[2].embedding], limit=1)
+        assert [str(b[0].id) for b in batches] == [str(documents[1].id), str(documents[2].id)]
+        
+        # Upserting an existing id overwrites it in place
+        target.content = "updated"
+        await db.upsert([target])
+        assert db._count == len(documents)
+    
+    # Reopening loads the index checkpoint and reads payloads from disk
+    reopened = LocalAdapter(path=path, use_hybrid=True)
+    results = await reopened.search(target.embedding, limit=1)
+    assert results[0].content == "updated"
+
+    # Writes after the checkpoint are replayed from the log; overwritten sparse postings are dropped
+    target.sparse_embedding = {"indices": [999], "values": [1.0]}
+    await reopened.upsert([target])
+    for db in (reopened, LocalAdapter(path=path, use_hybrid=True)):
+        results = await db.search(documents[0].embedding, limit=2, sparse_query_vector={"indices": [999], "values": [1.0]})
+        assert str(target.id) in [str(r.id) for r in results]
+        db._ensure_loaded()
+        row = db._id_to_row[str(target.id)]
+        assert db._sparse_scores({"indices": [999], "values": [1.0]})[row] == 1.0
+        assert db._sparse_scores({"indices": [100 + 42 % 5], "values": [1.0]})[row] == 0.0
+
+    # Compaction keeps one record per row
+    await reopened.compact()
+    with open(reopened._payloads_path) as f:
+        assert sum(1 for _ in f) == len(documents)
+    assert (await reopened.search(target.embedding, limit=1))[0].content == "updated"
+
+    # Admin and export methods
+    assert await reopened.count() == len(documents)
+    assert await reopened.list_collections() == ["rag_collection"]
+    exported = [doc async for batch in reopened.iter_documents(batch_size=128) for doc in batch]
+    assert len(exported) == len(documents) and exported[42].sparse_embedding == target.sparse_embedding
+    print(f"Local adapter checks passed ({len(documents)} vectors).")
+
+def test_local_adapter():
+    print("Testing LocalAdapter upsert/search/persistence...")
+    with tempfile.TemporaryDirectory() as path:
+        asyncio.run(run_local_adapter_checks(path))
+
+if __name__ == "__main__":
+    test_local_adapter()
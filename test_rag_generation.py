@@ -3,21 +3,29 @@ import asyncio
 import argparse
 from dotenv import load_dotenv
 from src.rag_client import RAGClient
+from src.context_packer import ContextPacker
 from openai import AsyncOpenAI
 
 load_dotenv()
 
-async def generate_response(query: str, hybrid_search: bool = False):
+async def generate_response(query: str, hybrid_search: bool = False, max_context_tokens: int = None):
     print("Initializing RAG Client...")
     rag_client = RAGClient()
+    packer = ContextPacker(max_tokens=max_context_tokens)
     
     print(f"Retrieving context for: '{query}'")
     async with rag_client.db:  # Properly close DB client
         documents = await rag_client.retrieve(query, limit=5, hybrid_search=hybrid_search)
     
-    context_text = "\n\n".join([doc.content for doc in documents])
     print(f"Retrieved {len(documents)} documents.")
     
+    # Budgeted, deduplicated context instead of every parent in full
+    context = packer.pack(documents)
+    context_text = context.text
+    print(f"Packed {len(context.sources)} documents into {context.tokens}/{context.budget} tokens "
+          f"(retrieved {context.input_tokens}, saved {context.saved_tokens}; "
+          f"{context.duplicate_sentences} duplicate sentences removed, tokenizer={context.tokenizer})")
+    
     print("Generating response with GPT-4o-mini...")
     async with AsyncOpenAI() as client:  # Properly close OpenAI client
         response = await client.chat.completions.create(
@@ -43,6 +51,7 @@ async def main():
     parser.add_argument("--db_type", default="qdrant", help="Vector Database Type (e.g., qdrant, azure)")
     parser.add_argument("--embedder_type", default="openai", help="Embedder Type (e.g., openai)")
     parser.add_argument("--use_hybrid_search", action="store_true", help="Use hybrid search")
+    parser.add_argument("--max_context_tokens", type=int, help="Context token budget (default: CONTEXT_MAX_TOKENS)")
     args = parser.parse_args()
 
     if args.db_type:
@@ -53,7 +62,7 @@ async def main():
         os.environ["USE_HYBRID_SEARCH"] = "true"
 
     query = "first line of defense for hypertension in pregnancy."
-    answer = await generate_response(query, hybrid_search=args.use_hybrid_search)
+    answer = await generate_response(query, hybrid_search=args.use_hybrid_search, max_context_tokens=args.max_context_tokens)
     print("\n--- Generated Answer ---")
     print(answer)
 
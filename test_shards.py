@@ -0,0 +1,57 @@
+import os
+import asyncio
+import tempfile
+from src.shards import ShardWriter, read_manifest, iter_shards, load_shards, export_shards
+from src.db.local_adapter import LocalAdapter
+from test_local_adapter import make_documents
+
+async def run_shard_checks(directory: str):
+    documents = make_documents(250)
+    documents[3].sparse_embedding = None
+
+    # Two writes spanning shard boundaries, then an append from a second writer
+    with ShardWriter(os.path.join(directory, "shards"), shard_size=100, embedder_identity="test") as writer:
+        writer.write(documents[:150])
+        writer.write(documents[150:200])
+    with ShardWriter(os.path.join(directory, "shards"), shard_size=100, embedder_identity="test") as writer:
+        writer.write(documents[200:])
+
+    manifest = read_manifest(os.path.join(directory, "shards"))
+    assert [shard["count"] for shard in manifest["shards"]] == [100, 100, 50]
+    assert manifest["dim"] == 16
+
+    # Round trip keeps ids, payloads and vectors (float32 precision)
+    restored = [doc for shard in iter_shards(os.path.join(directory, "shards")) for doc in shard]
+    assert [str(d.id) for d in restored] == [str(d.id) for d in documents]
+    assert restored[7].metadata == documents[7].metadata
+    assert restored[7].sparse_embedding == documents[7].sparse_embedding
+    assert restored[3].sparse_embedding is None
+    assert max(abs(a - b) for a, b in zip(restored[7].embedding, documents[7].embedding)) < 1e-6
+
+    # Bulk load into a backend without re-embedding
+    db = LocalAdapter(path=os.path.join(directory, "db"), use_hybrid=True)
+    async with db:
+        loaded = await load_shards(os.path.join(directory, "shards"), db)
+        assert loaded == len(documents)
+        results = await db.search(documents[42].embedding, limit=1)
+        assert str(results[0].id) == str(documents[42].id)
+
+    # Export round trip; a missing collection fails without being created
+    assert await export_shards(db, os.path.join(directory, "export"), shard_size=100) == len(documents)
+    assert read_manifest(os.path.join(directory, "export"))["dim"] == 16
+    missing = LocalAdapter(collection_name="rag_colection", path=os.path.join(directory, "db"))
+    try:
+        await export_shards(missing, os.path.join(directory, "missing"))
+        assert False, "export of a missing collection should fail"
+    except ValueError:
+        pass
+    assert await missing.list_collections() == ["rag_collection"]
+    print(f"Shard checks passed ({loaded} documents in {len(manifest['shards'])} shards).")
+
+def test_shards():
+    print("Testing shard write/read/bulk load...")
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run_shard_checks(directory))
+
+if __name__ == "__main__":
+    test_shards()
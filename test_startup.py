@@ -0,0 +1,58 @@
+import sys
+import json
+import subprocess
+
+# SDKs that should only be imported when their backend is created
+HEAVY_MODULES = [
+    "openai",
+    "fastembed",
+    "sentence_transformers",
+    "torch",
+    "qdrant_client",
+    "azure.search.documents",
+]
+
+def measure_import(statement: str) -> dict:
+    """
+    Run an import statement in a fresh interpreter and report the wall time
+    and which heavy SDKs ended up in sys.modules.
+    """
+    code = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "duration = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': duration, 'heavy_modules': heavy}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_startup():
+    print("Testing that package imports don't load backend SDKs...")
+
+    for statement in ["import src.embedder", "import src.db", "import src.rag_client"]:
+        stats = measure_import(statement)
+        print(f"{statement:<28} {stats['seconds'] * 1000:8.1f} ms  heavy={stats['heavy_modules']}")
+        assert not stats["heavy_modules"], f"'{statement}' eagerly imported {stats['heavy_modules']}"
+
+def benchmark_backends():
+    """Compare cold-start cost of resolving each backend class"""
+    statements = {
+        "embedder: openai": "from src.embedder import EmbedderFactory; EmbedderFactory.get('openai')",
+        "embedder: bm25": "from src.embedder import EmbedderFactory; EmbedderFactory.get('bm25')",
+        "embedder: e5": "from src.embedder import EmbedderFactory; EmbedderFactory.get('e5')",
+        "db: qdrant": "from src.db import VectorDBFactory; VectorDBFactory.get('qdrant')",
+        "db: azure": "from src.db import VectorDBFactory; VectorDBFactory.get('azure')",
+    }
+    for label, statement in statements.items():
+        try:
+            stats = measure_import(statement)
+            print(f"{label:<20} {stats['seconds'] * 1000:8.1f} ms  heavy={stats['heavy_modules']}")
+        except subprocess.CalledProcessError as e:
+            print(f"{label:<20} failed: {e.stderr.strip().splitlines()[-1]}")
+
+if __name__ == "__main__":
+    test_startup()
+    print("\n--- Backend cold-start benchmark ---")
+    benchmark_backends()
@@ -0,0 +1,56 @@
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+from src.utils.tracing import read_spans
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100.0))]
+
+def summarize(path: str) -> Dict[str, Dict[str, float]]:
+    """count/p50/p95/p99 duration (ms) per span name"""
+    durations = defaultdict(list)
+    for s in read_spans(path):
+        durations[s["name"]].append(s["duration_ms"])
+    return {
+        name: {"count": len(values), **{f"p{q}": percentile(sorted(values), q) for q in (50, 95, 99)}}
+        for name, values in durations.items()
+    }
+
+def slowest_traces(path: str, top: int) -> List[List[dict]]:
+    """Spans of the `top` slowest traces, root first"""
+    traces = defaultdict(list)
+    for s in read_spans(path):
+        traces[s["trace_id"]].append(s)
+    roots = sorted((s for spans in traces.values() for s in spans if not s.get("parent_span_id")),
+                   key=lambda s: -s["duration_ms"])[:top]
+    return [[root] + sorted((s for s in traces[root["trace_id"]] if s is not root), key=lambda s: -s["duration_ms"])
+            for root in roots]
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize exported traces (TRACE_EXPORT_PATH) per span name")
+    parser.add_argument("path", help="Trace file (jsonl or otlp)")
+    parser.add_argument("--baseline", help="Earlier trace file to compare p95 against")
+    parser.add_argument("--top", type=int, default=3, help="Slowest traces to break down")
+    parser.add_argument("--regression_pct", type=float, default=20.0, help="p95 increase flagged as a regression")
+    args = parser.parse_args()
+
+    current = summarize(args.path)
+    baseline = summarize(args.baseline) if args.baseline else {}
+
+    print(f"{'span':<55} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  vs baseline p95")
+    for name, stats in sorted(current.items(), key=lambda item: -item[1]["p95"]):
+        line = f"{name:<55} {stats['count']:>6} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f}"
+        if name in baseline and baseline[name]["p95"] > 0:
+            change = (stats["p95"] / baseline[name]["p95"] - 1) * 100
+            flag = "❌" if change >= args.regression_pct else "✅"
+            line += f"  {flag} {change:+.0f}%"
+        print(line)
+
+    for spans in slowest_traces(args.path, args.top):
+        root = spans[0]
+        print(f"\nTrace {root['trace_id']} ({root['name']}, {root['duration_ms']:.1f} ms, {root['attributes'].get('sampling.reason', '?')})")
+        for s in spans[1:]:
+            print(f"  {s['duration_ms']:>9.2f} ms  {s['name']}  {s['attributes']}")
+
+if __name__ == "__main__":
+    main()